@@ -0,0 +1,49 @@
+import re
+import time
+from .catalog import load_catalog
+from .schema import table_schema
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Storage.engine import StorageError, get_store
+from BackEnd.Storage.columnar import enable_columnar, disable_columnar
+
+def parse_alter_table(stmt, curr_database):
+    """ALTER TABLE table SET STORAGE COLUMNAR|ROW"""
+    if curr_database is None:
+        return {"error": "No database selected"}
+
+    match = re.match(r"ALTER\s+TABLE\s+(\w+)\s+SET\s+STORAGE\s+(\w+)\s*;?\s*$", stmt.strip(), re.IGNORECASE)
+    if not match:
+        return {"error": f"Invalid ALTER TABLE statement: {stmt}"}
+
+    table_name = match.group(1)
+    storage = match.group(2).upper()
+    if storage not in ("COLUMNAR", "ROW"):
+        return {"error": f"Unknown storage '{match.group(2)}' (COLUMNAR or ROW)"}
+
+    if table_name not in load_catalog(curr_database).get("tables", {}):
+        return {"error": f"Table '{table_name}' does not exist"}
+
+    if storage == "ROW":
+        disable_columnar(curr_database, table_name)
+        return {"message": f"Table '{table_name}' uses row storage"}
+
+    migration_error = ensure_typed_rows(curr_database, table_name)
+    if migration_error:
+        return migration_error
+
+    # Az oszlopos szegmensek felépítése a sor tároló teljes bejárásával; a katalógus jelzővel
+    # együtt, a párhuzamos írások szegmens frissítését közben visszatartva
+    start_time = time.time()
+    table_data = load_catalog(curr_database)["tables"][table_name]
+    schema = table_schema(table_data)
+    try:
+        rows, dictionary_columns = enable_columnar(curr_database, table_name, schema, get_store(curr_database, table_name))
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
+
+    return {
+        "message": f"Table '{table_name}' uses columnar storage",
+        "rows": rows,
+        "dictionary_columns": sorted(dictionary_columns),
+        "elapsed_seconds": round(time.time() - start_time, 3)
+    }
@@ -0,0 +1,151 @@
+import re
+import time
+import random
+from collections import Counter
+from .catalog import load_catalog, save_catalog
+from .schema import table_schema
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Storage.engine import StorageError, get_store
+
+# ANALYZE [table, ...]: table and column statistics of the cost based planner, stored in the
+# catalog entry of the table ("statistics"): row count and, per column, the distinct and null
+# counts, min / max and an equi-depth histogram (HISTOGRAM_BUCKETS + 1 bounds, every bucket
+# holds about the same number of rows). The histogram comes from a fixed size row sample,
+# the counts from a full scan; distinct counts above DISTINCT_EXACT_LIMIT are estimated from
+# the sample (Haas-Stokes Duj1 estimator). The statistics are not maintained by writes, they
+# describe the table as of the last ANALYZE.
+
+ANALYZE_SAMPLE_ROWS = 30000     # Hisztogram minta mérete (reservoir sampling)
+HISTOGRAM_BUCKETS = 32
+DISTINCT_EXACT_LIMIT = 100000   # Ennyi különböző érték felett a distinct szám a mintából becsült
+ANALYZE_BATCH_SIZE = 10000
+
+# Oszlop típus -> a hisztogramba kerülő (egymással összehasonlítható) értékek típusa
+HISTOGRAM_VALUE_TYPES = {"INT": (int,), "FLOAT": (int, float), "BOOL": (bool,)}
+
+def parse_analyze(stmt, curr_database):
+    """ANALYZE [table[, table ...]] (every table of the database without a name)"""
+    if curr_database is None:
+        return {"error": "No database selected"}
+
+    match = re.match(r"ANALYZE(?:\s+(\w+(?:\s*,\s*\w+)*))?\s*;?\s*$", stmt.strip(), re.IGNORECASE)
+    if not match:
+        return {"error": f"Invalid ANALYZE statement: {stmt}"}
+
+    tables = load_catalog(curr_database).get("tables", {})
+    names = [name.strip() for name in match.group(1).split(",")] if match.group(1) else list(tables)
+    for name in names:
+        if name not in tables:
+            return {"error": f"Table '{name}' does not exist"}
+
+    results = {}
+    for name in names:
+        result = analyze_table(curr_database, name)
+        if "error" in result:
+            return result
+        results[name] = result
+    return {"message": f"Analyzed {len(results)} table(s)", "tables": results}
+
+def is_null(value, col_type):
+    # Nincs NULL literál: a régi formátumú sorok nem konvertálható üres értéke számít hiányzónak
+    return value is None or (value == "" and col_type in HISTOGRAM_VALUE_TYPES)
+
+def histogram_value(value, col_type):
+    """Value as kept in the histogram, None if it does not compare with the other values of the column"""
+    value_types = HISTOGRAM_VALUE_TYPES.get(col_type, (str,))
+    if isinstance(value, bool) and bool not in value_types:
+        return None
+    return value if isinstance(value, value_types) else None
+
+def equi_depth_bounds(values, buckets=HISTOGRAM_BUCKETS):
+    """Bucket bounds of sorted values: bounds[i] is the value at the i / buckets quantile"""
+    if not values:
+        return []
+    buckets = min(buckets, max(len(values) - 1, 1))
+    last = len(values) - 1
+    return [values[round(i * last / buckets)] for i in range(buckets + 1)]
+
+def estimate_distinct(sample_values, total):
+    """Haas-Stokes Duj1 estimate of the distinct values of total rows from a sample"""
+    n = len(sample_values)
+    if n == 0:
+        return 0
+    counts = Counter(sample_values)
+    d = len(counts)
+    f1 = sum(1 for count in counts.values() if count == 1)
+    if n >= total:
+        return d
+    if f1 == n:
+        # Minden mintabeli érték egyedi: a kulcs jellegű oszlop minden értéke különböző
+        return total
+    return min(total, max(d, round(n * d / (n - f1 + f1 * n / total))))
+
+def analyze_table(database, table_name):
+    """Collect and store the statistics of one table"""
+    migration_error = ensure_typed_rows(database, table_name)
+    if migration_error:
+        return migration_error
+
+    start_time = time.time()
+    schema = table_schema(load_catalog(database)["tables"][table_name])
+    types = [schema.column_types[name] for name in schema.column_names]
+    width = len(schema.column_names)
+
+    rows = 0
+    nulls = [0] * width
+    distinct = [set() for _ in range(width)]    # None: a pontos számlálás a limit felett leállt
+    sample = []
+    rng = random.Random(0)
+    try:
+        for doc in get_store(database, table_name).scan(ANALYZE_BATCH_SIZE):
+            row = schema.decode(doc)
+            rows += 1
+            for i, value in enumerate(row):
+                if is_null(value, types[i]):
+                    nulls[i] += 1
+                elif distinct[i] is not None:
+                    distinct[i].add(value)
+                    if len(distinct[i]) > DISTINCT_EXACT_LIMIT:
+                        distinct[i] = None
+            # Reservoir sampling: minden sor azonos eséllyel kerül a mintába
+            if len(sample) < ANALYZE_SAMPLE_ROWS:
+                sample.append(row)
+            else:
+                slot = rng.randrange(rows)
+                if slot < ANALYZE_SAMPLE_ROWS:
+                    sample[slot] = row
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
+
+    columns = {}
+    for i, name in enumerate(schema.column_names):
+        values = [row[i] for row in sample if not is_null(row[i], types[i])]
+        ordered = sorted(v for v in (histogram_value(value, types[i]) for value in values) if v is not None)
+        non_null = rows - nulls[i]
+        if distinct[i] is not None:
+            distinct_count = len(distinct[i])
+        else:
+            distinct_count = estimate_distinct(values, non_null)
+        columns[name] = {
+            "distinct": distinct_count,
+            "nulls": nulls[i],
+            "min": ordered[0] if ordered else None,
+            "max": ordered[-1] if ordered else None,
+            "histogram": equi_depth_bounds(ordered)
+        }
+
+    statistics = {
+        "rows": rows,
+        "analyzed_at": round(time.time(), 3),
+        "sample_rows": len(sample),
+        "columns": columns
+    }
+    db_content = load_catalog(database, for_update=True)
+    if table_name not in db_content.get("tables", {}):
+        return {"error": f"Table '{table_name}' does not exist"}
+    db_content["tables"][table_name]["statistics"] = statistics
+    save_catalog(database, db_content)
+
+    elapsed = round(time.time() - start_time, 3)
+    print(f"ANALYZE {table_name}: {rows} rows in {elapsed} seconds")
+    return {"rows": rows, "columns": len(columns), "elapsed_seconds": elapsed}
@@ -0,0 +1,59 @@
+import os
+import copy
+import json
+import threading
+from .database import get_metadata_file
+from .schema import clear_schema_cache
+
+# In-process cache of the parsed MetaData/<db>.json catalogs
+# database -> {"signature": (mtime_ns, size), "content": dict}
+_catalog_cache = {}
+_catalog_lock = threading.Lock()
+
+def _file_signature(db_file):
+    stat = os.stat(db_file)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load_catalog(database, for_update=False):
+    """
+    Return the parsed catalog of a database.
+    The file is only re-read when its mtime or size changed since the last load.
+    The cached copy is shared, callers that modify it must pass for_update=True
+    and persist the result with save_catalog.
+    """
+    db_file = get_metadata_file(database)
+    signature = _file_signature(db_file)  # FileNotFoundError, ha nincs ilyen adatbázis
+
+    with _catalog_lock:
+        entry = _catalog_cache.get(database)
+        if entry is None or entry["signature"] != signature:
+            with open(db_file, 'r') as f:
+                content = json.load(f)
+            entry = {"signature": signature, "content": content}
+            _catalog_cache[database] = entry
+            clear_schema_cache()
+        content = entry["content"]
+
+    return copy.deepcopy(content) if for_update else content
+
+def get_table_metadata(database, table):
+    """Cached metadata of one table, None if the table does not exist"""
+    return load_catalog(database).get("tables", {}).get(table)
+
+def save_catalog(database, content):
+    """Write the catalog back to disk and drop the cached copy"""
+    db_file = get_metadata_file(database)
+    with _catalog_lock:
+        with open(db_file, 'w') as f:
+            json.dump(content, f, indent=4)
+        _catalog_cache.pop(database, None)
+        clear_schema_cache()
+
+def invalidate_catalog(database=None):
+    """Forget the cached catalog of one database (or of all databases)"""
+    with _catalog_lock:
+        if database is None:
+            _catalog_cache.clear()
+        else:
+            _catalog_cache.pop(database, None)
+        clear_schema_cache()
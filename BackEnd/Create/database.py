@@ -10,11 +10,11 @@ os.makedirs(META_DATA_FOLDER, exist_ok=True)
 def get_metadata_file(database):
     return os.path.join(META_DATA_FOLDER, f"{database}.json")
 
-def create_database(database):
+def create_database(database, engine):
     file_path = get_metadata_file(database)
     
     if not os.path.exists(file_path):  #Create File if it does not exists 
         with open(file_path, "w") as f:
-            json.dump({'tables':{}}, f, indent=4)
+            json.dump({'engine': engine, 'tables':{}}, f, indent=4)
 
     return {"message": f"Database '{database}' created or already exists."}
@@ -1,8 +1,14 @@
 import re
 from .database import *
+from .catalog import load_catalog, save_catalog, invalidate_catalog
+from BackEnd.Storage.engine import StorageError, database_engine, index_collection_name, zone_map_collection_name
+from BackEnd.Storage.columnar import drop_columnar
+from BackEnd.Storage.index_cache import invalidate_index, invalidate_database_indexes
+from BackEnd.Insert_Get_From_Mongo.zone_map import drop_zone_map
+from BackEnd.Insert_Get_From_Mongo.bloom_filter import drop_bloom_filters
+from BackEnd.Storage.wal import log_drop
 
 def parse_drop_table(stmt, curr_database):
-    curr = get_metadata_file(curr_database)
     
     match = re.search(r'DROP TABLE (\w+)', stmt, re.IGNORECASE)
 
@@ -11,17 +17,35 @@ def parse_drop_table(stmt, curr_database):
     else:
         return {"error": f"Invalid DROP statment: {stmt}"}
     
-    with open(curr, "r", encoding="utf-8") as file:
-        data = json.load(file)
+    data = load_catalog(curr_database, for_update=True)
     
     if table_name in data.get("tables", {}):
-        del data["tables"][table_name]  # Remove table entry
+        table_data = data["tables"].pop(table_name)  # Remove table entry
     else:
         return {"error": f"Table does not exist {table_name}"}
     
+    # A tábla és az index kollekciók adatainak törlése a tárolóból
+    try:
+        engine = database_engine(curr_database)
+        engine.drop_store(curr_database, table_name)
+        for index in table_data.get("indexes", []):
+            engine.drop_store(curr_database, index_collection_name(table_name, index["name"]))
+            invalidate_index(curr_database, index_collection_name(table_name, index["name"]))
+        engine.drop_store(curr_database, zone_map_collection_name(table_name))
+        drop_zone_map(curr_database, table_name)
+        drop_bloom_filters(curr_database, table_name)
+        drop_columnar(curr_database, table_name)
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
+    
     # Save changes back to file
-    with open(curr, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4)
+    save_catalog(curr_database, data)
+
+    # Drop rekord: a log korábbi rekordjai ne töltsék vissza a sorokat egy azonos nevű új táblába
+    try:
+        log_drop(curr_database, table_name)
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     
     return {"message": f"Table '{table_name}' has been dropped successfully"}
 
@@ -42,7 +66,21 @@ def parse_drop_database(stmt, curr_database):
     if not os.path.exists(metadata_file):
         return {"error": "Database file does not exist"}
     
-    # Remove the database file from the filesystem
+    # Drop the stored data, then remove the database file from the filesystem
+    try:
+        database_engine(database_name).drop_database(database_name)
+        invalidate_database_indexes(database_name)
+        drop_zone_map(database_name)
+        drop_bloom_filters(database_name)
+        drop_columnar(database_name)
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     os.remove(metadata_file)
+    invalidate_catalog(database_name)
+
+    try:
+        log_drop(database_name)
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     
     return {"message": f"Database '{database_name}' has been dropped successfully"}
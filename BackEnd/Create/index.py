@@ -1,31 +1,39 @@
-import re
 import json
-from .database  import get_metadata_file
+from .catalog import load_catalog, save_catalog
 from BackEnd.Insert_Get_From_Mongo.index_controller import create_mongodb_index
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Insert_Get_From_Mongo.bloom_filter import build_bloom_filter
+from BackEnd.Parser.plan_cache import parse_statement
+
 def parse_create_index(stmt, curr_database):
 
     # CHeck if databes in Use
     if curr_database is None:
         return {"error" : "No databse selected"}
     
-    pattern = r"CREATE\s+INDEX\s+(\w+)\s+ON\s+(\w+)\s*\(([^)]+)\)"
-    match = re.search(pattern, stmt, re.IGNORECASE)
-
-    if not match:
-        return {"error": f"Invalid CREATE INDEX statement: {stmt}"}
+    parsed = parse_statement(stmt)
+    if "error" in parsed or parsed["type"] != "create_index":
+        return {"error": f"Invalid CREATE INDEX statement: {parsed.get('error', stmt)}"}
     
-    index_name = match.group(1)
-    table_name = match.group(2)
-    columns_str = match.group(3).strip()
-
-    # Parse columns, handling potential whitespace
-    columns = [col.strip() for col in columns_str.split(',')]
+    index_name = parsed["name"]
+    table_name = parsed["table"]
+    columns = parsed["columns"]
     
+    # CREATE INDEX ... USING BLOOM: Bloom filter index helyett
+    if parsed["using"] == "BLOOM":
+        return create_bloom_filter(curr_database, index_name, table_name, columns)
+    if parsed["using"] not in (None, "BTREE"):
+        return {"error": f"Unknown index method '{parsed['using']}' (BTREE, BLOOM)"}
+
+    # Régi formátumú tábla: átírás típusos sorokra az index építése előtt
+    if table_name in load_catalog(curr_database).get("tables", {}):
+        migration_error = ensure_typed_rows(curr_database, table_name)
+        if migration_error:
+            return migration_error
+
     # Read database metadata
-    db_file = get_metadata_file(curr_database)
     try:
-        with open(db_file, 'r') as f:
-            db_content = json.load(f)
+        db_content = load_catalog(curr_database, for_update=True)
         
         # Check if table exists
         if table_name not in db_content.get("tables", {}):
@@ -53,13 +61,15 @@ def parse_create_index(stmt, curr_database):
             "name": index_name,
             "columns": columns
         }
+        # USING BTREE: rendezett kulcsú index, tartomány feltételekhez is
+        if parsed["using"] == "BTREE":
+            index_entry["ordered"] = True
         
         # Add the index to the table metadata
         table_data["indexes"].append(index_entry)
         
         # Save the updated metadata
-        with open(db_file, 'w') as f:
-            json.dump(db_content, f, indent=4)
+        save_catalog(curr_database, db_content)
 
         # Determine if this is a unique index
         is_unique = any(col in table_data["constraints"].get("unique_key", []) for col in columns)
@@ -68,11 +78,50 @@ def parse_create_index(stmt, curr_database):
         index_result = create_mongodb_index(curr_database, table_name, index_name, columns, is_unique)
         
         if "error" in index_result:
+            # A sikertelen build ne maradjon a katalógusban
+            db_content = load_catalog(curr_database, for_update=True)
+            indexes = db_content["tables"][table_name].get("indexes", [])
+            db_content["tables"][table_name]["indexes"] = [idx for idx in indexes if idx["name"] != index_name]
+            save_catalog(curr_database, db_content)
             return index_result
             
-        return {"message": f"Index '{index_name}' created on table '{table_name}'"}
+        return {
+            "message": f"Index '{index_name}' created on table '{table_name}'",
+            "rows_indexed": index_result["rows_indexed"],
+            "index_keys": index_result["index_keys"],
+            "elapsed_seconds": index_result["elapsed_seconds"],
+            "progress": index_result["progress"]
+        }
         
     except FileNotFoundError:
         return {"error": f"Database metadata file not found for '{curr_database}'"}
     except json.JSONDecodeError:
-        return {"error": f"Invalid database metadata file for '{curr_database}'"}
\ No newline at end of file
+        return {"error": f"Invalid database metadata file for '{curr_database}'"}
+
+def create_bloom_filter(curr_database, filter_name, table_name, columns):
+    """Declare (and build) a Bloom filter on one column of a table"""
+    db_content = load_catalog(curr_database, for_update=True)
+    if table_name not in db_content.get("tables", {}):
+        return {"error": f"Table '{table_name}' does not exist"}
+
+    table_data = db_content["tables"][table_name]
+    if len(columns) != 1:
+        return {"error": "A Bloom filter covers exactly one column"}
+    column = columns[0]
+    if column not in [col["name"] for col in table_data["columns"]]:
+        return {"error": f"Column '{column}' does not exist in table '{table_name}'"}
+
+    existing_names = [idx["name"] for idx in table_data.get("indexes", []) + table_data.get("bloom_filters", [])]
+    if filter_name in existing_names:
+        return {"error": f"Index '{filter_name}' already exists on table '{table_name}'"}
+
+    table_data.setdefault("bloom_filters", []).append({"name": filter_name, "column": column})
+    save_catalog(curr_database, db_content)
+
+    bloom = build_bloom_filter(curr_database, table_name, table_data, column)
+    return {
+        "message": f"Bloom filter '{filter_name}' created on '{table_name}.{column}'",
+        "values": bloom.count,
+        "bits": bloom.size,
+        "hash_functions": bloom.hash_count
+    }
@@ -0,0 +1,316 @@
+import re
+import sys
+import struct
+import threading
+from collections import OrderedDict
+
+# Compiled, per-table view of the catalog entry: column positions, converters and
+# the row encode/decode functions used by every read and write path.
+# Rows are stored as {"_id": "pk1$pk2", "row": [typed values in column order]}
+# (INT -> int, FLOAT -> float, BOOL -> bool, DATE / VARCHAR -> str).
+# Tables created before typed rows use {"_id": "pk1$pk2", "value": "c1#c2#..."};
+# both formats are decoded, the old one is rewritten by migrate_table.
+
+KEY_SEPARATOR = "$"
+KEY_ESCAPE = "\\"
+VALUE_SEPARATOR = "#"   # Régi formátum: '#'-el összefűzött nem-PK értékek
+ROW_FIELD = "row"
+ROW_FORMAT = "typed"    # A katalógus "row_format" értéke a típusos sorokat tároló tábláknál
+COLUMNAR_STORAGE = "columnar"   # A katalógus "storage" értéke az oszlopos szegmensekkel rendelkező tábláknál
+INT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+DATE_PATTERN = re.compile(r"^\d{4}[.-]\d{2}[.-]\d{2}$")
+VARCHAR_PATTERN = re.compile(r"VARCHAR\((\d+)\)")
+
+def _parse_bool(value):
+    upper = value.upper()
+    if upper in ("TRUE", "1"):
+        return True
+    if upper in ("FALSE", "0"):
+        return False
+    raise ValueError(value)
+
+def _parse_date(value):
+    if not DATE_PATTERN.match(value):
+        raise ValueError(value)
+    # Egységes YYYY-MM-DD alak, így a dátumok szövegként is rendezhetők
+    return value.replace(".", "-")
+
+def key_text(value):
+    """Canonical text of a typed value inside document / index keys"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+def escape_key_part(text):
+    # Az escape karakter és a '$' escape-elése, így a kulcsrészek értékei nem törik szét a kulcsot
+    return text.replace(KEY_ESCAPE, KEY_ESCAPE + KEY_ESCAPE).replace(KEY_SEPARATOR, KEY_ESCAPE + KEY_SEPARATOR)
+
+def make_key(parts):
+    """Document or index key from typed values ('$'-joined and escaped when composite)"""
+    if len(parts) == 1:
+        return key_text(parts[0])
+    return KEY_SEPARATOR.join(escape_key_part(key_text(part)) for part in parts)
+
+def key_prefix(value):
+    """Key prefix of every composite key whose first part is value"""
+    return escape_key_part(key_text(value)) + KEY_SEPARATOR
+
+def sortable_text(value, col_type):
+    """
+    Order preserving key text of a typed value (ordered indexes): INT and FLOAT keys are
+    fixed width and compare like the numbers, BOOL is 0 / 1, DATE and text keep their text
+    """
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if col_type == "INT" and isinstance(value, int):
+        return f"{value - INT_RANGE[0]:020d}"
+    if col_type == "FLOAT" and isinstance(value, (int, float)):
+        # IEEE 754 bitek: pozitív számnál az előjelbit beállítva, negatívnál minden bit negálva
+        bits = struct.unpack(">Q", struct.pack(">d", float(value) + 0.0))[0]
+        bits = bits ^ 0xFFFFFFFFFFFFFFFF if bits >> 63 else bits | (1 << 63)
+        return f"{bits:016x}"
+    return key_text(value)
+
+def get_converter(col_type):
+    """Python converter for a column type (raises ValueError on invalid input)"""
+    col_type = col_type.upper()
+    if col_type == "INT":
+        return int
+    if col_type == "FLOAT":
+        return float
+    if col_type == "BOOL":
+        return _parse_bool
+    if col_type == "DATE":
+        return _parse_date
+    return str
+
+def _build_parser(col):
+    """Text -> (typed value, error message) for one column"""
+    col_name = col["name"]
+    col_type = col["type"].upper()
+
+    if col_type in ("INT", "FLOAT", "BOOL", "DATE"):
+        converter = get_converter(col_type)
+
+        def parse(val):
+            try:
+                value = converter(val)
+            except ValueError:
+                return None, f"Value '{val}' is not a valid {col_type} for column '{col_name}'"
+            if col_type == "INT" and not INT_RANGE[0] <= value <= INT_RANGE[1]:
+                return None, f"Value '{val}' is out of range for INT column '{col_name}'"
+            return value, None
+        return parse
+
+    size_match = VARCHAR_PATTERN.match(col_type)
+    if size_match:
+        max_size = int(size_match.group(1))
+
+        def parse(val):
+            if len(val) > max_size:
+                return None, f"Value '{val}' exceeds maximum length {max_size} for column '{col_name}'"
+            return val, None
+        return parse
+
+    return lambda val: (val, None)
+
+def _safe_convert(converter, text):
+    # Régi formátumú sorok: a nem konvertálható (pl. üres) érték szövegként marad
+    try:
+        return converter(text)
+    except ValueError:
+        return text
+
+class TableSchema:
+    def __init__(self, table_data):
+        self.table_name = table_data.get("table_name")
+        self.columns = table_data["columns"]
+        self.column_names = [col["name"] for col in self.columns]
+        self.column_types = {col["name"]: col["type"].upper() for col in self.columns}
+        self.positions = {name: i for i, name in enumerate(self.column_names)}
+
+        constraints = table_data.get("constraints", {})
+        self.primary_keys = constraints.get("primary_key", [])
+        self.unique_columns = constraints.get("unique_key", [])
+        self.foreign_keys = constraints.get("foreign_keys", [])
+        self.indexes = table_data.get("indexes", [])
+        self.typed_rows = table_data.get("row_format") == ROW_FORMAT
+        self.columnar = table_data.get("storage") == COLUMNAR_STORAGE
+
+        # Oszlop -> az azt lefedő egyoszlopos index neve (ha van);
+        # az automatikus (UNIQUE / FOREIGN KEY) indexek élveznek elsőbbséget; a rendezett
+        # (BTREE) indexek kulcsa nem key_text alakú, ezek nem kerülnek ide
+        self.column_indexes = {}
+        for idx in self.indexes:
+            columns = idx.get("columns", [])
+            if len(columns) == 1 and not idx.get("ordered"):
+                if idx.get("unique") or idx.get("foreign_key") or columns[0] not in self.column_indexes:
+                    self.column_indexes[columns[0]] = idx["name"]
+        self.unique_indexes = {col: name for col, name in self.column_indexes.items() if col in self.unique_columns}
+
+        self.non_pk_columns = [name for name in self.column_names if name not in self.primary_keys]
+        self.pk_positions = [self.positions[pk] for pk in self.primary_keys if pk in self.positions]
+        self.value_positions = [self.positions[name] for name in self.non_pk_columns]
+        self.composite_key = len(self.primary_keys) > 1
+
+        self.converters = [get_converter(col["type"]) for col in self.columns]
+        # DICTIONARY oszlopok: a dekódolt sorok közös (internált) string példányokat kapnak
+        self.dictionary_positions = [i for i, col in enumerate(self.columns) if col.get("encoding") == "dictionary"]
+        self.parsers = [_build_parser(col) for col in self.columns]
+
+        self._projections = {}
+        self._prefixed_names = {}
+
+    # --- Write path ---
+
+    def parse_row(self, values):
+        """Text values (column order) -> (typed row, error message)"""
+        row = []
+        for parse, val in zip(self.parsers, values):
+            typed, error = parse(val)
+            if error:
+                return None, error
+            row.append(typed)
+        return row, None
+
+    def validate(self, values):
+        """Validate a full row of text values against the column types"""
+        _, error = self.parse_row(values)
+        return (False, error) if error else (True, "")
+
+    def literal(self, column, text):
+        """Typed value of a query literal for a column (the text itself if it does not convert)"""
+        pos = self.positions.get(column)
+        if pos is None or not isinstance(text, str):
+            return text
+        return _safe_convert(self.converters[pos], text)
+
+    def encode_key(self, row):
+        return make_key([row[pos] for pos in self.pk_positions])
+
+    def encode(self, row):
+        """Typed row (column order) -> stored document"""
+        return {"_id": self.encode_key(row), ROW_FIELD: list(row)}
+
+    def key_from_dict(self, values):
+        return make_key([values[pk] for pk in self.primary_keys])
+
+    # --- Read path ---
+
+    def decode(self, doc):
+        """Document -> typed row as a list in column order (must not be modified)"""
+        row = doc.get(ROW_FIELD)
+        if row is None:
+            row = self.decode_legacy(doc)
+        if self.dictionary_positions:
+            row = list(row)
+            for pos in self.dictionary_positions:
+                if isinstance(row[pos], str):
+                    row[pos] = sys.intern(row[pos])
+        return row
+
+    def decode_legacy(self, doc):
+        """'#'-joined document of the old format -> typed row"""
+        row = [""] * len(self.column_names)
+        key = doc["_id"]
+        if self.composite_key:
+            for pos, part in zip(self.pk_positions, key.split(KEY_SEPARATOR)):
+                row[pos] = part
+        elif self.pk_positions:
+            row[self.pk_positions[0]] = key
+
+        value = doc.get("value")
+        if value:
+            for pos, part in zip(self.value_positions, value.split(VALUE_SEPARATOR)):
+                row[pos] = part
+        return [_safe_convert(converter, text) for converter, text in zip(self.converters, row)]
+
+    def decode_dict(self, doc):
+        """Document -> {column: value}"""
+        return dict(zip(self.column_names, self.decode(doc)))
+
+    def decode_column(self, doc, column):
+        """Single column of a document without decoding the whole row"""
+        row = doc.get(ROW_FIELD)
+        if row is not None:
+            return row[self.positions[column]]
+        return self.decode_legacy(doc)[self.positions[column]]
+
+    def projection(self, selected_columns):
+        """Positions for a select list ('*' expanded), None for unknown columns"""
+        cache_key = tuple(selected_columns)
+        positions = self._projections.get(cache_key)
+        if positions is None:
+            positions = []
+            for col in selected_columns:
+                if col == "*":
+                    positions.extend(range(len(self.column_names)))
+                else:
+                    positions.append(self.positions.get(col))
+            self._projections[cache_key] = positions
+        return positions
+
+    def project(self, row, positions):
+        return [row[pos] if pos is not None else "" for pos in positions]
+
+    def prefixed_names(self, table_name):
+        """(table.column, column) name pairs in column order, for JOIN rows"""
+        names = self._prefixed_names.get(table_name)
+        if names is None:
+            names = [(f"{table_name}.{name}", name) for name in self.column_names]
+            self._prefixed_names[table_name] = names
+        return names
+
+    def index_key(self, index_columns, values):
+        """Index key from a {column: typed value} dict ('$'-joined for composite indexes)"""
+        return make_key([values[col] for col in index_columns])
+
+    def index_part(self, index, position, value):
+        """Key text of a typed value in one column of an index (before composite escaping)"""
+        if index.get("ordered"):
+            return sortable_text(value, self.column_types.get(index["columns"][position]))
+        return key_text(value)
+
+    def index_key_function(self, index):
+        """Typed values of the index columns -> index key (order preserving for ordered indexes)"""
+        if not index.get("ordered"):
+            return make_key
+        parts = range(len(index["columns"]))
+        return lambda values: make_key([self.index_part(index, i, value) for i, value in zip(parts, values)])
+
+    def get_index(self, index_name):
+        for idx in self.indexes:
+            if idx.get("name") == index_name:
+                return idx
+        return None
+
+# id(table_data) -> (table_data, TableSchema), least recently used first; a catalog reload
+# creates new dicts, the identity check makes sure a reused id never returns a stale schema.
+# Bounded: for_update copies and ad-hoc table dicts would otherwise stay in it until the next save.
+SCHEMA_CACHE_SIZE = 256
+_schema_cache = OrderedDict()
+_schema_lock = threading.Lock()
+
+def table_schema(table_data):
+    """Compiled schema for a catalog table entry, built once per entry"""
+    if isinstance(table_data, TableSchema):
+        return table_data
+    key = id(table_data)
+    with _schema_lock:
+        entry = _schema_cache.get(key)
+        if entry is not None and entry[0] is table_data:
+            _schema_cache.move_to_end(key)
+            return entry[1]
+
+    schema = TableSchema(table_data)
+    with _schema_lock:
+        _schema_cache[key] = (table_data, schema)
+        _schema_cache.move_to_end(key)
+        while len(_schema_cache) > SCHEMA_CACHE_SIZE:
+            _schema_cache.popitem(last=False)
+    return schema
+
+def clear_schema_cache():
+    with _schema_lock:
+        _schema_cache.clear()
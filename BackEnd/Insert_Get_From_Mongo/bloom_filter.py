@@ -0,0 +1,122 @@
+import math
+import threading
+from BackEnd.Create.schema import table_schema, key_text
+from BackEnd.Storage.engine import get_store
+
+# Per-column Bloom filters: "value is surely absent" answers for join probes and '=' lookups.
+# Filters exist for the FOREIGN KEY columns and the columns declared with
+# CREATE INDEX name ON table (column) USING BLOOM (catalog "bloom_filters").
+# They live in memory only: built with one table scan on first use, extended on insert.
+# Deletes cannot clear bits, they only make the filter stale; a stale or overfull
+# filter is rebuilt on its next probe.
+
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_MIN_CAPACITY = 1024
+BLOOM_REBUILD_DELETE_RATIO = 0.25   # Ennyi törlés (a tárolt értékek arányában) után újraépítés
+
+_filters = {}   # (database, table, column) -> BloomFilter
+_bloom_lock = threading.RLock()
+
+def bloom_key(value):
+    """Hashed form of a value: the key text, stripped like the text comparisons do"""
+    return key_text(value).strip()
+
+class BloomFilter:
+    def __init__(self, capacity):
+        self.capacity = max(capacity, BLOOM_MIN_CAPACITY)
+        self.size = int(-self.capacity * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+        self.count = 0
+        self.deleted = 0
+
+    def _positions(self, key):
+        # Dupla hash-elés: a beépített hash folyamaton belül stabil, a szűrő csak memóriában él
+        h1 = hash(key)
+        h2 = hash((key, 1)) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def may_contain(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def needs_rebuild(self):
+        return self.count > self.capacity or self.deleted > self.count * BLOOM_REBUILD_DELETE_RATIO
+
+def bloom_columns(table_data):
+    """Columns with a Bloom filter: FOREIGN KEY columns and declared ones"""
+    columns = [fk["column"] for fk in table_data.get("constraints", {}).get("foreign_keys", [])]
+    for entry in table_data.get("bloom_filters", []):
+        if entry["column"] not in columns:
+            columns.append(entry["column"])
+    return columns
+
+def build_bloom_filter(database, table, table_data, column):
+    """Fill a new filter from one scan of the table (registered first, so concurrent inserts land in it)"""
+    schema = table_schema(table_data)
+    store = get_store(database, table)
+    with _bloom_lock:
+        old = _filters.get((database, table, column))
+        bloom = BloomFilter(2 * (old.count - old.deleted) if old else BLOOM_MIN_CAPACITY)
+        _filters[(database, table, column)] = bloom
+        values = [bloom_key(schema.decode_column(doc, column)) for doc in store.scan()]
+        if len(values) > bloom.capacity:
+            bloom = BloomFilter(2 * len(values))
+            _filters[(database, table, column)] = bloom
+        for value in values:
+            bloom.add(value)
+    return bloom
+
+def get_bloom_filter(database, table, table_data, column):
+    """Filter of a column (built / rebuilt on demand), None if the column has none"""
+    if column not in bloom_columns(table_data):
+        return None
+    with _bloom_lock:
+        bloom = _filters.get((database, table, column))
+        if bloom is None or bloom.needs_rebuild():
+            bloom = build_bloom_filter(database, table, table_data, column)
+        return bloom
+
+def bloom_may_contain(database, table, table_data, column, value):
+    """False only when the column has a filter and value is surely not in the column"""
+    bloom = get_bloom_filter(database, table, table_data, column)
+    return bloom is None or bloom.may_contain(bloom_key(value))
+
+def literal_probe(schema, column, text):
+    """Bloom key of a WHERE literal, None when '=' on it can match values of another key text"""
+    col_type = schema.column_types.get(column)
+    if col_type in ("INT", "FLOAT", "BOOL"):
+        value = schema.literal(column, text)
+        # Nem konvertálható literál (pl. INT oszlopnál '1.5'): a szám szerinti összehasonlítás dönt
+        return None if isinstance(value, str) else bloom_key(value)
+    # Szöveges és DATE oszlopok: a compare_values a levágott szöveget hasonlítja
+    return text.strip() if isinstance(text, str) else None
+
+def update_bloom_filters(database, table, table_data, operation, rows):
+    """Maintain the loaded filters of a table for inserted / deleted typed rows"""
+    columns = bloom_columns(table_data)
+    if not columns:
+        return
+    schema = table_schema(table_data)
+    with _bloom_lock:
+        for column in columns:
+            bloom = _filters.get((database, table, column))
+            if bloom is None:
+                continue
+            if operation == "insert":
+                pos = schema.positions[column]
+                for row in rows:
+                    bloom.add(bloom_key(row[pos]))
+            else:
+                bloom.deleted += len(rows)
+
+def drop_bloom_filters(database, table=None, column=None):
+    """Forget the filters of a column / table / database"""
+    with _bloom_lock:
+        for entry in list(_filters):
+            if entry[0] == database and (table is None or entry[1] == table) and (column is None or entry[2] == column):
+                del _filters[entry]
@@ -1,4 +1,5 @@
 import os
+import threading
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
@@ -8,10 +9,19 @@ load_dotenv()
 # Get URI from the environment
 MONGODB_ATLAS_URI = os.getenv("MONGODB_ATLAS_URI")
 
-# Connect to MongoDB
-client = MongoClient(MONGODB_ATLAS_URI)
+# Connect to MongoDB on first use (local engine databases never open a connection)
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = MongoClient(MONGODB_ATLAS_URI)
+    return client
 
 def get_db_collection(database, table):
-    db = client[database]
+    db = get_client()[database]
     collection = db[table]
     return collection
@@ -1,27 +1,36 @@
-import re
-import json
-from BackEnd.Create.database import get_metadata_file
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema
 from BackEnd.Insert_Get_From_Mongo.mongodb import delete_document
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Parser.plan_cache import parse_statement
 
-def parse_delete(stmt, curr_database):
+def parse_delete(stmt, curr_database, params=None):
    
     if curr_database is None:
         return {"error": "No database selected"}
 
     # Parse the table name and where clause
-    pattern = r"DELETE\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?"
-    match = re.search(pattern, stmt, re.IGNORECASE)
-    
-    if not match:
-        return {"error": f"Invalid DELETE statement: {stmt}"}
-    
-    table_name = match.group(1)
-    where_clause = match.group(2)
+    parsed = parse_statement(stmt, params)
+    if "error" in parsed or parsed["type"] != "delete":
+        return {"error": f"Invalid DELETE statement: {parsed.get('error', stmt)}"}
+    return execute_delete(parsed, curr_database)
+
+def execute_delete(parsed, curr_database):
+    """Delete by an already parsed (e.g. prepared) DELETE"""
+    if curr_database is None:
+        return {"error": "No database selected"}
+
+    table_name = parsed["table"]
+    where_clause = parsed["where"]
     
+    # Régi formátumú tábla: átírás típusos sorokra az első írás előtt
+    if table_name in load_catalog(curr_database).get("tables", {}):
+        migration_error = ensure_typed_rows(curr_database, table_name)
+        if migration_error:
+            return migration_error
+
     # Get table metadata
-    db_file = get_metadata_file(curr_database)
-    with open(db_file, 'r') as f:
-        db_content = json.load(f)
+    db_content = load_catalog(curr_database)
     
     # Check if table exists
     if table_name not in db_content.get("tables", {}):
@@ -33,21 +42,12 @@ def parse_delete(stmt, curr_database):
     if not where_clause:
         return {"error": "DELETE statements must include a WHERE clause"}
     
-    # Parse the WHERE clause
+    # Only equality conditions identify a row
     conditions = {}
-    for condition in where_clause.split(" AND "):
-        parts = condition.strip().split("=")
-        if len(parts) != 2:
-            return {"error": f"Invalid condition: {condition}"}
-        
-        col = parts[0].strip()
-        val = parts[1].strip()
-        
-        # Remove quotes if present
-        if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
-            val = val[1:-1]
-        
-        conditions[col] = val
+    for condition in where_clause:
+        if condition["op"] != "=":
+            return {"error": f"Invalid condition: {condition['column']} {condition['op']} {condition['value']}"}
+        conditions[condition["column"]] = condition["value"]
     
     # Get primary key columns
     primary_keys = table_data["constraints"]["primary_key"]
@@ -59,12 +59,9 @@ def parse_delete(stmt, curr_database):
         if pk not in conditions:
             return {"error": f"Primary key column '{pk}' must be specified in WHERE clause"}
     
-    # Build the document key
-    key_parts = []
-    for pk in primary_keys:
-        key_parts.append(conditions[pk])
-    
-    document_key = "$".join(key_parts) if len(key_parts) > 1 else key_parts[0]
+    # Build the document key from the typed primary key values
+    schema = table_schema(table_data)
+    document_key = schema.key_from_dict({pk: schema.literal(pk, conditions[pk]) for pk in primary_keys})
     
-    # Delete from MongoDB
+    # Delete from the table store
     return delete_document(curr_database, table_name, document_key)
\ No newline at end of file
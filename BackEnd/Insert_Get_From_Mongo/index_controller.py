@@ -1,281 +1,195 @@
+import os
 import json
-from pymongo import errors
-from BackEnd.Insert_Get_From_Mongo.db_connection import client, get_db_collection
-from BackEnd.Create.database import get_metadata_file
+import time
+import heapq
+import tempfile
+import itertools
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema, make_key
+from BackEnd.Storage.engine import StorageError, get_store, get_index_store, index_collection_name
+from BackEnd.Storage.index_cache import invalidate_index
+
+# Bulk index build beállítások
+INDEX_BUILD_BATCH_SIZE = 10000      # Tábla olvasás cursor batch mérete (és progress lépésköz)
+INDEX_BUILD_MEMORY_PAIRS = 500000   # Ennyi (kulcs, pk) pár felett rendezett futam a lemezre
+INDEX_WRITE_BATCH_SIZE = 5000       # Index bejegyzések bulk írásának batch mérete
 
 def extract_values_to_dict(document, table_data):
-    result = {}
-    
-    # Extract primary key parts
-    primary_keys = table_data["constraints"]["primary_key"]
-    if len(primary_keys) > 1:
-        # Composite primary key
-        pk_parts = document["_id"].split("$")
-        for i, pk in enumerate(primary_keys):
-            if i < len(pk_parts):
-                result[pk] = pk_parts[i]
-    else:
-        # Single primary key
-        result[primary_keys[0]] = document["_id"]
-    
-    # Extract non-primary key parts
-    non_pk_columns = [col["name"] for col in table_data["columns"] 
-                     if col["name"] not in primary_keys]
-    
-    if document.get("value"):
-        values = document["value"].split("#")
-        for i, col in enumerate(non_pk_columns):
-            if i < len(values):
-                result[col] = values[i]
-    
-    return result
+    return table_schema(table_data).decode_dict(document)
 
 def create_mongodb_index(database, table_name, index_name, columns, is_unique=False):
+    """
+    Bulk index build: the table is streamed in batches, the (key, primary key) pairs
+    are sorted in memory (spilling sorted runs to disk above INDEX_BUILD_MEMORY_PAIRS),
+    then the merged, grouped entries are written with bulk inserts.
+    """
+    start_time = time.time()
+    run_files = []
     try:
-        # Connect to MongoDB
-        db = client[database]
-        
-        # Get the main table collection to read existing data
-        main_collection = db[table_name]
+        # Get the main table store to read existing data
+        main_store = get_store(database, table_name)
         
-        # Create a collection name for the index
-        index_collection_name = f"{table_name}_{index_name}_ind"
-        
-        # Create or get the index collection
-        index_collection = db[index_collection_name]
+        # Create or get the index store (always built from scratch)
+        index_store = get_index_store(database, table_name, index_name)
+        index_store.clear()
         
         # Read database metadata to get primary key info
-        with open(get_metadata_file(database), 'r') as f:
-            db_content = json.load(f)
-        
-        table_data = db_content["tables"][table_name]
-        all_documents = list(main_collection.find())
+        schema = table_schema(load_catalog(database)["tables"][table_name])
         
-        # Process each document to build the index
-        for doc in all_documents:
-            primary_key = doc["_id"]
-            
-            # Extract values to a dictionary
-            values_dict = extract_values_to_dict(doc, table_data)
+        # Rendezett (BTREE) index: típus szerint rendezhető kulcsok
+        index = schema.get_index(index_name) or {"name": index_name, "columns": columns}
+        key_function = schema.index_key_function(index)
+
+        # 1. Tábla bejárása batch-enként, kulcs párok gyűjtése
+        pairs = []
+        progress = []
+        rows_scanned = 0
+        for doc in main_store.scan(INDEX_BUILD_BATCH_SIZE):
+            index_key, error = build_index_key(index_name, columns, schema.decode_dict(doc), key_function=key_function)
+            if error:
+                return error
+            pairs.append((index_key, doc["_id"]))
+            rows_scanned += 1
             
-            # Use the update_indexes function to add this document to the index
-            update_result = update_indexes(database, table_name, 'insert', primary_key, values_dict, specific_index=index_name, specific_columns=columns, is_unique=is_unique)
+            if len(pairs) >= INDEX_BUILD_MEMORY_PAIRS:
+                run_files.append(spill_sorted_run(pairs))
+                pairs = []
             
-            if "error" in update_result:
+            if rows_scanned % INDEX_BUILD_BATCH_SIZE == 0:
+                elapsed = round(time.time() - start_time, 3)
+                progress.append({"rows": rows_scanned, "elapsed_seconds": elapsed})
+                print(f"Index {index_name}: {rows_scanned} rows scanned in {elapsed} seconds")
+        
+        # 2. Rendezett futamok összefésülése, kulcsonkénti csoportosítás és bulk írás
+        pairs.sort()
+        merged = heapq.merge(iter(pairs), *(read_sorted_run(path) for path in run_files))
+        
+        index_keys = 0
+        batch = []
+        for index_key, group in itertools.groupby(merged, key=lambda pair: pair[0]):
+            primary_keys = [primary_key for _, primary_key in group]
+            if is_unique and len(primary_keys) > 1:
                 # Clean up on error
-                index_collection.delete_many({})
-                return update_result
+                index_store.clear()
+                return {"error": f"Unique constraint violation in index {index_name}: duplicate key '{index_key}'"}
+            batch.append(("insert", {"_id": index_key, "ids": primary_keys}))
+            index_keys += 1
+            
+            if len(batch) >= INDEX_WRITE_BATCH_SIZE:
+                index_store.bulk_write(batch)
+                batch = []
+        
+        if batch:
+            index_store.bulk_write(batch)
         
-        return {"message": f"Index {index_name} created successfully on {table_name}"}
+        elapsed = round(time.time() - start_time, 3)
+        print(f"Index {index_name}: {rows_scanned} rows, {index_keys} keys built in {elapsed} seconds")
+        return {
+            "message": f"Index {index_name} created successfully on {table_name}",
+            "rows_indexed": rows_scanned,
+            "index_keys": index_keys,
+            "spilled_runs": len(run_files),
+            "elapsed_seconds": elapsed,
+            "progress": progress
+        }
     
-    except errors.PyMongoError as e:
-        return {"error": f"MongoDB error: {str(e)}"}
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     except Exception as e:
         return {"error": f"Error creating index: {str(e)}"}
-    
+    finally:
+        # A (részben) újraépített index cache-elt bejegyzései érvénytelenek
+        invalidate_index(database, index_collection_name(table_name, index_name))
+        for path in run_files:
+            os.remove(path)
 
-def update_indexes(database, table_name, operation, primary_key, values, old_values=None, specific_index=None, specific_columns=None, is_unique=None):
-    try:
-        # Load table metadata
-        with open(get_metadata_file(database), 'r') as f:
-            db_content = json.load(f)
-        
-        if table_name not in db_content.get("tables", {}):
-            return {"error": f"Table '{table_name}' does not exist"}
-        
-        table_data = db_content["tables"][table_name]
-        
-        # Connect to MongoDB
-        db = client[database]
-        
-        # If updating specific index
-        if specific_index:
-            if not specific_columns:
-                return {"error": "Must provide columns for specific index"}
-            
-            # Process just this one index
-            index_collection_name = f"{table_name}_{specific_index}_ind"
-            index_collection = db[index_collection_name]
-            
-            # Build the index key
-            if len(specific_columns) > 1:
-                # Composite index
-                index_key_parts = []
-                for col in specific_columns:
-                    if col not in values:
-                        return {"error": f"Missing value for column {col}"}
-                    index_key_parts.append(values[col])
-                index_key = "$".join(index_key_parts)
-            else:
-                # Single column index
-                col = specific_columns[0]
-                if col not in values:
-                    return {"error": f"Missing value for column {col}"}
-                index_key = values[col]
-            
-            # Handle the operation
+def spill_sorted_run(pairs):
+    """Write one sorted run of (key, primary key) pairs to a temp file (JSON lines)"""
+    pairs.sort()
+    fd, path = tempfile.mkstemp(prefix="index_run_", suffix=".jsonl")
+    with os.fdopen(fd, "w") as f:
+        for pair in pairs:
+            f.write(json.dumps(pair))
+            f.write("\n")
+    return path
+
+def read_sorted_run(path):
+    with open(path, "r") as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+def index_entry_ids(doc):
+    """
+    Primary keys of one index entry.
+    Entries keep a posting list in "ids" (a single key for unique indexes); entries
+    written before posting lists keep a '#'-joined string in "value".
+    """
+    ids = list(doc.get("ids", []))
+    legacy_value = doc.get("value")
+    if legacy_value:
+        ids.extend(legacy_value.split("#"))
+    return ids
+
+def build_index_key(index_name, index_columns, values, old_values=None, key_function=make_key):
+    """Index key from the new typed values (or the old ones), None + error if a column is missing"""
+    index_key_parts = []
+    for col in index_columns:
+        if values and col in values:
+            index_key_parts.append(values[col])
+        elif old_values and col in old_values:
+            index_key_parts.append(old_values[col])
+        else:
+            # Cannot build index key
+            return None, {"error": f"Cannot build index key for {index_name}: missing column {col}"}
+
+    # Composite index: '$'-el összefűzött, escape-elt kulcs
+    return key_function(index_key_parts), None
+
+def index_operations(database, table_name, operation, entries):
+    """
+    Store operations of every index of a table for many row changes: entries is a list of
+    (primary_key, values dict). Returns ([(index collection, kind, args...)], error dict or None).
+    Posting lists are updated with add_to_set / pull so non-unique keys need no read at all;
+    unique keys are checked against the index before the insert.
+    """
+    db_content = load_catalog(database)
+
+    if table_name not in db_content.get("tables", {}):
+        return [], {"error": f"Table '{table_name}' does not exist"}
+
+    table_data = db_content["tables"][table_name]
+    unique_columns = table_data["constraints"].get("unique_key", [])
+
+    result = []
+    for index in table_data.get("indexes", []):
+        index_name = index["name"]
+        index_columns = index["columns"]
+        is_unique = index.get("unique", False) or any(col in unique_columns for col in index_columns)
+        collection = index_collection_name(table_name, index_name)
+        key_function = table_schema(table_data).index_key_function(index)
+
+        # Kulcs -> elsődleges kulcsok, a batch sorrendjében
+        keys = {}
+        for primary_key, values in entries:
+            index_key, error = build_index_key(index_name, index_columns, values, key_function=key_function)
+            if error:
+                return [], error
+            keys.setdefault(index_key, []).append(primary_key)
+
+        if is_unique:
             if operation == 'insert':
-                if is_unique:
-                    # For unique index, check if key already exists
-                    existing = index_collection.find_one({"_id": index_key})
-                    if existing:
-                        return {"error": f"Unique constraint violation in index {specific_index}"}
-                    
-                    # Insert into index collection
-                    index_collection.insert_one({
-                        "_id": index_key,
-                        "value": primary_key
-                    })
-                else:
-                    # For non-unique index, append to existing or create new
-                    existing = index_collection.find_one({"_id": index_key})
-                    if existing:
-                        # Check if this primary key is already in the list
-                        existing_values = existing["value"].split("#")
-                        if primary_key not in existing_values:
-                            # Append to existing value
-                            updated_value = existing["value"] + "#" + primary_key
-                            index_collection.update_one(
-                                {"_id": index_key},
-                                {"$set": {"value": updated_value}}
-                            )
-                    else:
-                        # Create new entry
-                        index_collection.insert_one({
-                            "_id": index_key,
-                            "value": primary_key
-                        })
-            
-            elif operation == 'delete':
-                # Find the entry in the index
-                existing = index_collection.find_one({"_id": index_key})
-                if existing:
-                    if is_unique:
-                        # For unique index, delete the entry
-                        index_collection.delete_one({"_id": index_key})
-                    else:
-                        # For non-unique index, remove the primary key from the list
-                        existing_values = existing["value"].split("#")
-                        if primary_key in existing_values:
-                            existing_values.remove(primary_key)
-                            
-                            if not existing_values:
-                                # If no values left, delete the entry
-                                index_collection.delete_one({"_id": index_key})
-                            else:
-                                # Update with remaining values
-                                updated_value = "#".join(existing_values)
-                                index_collection.update_one(
-                                    {"_id": index_key},
-                                    {"$set": {"value": updated_value}}
-                                )
-            
-            return {"message": f"Index {specific_index} updated successfully"}  
+                index_store = get_index_store(database, table_name, index_name)
+                if index_store.existing_keys(keys) or any(len(pks) > 1 for pks in keys.values()):
+                    return [], {"error": f"Unique constraint violation in index {index_name}"}
+                result.extend((collection, "insert", {"_id": index_key, "ids": pks}) for index_key, pks in keys.items())
+            else:
+                result.extend((collection, "delete", index_key) for index_key in keys)
+        elif operation == 'insert':
+            result.extend((collection, "add_to_set", index_key, "ids", pks) for index_key, pks in keys.items())
         else:
+            # Törlésnél a pull-nak meg kell előznie az üres bejegyzés törlését
+            for index_key, pks in keys.items():
+                result.append((collection, "pull", index_key, "ids", pks))
+                result.append((collection, "delete_if_empty", index_key, "ids"))
 
-            # Get indexes from metadata
-            indexes = table_data.get("indexes", [])
-            
-            # Also include primary key and unique key constraints as indexes
-            pk_columns = table_data["constraints"]["primary_key"]
-            unique_columns = table_data["constraints"].get("unique_key", [])
-            
-            # Process each index
-            for index in indexes:
-                index_name = index["name"]
-                index_columns = index["columns"]
-                
-                # Determine if this is a unique index
-                is_unique = any(col in unique_columns for col in index_columns)
-                
-                # Get index collection
-                index_collection_name = f"{table_name}_{index_name}_ind"
-                index_collection = db[index_collection_name]
-                
-                # Build the index key
-                if len(index_columns) > 1:
-                    # Composite index
-                    index_key_parts = []
-                    for col in index_columns:
-                        if values and col in values:
-                            index_key_parts.append(values[col])
-                        elif old_values and col in old_values:
-                            index_key_parts.append(old_values[col])
-                        else:
-                            # Cannot build complete index key
-                            return {"error": f"Cannot build index key for {index_name}: missing column {col}"}
-                    
-                    index_key = "$".join(index_key_parts)
-                else:
-                    # Single column index
-                    col = index_columns[0]
-                    if values and col in values:
-                        index_key = values[col]
-                    elif old_values and col in old_values:
-                        index_key = old_values[col]
-                    else:
-                        # Cannot build index key
-                        return {"error": f"Cannot build index key for {index_name}: missing column {col}"}
-                
-                # Handle the operation
-                if operation == 'insert':
-                    if is_unique:
-                        # For unique index, check if key already exists
-                        existing = index_collection.find_one({"_id": index_key})
-                        if existing:
-                            return {"error": f"Unique constraint violation in index {index_name}"}
-                        
-                        # Insert into index collection
-                        index_collection.insert_one({
-                            "_id": index_key,
-                            "value": primary_key
-                        })
-                    else:
-                        # For non-unique index, append to existing or create new
-                        existing = index_collection.find_one({"_id": index_key})
-                        if existing:
-                            # Check if this primary key is already in the list
-                            existing_values = existing["value"].split("#")
-                            if primary_key not in existing_values:
-                                # Append to existing value
-                                updated_value = existing["value"] + "#" + primary_key
-                                index_collection.update_one(
-                                    {"_id": index_key},
-                                    {"$set": {"value": updated_value}}
-                                )
-                        else:
-                            # Create new entry
-                            index_collection.insert_one({
-                                "_id": index_key,
-                                "value": primary_key
-                            })
-                
-                elif operation == 'delete':
-                    # Find the entry in the index
-                    existing = index_collection.find_one({"_id": index_key})
-                    if existing:
-                        if is_unique:
-                            # For unique index, delete the entry
-                            index_collection.delete_one({"_id": index_key})
-                        else:
-                            # For non-unique index, remove the primary key from the list
-                            existing_values = existing["value"].split("#")
-                            if primary_key in existing_values:
-                                existing_values.remove(primary_key)
-                                
-                                if not existing_values:
-                                    # If no values left, delete the entry
-                                    index_collection.delete_one({"_id": index_key})
-                                else:
-                                    # Update with remaining values
-                                    updated_value = "#".join(existing_values)
-                                    index_collection.update_one(
-                                        {"_id": index_key},
-                                        {"$set": {"value": updated_value}}
-                                    )
-                                    
-        return {"message": f"Indexes updated successfully for {operation} operation"}
-    except errors.PyMongoError as e:
-        return {"error": f"MongoDB error: {str(e)}"}
-    except Exception as e:
-        return {"error": f"Error updating indexes: {str(e)}"}
\ No newline at end of file
+    return result, None
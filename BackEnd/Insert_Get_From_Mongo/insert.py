@@ -1,124 +1,86 @@
-import re
-import json
-from BackEnd.Create.database import get_metadata_file
-from BackEnd.Insert_Get_From_Mongo.mongodb import insert_document
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema
+from BackEnd.Insert_Get_From_Mongo.mongodb import insert_document, insert_documents
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Parser.plan_cache import parse_statement
 
-def parse_insert(stmt, curr_database):
+def parse_insert(stmt, curr_database, params=None):
 
     if curr_database is None:
         return {"error": f"No Database in USE"}
-    
-    pattern = r"INSERT\s+INTO\s+(\w+)\s*(\([^)]*\))?\s+VALUES\s*\((.*)\)"
-    match = re.search(pattern, stmt, re.IGNORECASE)
-    if not match:
-        return {"error": f"Invalid INSERT statement: {stmt}"}
-    
-    table_name = match.group(1)
-    values_str = match.group(3)
-
-    db_file = get_metadata_file(curr_database)
-    with open(db_file, 'r') as f:
-        db_content = json.load(f)
+
+    parsed = parse_statement(stmt, params)
+    if "error" in parsed or parsed["type"] != "insert":
+        return {"error": f"Invalid INSERT statement: {parsed.get('error', stmt)}"}
+    return execute_insert(parsed, curr_database)
+
+def execute_insert(parsed, curr_database):
+    """Insert the rows of an already parsed (e.g. prepared) INSERT"""
+    if curr_database is None:
+        return {"error": f"No Database in USE"}
+
+    table_name = parsed["table"]
+    tuples = parsed["rows"]
+
+    # Régi formátumú tábla: átírás típusos sorokra az első írás előtt
+    migration_error = ensure_typed_rows(curr_database, table_name)
+    if migration_error:
+        return migration_error
+
+    db_content = load_catalog(curr_database)
 
     if table_name not in db_content.get("tables", {}):
         return {"error": f"Table '{table_name}' does not exist"}
-    
+
     table_data = db_content["tables"][table_name]
-    columns = table_data["columns"]
-
-    values = []
-    current = ""
-    in_quotes = False #So we can differenciate betweeen {'Alma , Szia'} Or {'ad' , 'adsasd'}
-    for char in values_str:
-        if char == "'" or char == '"':
-            in_quotes = not in_quotes
-            current += char
-        elif char == ',' and not in_quotes:
-            values.append(current.strip())
-            current = ""
-        else:
-            current += char
-    
-    if current:
-        values.append(current.strip())
-    
-    #Clean up the values ("", '')
-    cleaned_values = []
-    for val in values:
-        val = val.strip()
-        if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
-            val = val[1:-1]
-        cleaned_values.append(val)
-    
-    if len(cleaned_values) != len(columns):
-        return {"error": f"Number of values ({len(cleaned_values)}) does not match number of columns ({len(columns)})"}
-    
-    primary_keys = table_data["constraints"]["primary_key"]
-    if not primary_keys:
+    schema = table_schema(table_data)
+    if not schema.primary_keys:
         return {"error": "Table must have a primary key defined"}
-    
-    is_valid, error_message = validate_values(columns, cleaned_values)
-    if not is_valid:
-        return {"error": error_message}
-    
-    key_parts = []
-    for pk in primary_keys:
-        pk_index = next((i for i, col in enumerate(columns) if col["name"] == pk), None)
-        if pk_index is None:
-            return {"error": f"Primary key column '{pk}' not found"}
-        key_parts.append(cleaned_values[pk_index])
-      
-    document_key = "$".join(key_parts) if len(key_parts) > 1 else key_parts[0]
-
-    value_parts = []
-    for i, col in enumerate(columns):
-        if col["name"] not in primary_keys:
-            value_parts.append(cleaned_values[i])
-    
-    document_value = "#".join(value_parts)
-    
-    # Insert into MongoDB
-    return insert_document(curr_database, table_name, document_key, document_value,columns, cleaned_values)
-
-def validate_values(columns, values):
-
-    for i, (col, val) in enumerate(zip(columns, values)):
-        col_type = col["type"].upper()
-
-        # Validate INT type
-        if col_type == "INT":
-            try:
-                int(val)
-            except ValueError:
-                return False, f"Value '{val}' is not a valid INT for column '{col['name']}'"
-        
-        # Validate FLOAT type
-        elif col_type == "FLOAT":
-            try:
-                float(val)
-            except ValueError:
-                return False, f"Value '{val}' is not a valid FLOAT for column '{col['name']}'"
-        
-        # Validate BOOL type
-        elif col_type == "BOOL":
-            if val.upper() not in ["TRUE", "FALSE", "1", "0"]:
-                return False, f"Value '{val}' is not a valid BOOL for column '{col['name']}'"
-        
-        # Validate DATE type
-        elif col_type == "DATE":
-            # Simple date validation
-            date_pattern = r"^\d{4}[.-]\d{2}[.-]\d{2}$"
-            if not re.match(date_pattern, val):
-                return False, f"Value '{val}' is not a valid DATE for column '{col['name']}'"
-        
-        # Validate VARCHAR type
-        elif col_type.startswith("VARCHAR"):
-            # Extract the size limit from VARCHAR(size)
-            size_match = re.match(r"VARCHAR\((\d+)\)", col_type)
-            if size_match:
-                max_size = int(size_match.group(1))
-                if len(val) > max_size:
-                    return False, f"Value '{val}' exceeds maximum length {max_size} for column '{col['name']}'"
-    
-    # All values passed validation
-    return True, ""
+
+    # Oszloplista: az értékek átrendezése a tábla oszlopsorrendjébe
+    if parsed["columns"]:
+        order, error_message = column_order(schema, parsed["columns"])
+        if error_message:
+            return {"error": error_message}
+        tuples = [[values[i] for i in order] if len(values) == len(order) else values for values in tuples]
+
+    # Egy sor: az eredeti, soronkénti útvonal
+    if len(tuples) == 1:
+        row, error_message = check_row(schema, tuples[0])
+        if error_message:
+            return {"error": error_message}
+
+        # Insert into the table store
+        return insert_document(curr_database, table_name, row)
+
+    # Több sor: az egész batch validálása előre, majd bulk írás
+    rows = []
+    parse_errors = []
+    for row_number, values in enumerate(tuples, start=1):
+        row, error_message = check_row(schema, values)
+        if error_message:
+            parse_errors.append({"row": row_number, "error": error_message})
+            continue
+        rows.append({
+            "row": row_number,
+            "key": schema.encode_key(row),
+            "values": row
+        })
+
+    return insert_documents(curr_database, table_name, rows, parse_errors)
+
+def column_order(schema, columns):
+    """Positions in the VALUES tuples of the table columns, for INSERT INTO t (columns) VALUES ..."""
+    for col in columns:
+        if col not in schema.positions:
+            return None, f"Column '{col}' does not exist in table '{schema.table_name}'"
+    if len(set(columns)) != len(columns) or len(columns) != len(schema.column_names):
+        return None, "The column list of an INSERT must name every column exactly once"
+    return [columns.index(name) for name in schema.column_names], None
+
+def check_row(schema, cleaned_values):
+    """Validate and convert one row of text values (column order), returns (typed row, error message)"""
+    if len(cleaned_values) != len(schema.columns):
+        return None, f"Number of values ({len(cleaned_values)}) does not match number of columns ({len(schema.columns)})"
+
+    return schema.parse_row(cleaned_values)
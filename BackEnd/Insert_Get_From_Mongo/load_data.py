@@ -0,0 +1,229 @@
+import re
+import os
+import csv
+import json
+import time
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema
+from BackEnd.Insert_Get_From_Mongo.mongodb import insert_documents
+from BackEnd.Insert_Get_From_Mongo.insert import check_row
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+
+# Streaming betöltés beállítások
+LOAD_BATCH_SIZE = 5000      # Ennyi sor kerül egy bulk írásba
+MAX_REPORTED_ERRORS = 100   # A válaszban visszaadott hibás sorok maximális száma
+
+# Csak az import mappából lehet betölteni (relatív út ehhez képest)
+IMPORT_FOLDER = os.getenv("BGDTSQL_IMPORT_FOLDER") or os.path.abspath(os.path.join(os.path.dirname(__file__), "../../Data/import"))
+
+# Fájlból betöltött soroknál a hibaüzenet nem tartalmazhatja a fájl értékeit
+VALUE_IN_MESSAGE = re.compile(r"((?:[Vv]alue|[Kk]ey)) '.*?'(?= |$)")
+
+def resolve_import_path(file_path):
+    """Real path of an import file, None if it is outside IMPORT_FOLDER"""
+    root = os.path.realpath(IMPORT_FOLDER)
+    path = os.path.realpath(os.path.join(root, file_path))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+def without_values(message):
+    return VALUE_IN_MESSAGE.sub(r"\1", message)
+
+def parse_copy(stmt, curr_database):
+    """
+    COPY table FROM 'file' [WITH (FORMAT CSV|JSONL, HEADER, DELIMITER ';', BATCH_SIZE 1000)]
+    LOAD DATA INFILE 'file' INTO TABLE table [FORMAT CSV|JSONL] [HEADER]
+    """
+    if curr_database is None:
+        return {"error": "No database selected"}
+
+    copy_pattern = r"COPY\s+(\w+)\s+FROM\s+'([^']+)'(?:\s+WITH\s*\((.*)\))?\s*;?\s*$"
+    load_pattern = r"LOAD\s+DATA\s+(?:LOCAL\s+)?INFILE\s+'([^']+)'\s+INTO\s+TABLE\s+(\w+)(.*?)\s*;?\s*$"
+
+    copy_match = re.match(copy_pattern, stmt.strip(), re.IGNORECASE | re.DOTALL)
+    load_match = re.match(load_pattern, stmt.strip(), re.IGNORECASE | re.DOTALL)
+    if copy_match:
+        table_name, file_path, options_str = copy_match.group(1), copy_match.group(2), copy_match.group(3)
+    elif load_match:
+        file_path, table_name, options_str = load_match.group(1), load_match.group(2), load_match.group(3)
+    else:
+        return {"error": f"Invalid COPY / LOAD DATA statement: {stmt}"}
+
+    options = parse_copy_options(options_str or "", file_path)
+    if "error" in options:
+        return options
+
+    if load_catalog(curr_database).get("tables", {}).get(table_name) is None:
+        return {"error": f"Table '{table_name}' does not exist"}
+
+    path = resolve_import_path(file_path)
+    if path is None:
+        return {"error": f"File '{file_path}' is outside the import folder"}
+    if not os.path.isfile(path):
+        return {"error": f"File '{file_path}' not found"}
+
+    migration_error = ensure_typed_rows(curr_database, table_name)
+    if migration_error:
+        return migration_error
+    table_data = load_catalog(curr_database)["tables"][table_name]
+
+    return load_file(curr_database, table_name, table_data, path, options, file_path)
+
+def parse_copy_options(options_str, file_path):
+    options = {
+        "format": "JSONL" if file_path.lower().endswith((".jsonl", ".ndjson", ".json")) else "CSV",
+        "header": False,
+        "delimiter": ",",
+        "batch_size": LOAD_BATCH_SIZE
+    }
+
+    tokens = re.findall(r"'[^']*'|\"[^\"]*\"|[^\s,]+", options_str)
+    i = 0
+    while i < len(tokens):
+        name = tokens[i].upper()
+        value = tokens[i + 1] if i + 1 < len(tokens) else ""
+        i += 1
+
+        if name == "FORMAT":
+            if value.upper() not in ("CSV", "JSONL"):
+                return {"error": f"Unsupported FORMAT '{value}' (CSV or JSONL)"}
+            options["format"] = value.upper()
+            i += 1
+        elif name == "HEADER":
+            # HEADER után opcionális TRUE / FALSE
+            if value.upper() in ("TRUE", "FALSE", "ON", "OFF", "1", "0"):
+                options["header"] = value.upper() in ("TRUE", "ON", "1")
+                i += 1
+            else:
+                options["header"] = True
+        elif name == "DELIMITER":
+            delimiter = value.strip("'\"")
+            if len(delimiter) != 1:
+                return {"error": f"Invalid DELIMITER {value}"}
+            options["delimiter"] = delimiter
+            i += 1
+        elif name == "BATCH_SIZE":
+            if not value.isdigit() or int(value) == 0:
+                return {"error": f"Invalid BATCH_SIZE {value}"}
+            options["batch_size"] = int(value)
+            i += 1
+        else:
+            return {"error": f"Unknown COPY option '{tokens[i - 1]}'"}
+
+    return options
+
+def to_text(value):
+    """JSON érték -> a tárolt szöveges forma"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+def read_records(file_obj, schema, options):
+    """Yields (row number, values in column order or None, error message)"""
+    if options["format"] == "CSV":
+        reader = csv.reader(file_obj, delimiter=options["delimiter"])
+        order = None
+        if options["header"]:
+            header = next(reader, None)
+            if header is None:
+                return
+            header = [name.strip() for name in header]
+            missing = [name for name in schema.column_names if name not in header]
+            if missing:
+                yield 1, None, f"Header is missing columns: {', '.join(missing)}"
+                return
+            order = [header.index(name) for name in schema.column_names]
+
+        for row_number, record in enumerate(reader, start=2 if options["header"] else 1):
+            if not record:
+                continue
+            if order is not None:
+                if len(record) != len(header):
+                    yield row_number, None, f"Number of values ({len(record)}) does not match header ({len(header)})"
+                    continue
+                record = [record[i] for i in order]
+            yield row_number, [value.strip() for value in record], None
+        return
+
+    for row_number, line in enumerate(file_obj, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+
+        if isinstance(record, dict):
+            missing = [name for name in schema.column_names if name not in record]
+            if missing:
+                yield row_number, None, f"Missing columns: {', '.join(missing)}"
+                continue
+            yield row_number, [to_text(record[name]) for name in schema.column_names], None
+        elif isinstance(record, list):
+            yield row_number, [to_text(value) for value in record], None
+        else:
+            yield row_number, None, "Each line must be a JSON object or array"
+
+def load_file(database, table_name, table_data, file_path, options, display_name=None):
+    """Stream the file in bounded batches through the bulk insert path"""
+    schema = table_schema(table_data)
+    start_time = time.time()
+    batch_size = options["batch_size"]
+
+    totals = {"inserted": 0, "failed": 0, "batches": 0}
+    reported_errors = []
+
+    def counts():
+        result = {
+            "inserted_count": totals["inserted"],
+            "failed_count": totals["failed"],
+            "batches": totals["batches"],
+            "elapsed_seconds": round(time.time() - start_time, 3)
+        }
+        if reported_errors:
+            result["errors"] = reported_errors
+        return result
+
+    def flush(rows, parse_errors):
+        result = insert_documents(database, table_name, rows, parse_errors)
+        if "error" in result:
+            # A korábbi batch-ek már be vannak írva: a hiba mellett azok számai is visszamennek
+            return {"error": without_values(result["error"]), **counts()}
+        totals["batches"] += 1
+        totals["inserted"] += result["inserted_count"]
+        totals["failed"] += result.get("failed_count", 0)
+        room = MAX_REPORTED_ERRORS - len(reported_errors)
+        if room > 0:
+            reported_errors.extend({"row": error["row"], "error": without_values(error["error"])}
+                                   for error in result.get("errors", [])[:room])
+        print(f"COPY {table_name}: batch {totals['batches']}, {totals['inserted']} rows inserted in {time.time() - start_time:.2f} seconds")
+        return None
+
+    rows = []
+    parse_errors = []
+    with open(file_path, "r", newline="", encoding="utf-8") as f:
+        for row_number, values, error_message in read_records(f, schema, options):
+            if error_message is None:
+                values, error_message = check_row(schema, values)
+
+            if error_message:
+                parse_errors.append({"row": row_number, "error": error_message})
+            else:
+                rows.append({"row": row_number, "key": schema.encode_key(values), "values": values})
+
+            if len(rows) + len(parse_errors) >= batch_size:
+                error = flush(rows, parse_errors)
+                if error:
+                    return error
+                rows, parse_errors = [], []
+
+    if rows or parse_errors:
+        error = flush(rows, parse_errors)
+        if error:
+            return error
+
+    return {"message": f"{totals['inserted']} rows loaded into '{table_name}' from '{display_name or file_path}'", **counts()}
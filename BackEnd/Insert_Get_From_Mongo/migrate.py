@@ -0,0 +1,106 @@
+import time
+import threading
+from BackEnd.Create.catalog import load_catalog, save_catalog
+from BackEnd.Create.schema import table_schema, ROW_FIELD, ROW_FORMAT
+from BackEnd.Insert_Get_From_Mongo.index_controller import create_mongodb_index
+from BackEnd.Storage.engine import StorageError, get_store
+
+# Régi ('#'-el összefűzött) sorformátum átírása típusos sorokra
+MIGRATE_BATCH_SIZE = 5000   # Ennyi dokumentum kerül egy bulk írásba
+
+_migration_lock = threading.Lock()
+
+def ensure_typed_rows(database, table):
+    """Migrate a table of the old format on first use, returns an error dict or None"""
+    table_data = load_catalog(database).get("tables", {}).get(table)
+    if table_data is None or table_data.get("row_format") == ROW_FORMAT:
+        return None
+
+    with _migration_lock:
+        # Egy másik szál közben már átírhatta
+        table_data = load_catalog(database).get("tables", {}).get(table)
+        if table_data is None or table_data.get("row_format") == ROW_FORMAT:
+            return None
+        result = migrate_table(database, table)
+    return result if "error" in result else None
+
+def migrate_table(database, table):
+    """
+    Rewrite every '#'-joined document of a table as a typed row, then rebuild its indexes
+    (the canonical key text of typed values can differ from the original literal).
+    Documents whose key changes (escaping, '007' -> '7') are inserted under the new key
+    before the old one is deleted; a key collision leaves the old document in place and the
+    table in the old format (error listing the colliding keys, nothing rebuilt).
+    The writes bypass the WAL (wal.commit): the migration is idempotent, an interrupted
+    one is simply re-run on the next use of the table.
+    """
+    start_time = time.time()
+    try:
+        table_data = load_catalog(database)["tables"][table]
+        schema = table_schema(table_data)
+        store = get_store(database, table)
+
+        migrated = 0
+        skipped = []
+        batch = []
+        moved_keys = []
+
+        def flush():
+            nonlocal migrated
+            failures = dict(store.bulk_write(batch))
+            moved = dict(moved_keys)
+            for position, (_, doc) in enumerate(batch):
+                if position in failures:
+                    skipped.append(moved.get(position, doc["_id"]))
+                else:
+                    migrated += 1
+            # A régi kulcs csak sikeres beírás után törlődik
+            old_keys = [old_key for position, old_key in moved_keys if position not in failures]
+            store.bulk_write([("delete", old_key) for old_key in old_keys])
+
+        for doc in store.scan(MIGRATE_BATCH_SIZE):
+            if ROW_FIELD in doc:
+                continue
+            new_doc = schema.encode(schema.decode_legacy(doc))
+            if new_doc["_id"] == doc["_id"]:
+                batch.append(("upsert", new_doc))
+            else:
+                moved_keys.append((len(batch), doc["_id"]))
+                batch.append(("insert", new_doc))
+
+            if len(batch) >= MIGRATE_BATCH_SIZE:
+                flush()
+                batch, moved_keys = [], []
+
+        if batch:
+            flush()
+
+        if skipped:
+            # Ütköző kulcsok: a tábla a régi formátumban marad, amíg a felhasználó fel nem oldja
+            return {"error": f"Cannot migrate table '{table}': keys {', '.join(skipped)} collide with existing keys after canonicalisation",
+                    "migrated_count": migrated, "skipped_keys": skipped}
+
+        # Indexek újraépítése a kanonikus kulcsokkal
+        unique_columns = schema.unique_columns
+        for index in table_data.get("indexes", []):
+            is_unique = index.get("unique", False) or any(col in unique_columns for col in index["columns"])
+            index_result = create_mongodb_index(database, table, index["name"], index["columns"], is_unique)
+            if "error" in index_result:
+                return index_result
+
+        db_content = load_catalog(database, for_update=True)
+        db_content["tables"][table]["row_format"] = ROW_FORMAT
+        save_catalog(database, db_content)
+
+        elapsed = round(time.time() - start_time, 3)
+        print(f"Table {table}: {migrated} rows migrated to typed rows in {elapsed} seconds")
+        return {
+            "message": f"Table '{table}' migrated to typed rows",
+            "migrated_count": migrated,
+            "elapsed_seconds": elapsed
+        }
+
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Error migrating table: {str(e)}"}
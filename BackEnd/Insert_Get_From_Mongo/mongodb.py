@@ -1,31 +1,46 @@
-from pymongo import MongoClient, errors
-import json
-from BackEnd.Create.database import get_metadata_file
-from BackEnd.Insert_Get_From_Mongo.index_controller import extract_values_to_dict, update_indexes
-from BackEnd.Insert_Get_From_Mongo.db_connection import client, get_db_collection
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema, key_text, key_prefix
+from BackEnd.Insert_Get_From_Mongo.index_controller import extract_values_to_dict, index_operations
+from BackEnd.Storage.engine import StorageError, get_store, get_index_store
+from BackEnd.Storage.columnar import append_columnar_rows, delete_columnar_row
+from BackEnd.Insert_Get_From_Mongo.zone_map import update_zone_map
+from BackEnd.Insert_Get_From_Mongo.bloom_filter import update_bloom_filters
+from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+from BackEnd.Storage.wal import commit
 
 
 def validate_unique_key(database, table, column_name, value, table_data, columns, all_values):
-    collection = get_db_collection(database, table)
-    
-    # Meghatározzuk az oszlop pozícióját a nem-pk oszlopok között
-    non_pk_columns = [col["name"] for col in columns if col["name"] not in table_data["constraints"]["primary_key"]]
-    col_idx = non_pk_columns.index(column_name)
-    
-    # Ellenőrizzük minden dokumentumban
-    cursor = collection.find()
-    for doc in cursor:
-        values_array = doc["value"].split("#")
-        if col_idx < len(values_array) and values_array[col_idx] == value:
+    schema = table_schema(table_data)
+
+    # Index alapú ellenőrzés: egyetlen kulcs szerinti keresés
+    index_name = schema.unique_indexes.get(column_name)
+    if index_name:
+        if get_index_store(database, table, index_name).existing_keys([key_text(value)]):
+            return False, f"Unique constraint violation: value '{value}' already exists for column '{column_name}'"
+        return True, ""
+
+    # Régi táblák (UNIQUE index nélkül): ellenőrizzük minden dokumentumban
+    for doc in get_store(database, table).scan():
+        if schema.decode_column(doc, column_name) == value:
             return False, f"Unique constraint violation: value '{value}' already exists for column '{column_name}'"
 
     return True, ""
 
 def validate_primary_key(database, table, primary_key):
 
-    collection = get_db_collection(database, table)
-    existing_doc = collection.find_one({"_id": primary_key})
-    return existing_doc is None
+    return not get_store(database, table).existing_keys([primary_key])
+
+def referenced_value_exists(database, referenced_table, ref_table_data, referenced_column, value):
+    """Does the referenced table have a row with value in referenced_column (a primary key column)"""
+    ref_schema = table_schema(ref_table_data)
+    store = get_store(database, referenced_table)
+    if not ref_schema.composite_key:
+        return bool(store.existing_keys([key_text(value)]))
+
+    # Composite PK: az első kulcsoszlopra kulcs-prefix szerinti range scan, egyébként bejárás
+    if ref_schema.primary_keys[0] == referenced_column:
+        return next(store.range_scan(prefix=key_prefix(value)), None) is not None
+    return any(ref_schema.decode_column(doc, referenced_column) == value for doc in store.scan())
 
 def validate_foreign_key(database, table_data, column_name, value):
 
@@ -35,8 +50,7 @@ def validate_foreign_key(database, table_data, column_name, value):
             referenced_column = fk["references"]["column"]
             
             # Load referenced table metadata
-            with open(get_metadata_file(database), 'r') as f:
-                db_content = json.load(f)
+            db_content = load_catalog(database)
             
             if referenced_table not in db_content.get("tables", {}):
                 return False, f"Referenced table '{referenced_table}' does not exist"
@@ -49,99 +63,269 @@ def validate_foreign_key(database, table_data, column_name, value):
                 return False, f"Referenced column '{referenced_column}' is not a primary key in '{referenced_table}'"
             
             # Check if value exists in referenced table
-            ref_collection = get_db_collection(database, referenced_table)
-            # In case of composite primary key, need to find where one part matches
-            if len(ref_pk) > 1:
-                exists = ref_collection.find_one({"_id": {"$regex": f".*{value}.*"}})
-            else:
-                exists = ref_collection.find_one({"_id": value})
-            if not exists:
+            if not referenced_value_exists(database, referenced_table, ref_table_data, referenced_column, value):
                 return False, f"Foreign key constraint failed: value '{value}' not found in '{referenced_table}.{referenced_column}'"
     
     return True, ""
 
-def insert_document(database, table, key, values, columns=None, all_values=None):
+def insert_document(database, table, values):
+    """Insert one typed row (column order) after the key and constraint checks"""
     try:
+        ensure_recovered(database)
+
         # Load table metadata
-        with open(get_metadata_file(database), 'r') as f:
-            db_content = json.load(f)
+        db_content = load_catalog(database)
         
         if table not in db_content.get("tables", {}):
             return {"error": f"Table '{table}' does not exist"}
         
         table_data = db_content["tables"][table]
-        
-        # Get columns if not provided
-        if columns is None:
-            columns = table_data["columns"]
+        columns = table_data["columns"]
+        schema = table_schema(table_data)
+        key = schema.encode_key(values)
         
         # Validate primary key uniqueness
         if not validate_primary_key(database, table, key):
             return {"error": f"Primary key '{key}' already exists in table '{table}'"}
         
-        # If all values are provided, validate foreign keys
-        if all_values is not None:
-           
-            for i, col in enumerate(columns):
-                col_name = col["name"]
-                col_value = all_values[i]
-                
-                # Check unique constraints
-                if col_name in table_data["constraints"].get("unique_key", []):
-                    is_valid, error_message = validate_unique_key(database, table, col_name, col_value, table_data, columns, all_values)
-                    if not is_valid:
-                        return {"error": error_message}
-
-                # Check foreign key constraints
-                is_valid, error_message = validate_foreign_key(database, table_data, col_name, col_value)
+        for i, col in enumerate(columns):
+            col_name = col["name"]
+            col_value = values[i]
+            
+            # Check unique constraints
+            if col_name in table_data["constraints"].get("unique_key", []):
+                is_valid, error_message = validate_unique_key(database, table, col_name, col_value, table_data, columns, values)
                 if not is_valid:
                     return {"error": error_message}
+
+            # Check foreign key constraints
+            is_valid, error_message = validate_foreign_key(database, table_data, col_name, col_value)
+            if not is_valid:
+                return {"error": error_message}
         
-        # Create the document
-        doc = {
-            "_id": key,
-            "value": values
-        }
-        
-        # Insert into the main collection
-        collection = get_db_collection(database, table)
-        result = collection.insert_one(doc)
-
-        if all_values is not None and columns is not None:
-            column_dict = {}
-            for i, col in enumerate(columns):
-                column_dict[col["name"]] = all_values[i]
-            
-        # Update all indexes
-        update_indexes(database, table, 'insert', key, column_dict)
+        column_dict = dict(zip(schema.column_names, values))
+        index_ops, error = index_operations(database, table, 'insert', [(key, column_dict)])
+        if error:
+            return error
+
+        def after_apply(failures):
+            if failures:
+                return
+            update_zone_map(database, table, table_data, 'insert', [(key, values)])
+            update_bloom_filters(database, table, table_data, 'insert', [values])
+
+            # Oszlopos tábla: a szegmensek bővítése (a jelzőt a katalógusból ellenőrzi)
+            append_columnar_rows(database, table, schema, [values])
+
+        # The typed row and all of its index entries as one write-ahead log record
+        failures = commit(database, table, [(table, "insert", schema.encode(values))] + index_ops, after_apply)
+        if failures:
+            return {"error": f"Storage error: {failures[0][1]}"}
 
         return {
-            "message": f"Document inserted with ID {result.inserted_id}",
-            "id": result.inserted_id
+            "message": f"Document inserted with ID {key}",
+            "id": key
         }
     
-    except errors.PyMongoError as e:
-        return {"error": f"MongoDB error: {str(e)}"}
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     except Exception as e:
         return {"error": f"Error inserting document: {str(e)}"}
 
+def validate_unique_keys_bulk(database, table, schema, rows):
+    """UNIQUE check for a whole batch, returns {row number: error message}"""
+    row_errors = {}
+    if not schema.unique_columns:
+        return row_errors
+
+    existing_values = {}
+    scan_columns = []
+    for col in schema.unique_columns:
+        index_name = schema.unique_indexes.get(col)
+        if index_name:
+            # Egy $in lekérdezés a UNIQUE index kollekción
+            pos = schema.positions[col]
+            existing_values[col] = get_index_store(database, table, index_name).existing_keys({key_text(row["values"][pos]) for row in rows})
+        else:
+            existing_values[col] = set()
+            scan_columns.append(col)
+
+    # Index nélküli UNIQUE oszlopok: egyetlen táblabejárás a batch-re
+    if scan_columns:
+        for doc in get_store(database, table).scan():
+            row = schema.decode(doc)
+            for col in scan_columns:
+                existing_values[col].add(key_text(row[schema.positions[col]]))
+
+    for col in schema.unique_columns:
+        pos = schema.positions[col]
+        seen = existing_values[col]
+        for row in rows:
+            if row["row"] in row_errors:
+                continue
+            value = key_text(row["values"][pos])
+            if value in seen:
+                row_errors[row["row"]] = f"Unique constraint violation: value '{value}' already exists for column '{col}'"
+            else:
+                seen.add(value)
+
+    return row_errors
+
+def validate_foreign_keys_bulk(database, schema, rows):
+    """FOREIGN KEY check for a whole batch, returns {row number: error message}"""
+    row_errors = {}
+    db_content = load_catalog(database)
+
+    for fk in schema.foreign_keys:
+        column_name = fk["column"]
+        referenced_table = fk["references"]["table"]
+        referenced_column = fk["references"]["column"]
+        pos = schema.positions[column_name]
+
+        ref_table_data = db_content.get("tables", {}).get(referenced_table)
+        if ref_table_data is None:
+            for row in rows:
+                row_errors.setdefault(row["row"], f"Referenced table '{referenced_table}' does not exist")
+            continue
+
+        ref_pk = ref_table_data["constraints"]["primary_key"]
+        # Kulcs szöveg -> típusos érték
+        values = {key_text(row["values"][pos]): row["values"][pos] for row in rows}
+
+        if len(ref_pk) > 1:
+            # Composite PK: értékenkénti ellenőrzés (kulcs-prefix range scan)
+            found = set()
+            for text, value in values.items():
+                is_valid, _ = validate_foreign_key(database, {"constraints": {"foreign_keys": [fk]}}, column_name, value)
+                if is_valid:
+                    found.add(text)
+        else:
+            found = get_store(database, referenced_table).existing_keys(values)
+
+        for row in rows:
+            value = row["values"][pos]
+            if key_text(value) not in found:
+                row_errors.setdefault(row["row"], f"Foreign key constraint failed: value '{value}' not found in '{referenced_table}.{referenced_column}'")
+
+    return row_errors
+
+def insert_documents(database, table, rows, parse_errors=None):
+    """
+    Bulk insert of already parsed rows ({"row", "key", "values"} with typed values).
+    The whole batch is validated up front and logged as one write-ahead log record, then
+    written with one unordered bulk write and one bulk write per index collection.
+    Failed rows are reported in "errors" by their position in the statement.
+    """
+    failed_rows = list(parse_errors or [])
+    try:
+        ensure_recovered(database)
+
+        db_content = load_catalog(database)
+
+        if table not in db_content.get("tables", {}):
+            return {"error": f"Table '{table}' does not exist"}
+
+        schema = table_schema(db_content["tables"][table])
+        store = get_store(database, table)
+
+        # Primary key: duplikátum a batch-en belül és a táblában
+        row_errors = {}
+        seen_keys = set()
+        existing_keys = store.existing_keys({row["key"] for row in rows})
+        for row in rows:
+            if row["key"] in existing_keys or row["key"] in seen_keys:
+                row_errors[row["row"]] = f"Primary key '{row['key']}' already exists in table '{table}'"
+            else:
+                seen_keys.add(row["key"])
+
+        valid_rows = [row for row in rows if row["row"] not in row_errors]
+        for check in (validate_unique_keys_bulk(database, table, schema, valid_rows),
+                      validate_foreign_keys_bulk(database, schema, valid_rows)):
+            row_errors.update(check)
+            valid_rows = [row for row in valid_rows if row["row"] not in row_errors]
+
+        inserted_rows = []
+        if valid_rows:
+            entries = [(row["key"], dict(zip(schema.column_names, row["values"]))) for row in valid_rows]
+            index_ops, error = index_operations(database, table, 'insert', entries)
+            if error:
+                return error
+
+            def after_apply(failures):
+                failed = dict(failures)
+                for i, row in enumerate(valid_rows):
+                    if i in failed:
+                        row_errors[row["row"]] = f"Storage error: {failed[i]}"
+                    else:
+                        inserted_rows.append(row)
+                if not inserted_rows:
+                    return
+
+                update_zone_map(database, table, db_content["tables"][table], 'insert',
+                                [(row["key"], row["values"]) for row in inserted_rows])
+                update_bloom_filters(database, table, db_content["tables"][table], 'insert',
+                                     [row["values"] for row in inserted_rows])
+
+                append_columnar_rows(database, table, schema, [row["values"] for row in inserted_rows])
+
+            # Sorok és index bejegyzések: egy log rekord, egy bulk írás kollekciónként
+            row_ops = [(table, "insert", schema.encode(row["values"])) for row in valid_rows]
+            commit(database, table, row_ops + index_ops, after_apply)
+
+        for row_number, message in row_errors.items():
+            failed_rows.append({"row": row_number, "error": message})
+        failed_rows.sort(key=lambda err: err["row"])
+
+        result = {
+            "message": f"{len(inserted_rows)} rows inserted into '{table}'",
+            "inserted_count": len(inserted_rows)
+        }
+        if failed_rows:
+            result["failed_count"] = len(failed_rows)
+            result["errors"] = failed_rows
+        return result
+
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Error inserting documents: {str(e)}"}
+
+def has_referencing_rows(database, child_table, child_table_data, fk_column, value):
+    """Does any row of child_table reference value through fk_column"""
+    schema = table_schema(child_table_data)
+
+    # Fordított FK index: egyetlen kulcs szerinti keresés
+    index_name = schema.column_indexes.get(fk_column)
+    if index_name:
+        return bool(get_index_store(database, child_table, index_name).existing_keys([key_text(value)]))
+
+    # Régi táblák (FK index nélkül): a gyerek tábla bejárása
+    for doc in get_store(database, child_table).scan():
+        if schema.decode_column(doc, fk_column) == value:
+            return True
+    return False
+
 def delete_document(database, table, key):
 
     try:
+        ensure_recovered(database)
+
         # Load database metadata
-        with open(get_metadata_file(database), 'r') as f:
-            db_content = json.load(f)
+        db_content = load_catalog(database)
         
         if table not in db_content.get("tables", {}):
             return {"error": f"Table '{table}' does not exist"}
         
         # Check if document exists
-        collection = get_db_collection(database, table)
-        document = collection.find_one({"_id": key})
+        store = get_store(database, table)
+        document = store.get(key)
         
         if not document:
             return {"error": f"Document with key '{key}' not found"}
         
+        table_data = db_content["tables"][table]
+        values_dict = extract_values_to_dict(document, table_data)
+        
         # Check if other tables reference this table (foreign key constraint)
         for other_table_name, other_table_data in db_content.get("tables", {}).items():
             if other_table_name == table:
@@ -149,33 +333,32 @@ def delete_document(database, table, key):
                 
             for fk in other_table_data.get("constraints", {}).get("foreign_keys", []):
                 if fk["references"]["table"] == table:
-                    # Check for references in the other table
-                    other_collection = get_db_collection(database, other_table_name)
-                    # Search for documents that might reference this key
-                    for doc in other_collection.find():
-                        values = doc["_id"].split("$")
-                        if key in values:
-                            return {
-                                "error": f"Cannot delete: row is referenced by table '{other_table_name}'"
-                            }
+                    referenced_value = values_dict[fk["references"]["column"]]
+                    if has_referencing_rows(database, other_table_name, other_table_data, fk["column"], referenced_value):
+                        return {
+                            "error": f"Cannot delete: row is referenced by table '{other_table_name}'"
+                        }
         
-        table_data = db_content["tables"][table]
-        values_dict = extract_values_to_dict(document, table_data)
-        # Delete the document
-        result = collection.delete_one({"_id": key})
+        index_ops, error = index_operations(database, table, 'delete', [(key, values_dict)])
+        if error:
+            return error
 
-        
-        if result.deleted_count > 0:
-            # Update all indexes
-            update_indexes(database, table, 'delete', key, values_dict)
-            
-            return {
-                "message": f"Document with key '{key}' deleted successfully",
-                "deleted_count": result.deleted_count
-            }
+        def after_apply(failures):
+            update_zone_map(database, table, table_data, 'delete', [(key, None)])
+            update_bloom_filters(database, table, table_data, 'delete', [table_schema(table_data).decode(document)])
+
+            delete_columnar_row(database, table, table_schema(table_data), key)
+
+        # Delete the document and its index entries (one write-ahead log record)
+        commit(database, table, [(table, "delete", key)] + index_ops, after_apply)
+
+        return {
+            "message": f"Document with key '{key}' deleted successfully",
+            "deleted_count": 1
+        }
     
     
-    except errors.PyMongoError as e:
-        return {"error": f"MongoDB error: {str(e)}"}
+    except StorageError as e:
+        return {"error": f"Storage error: {str(e)}"}
     except Exception as e:
         return {"error": f"Error deleting document: {str(e)}"}
\ No newline at end of file
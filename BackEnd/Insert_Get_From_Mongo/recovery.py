@@ -0,0 +1,63 @@
+import threading
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema
+from BackEnd.Storage.engine import StorageError, get_store
+from BackEnd.Storage.wal import replay_wal
+from BackEnd.Storage.columnar import build_columnar
+from BackEnd.Insert_Get_From_Mongo.zone_map import build_zone_map, ZONE_MAP_FLAG
+
+# Crash recovery: the write-ahead log is replayed once per process, before the first write.
+# Only the stores (rows and indexes) are logged; the derived structures of the replayed
+# tables (zone map, columnar segments) are rebuilt from the recovered rows.
+# A database whose engine is unreachable is skipped (the others stay usable) and its
+# records are replayed by the first statement that uses it once the engine is back.
+
+_recovered = False
+_pending = set()   # Adatbázisok, amelyek rekordjai még nincsenek visszajátszva
+_recovery_lock = threading.Lock()
+
+def table_exists(database, table):
+    try:
+        return table in load_catalog(database).get("tables", {})
+    except FileNotFoundError:
+        return False
+
+def rebuild_derived(replayed):
+    """Zone map and columnar segments of the replayed tables, returns the databases that failed"""
+    failed = set()
+    for database, table in replayed:
+        if not table_exists(database, table):
+            continue
+        try:
+            table_data = load_catalog(database)["tables"][table]
+            if table_data.get(ZONE_MAP_FLAG):
+                build_zone_map(database, table, table_data)
+            schema = table_schema(table_data)
+            if schema.columnar:
+                build_columnar(database, table, schema, get_store(database, table))
+        except StorageError as e:
+            print(f"Rebuilding '{database}.{table}' after replay failed: {e}")
+            failed.add(database)
+    return failed
+
+def ensure_recovered(database=None):
+    """
+    Replay the write-ahead log once per process. When database is given and its records
+    were skipped (engine unavailable), they are replayed now; StorageError if that fails.
+    """
+    global _recovered
+    if _recovered and database not in _pending:
+        return
+    with _recovery_lock:
+        if not _recovered:
+            replayed, skipped = replay_wal(table_exists)
+            _pending.update(skipped | rebuild_derived(replayed))
+            if replayed:
+                print(f"Write-ahead log replayed for {len(replayed)} tables")
+            _recovered = True
+
+        if database in _pending:
+            replayed, skipped = replay_wal(table_exists, {database})
+            if skipped or rebuild_derived(replayed):
+                raise StorageError(f"Database '{database}' is not recovered yet, its storage engine is unavailable")
+            _pending.discard(database)
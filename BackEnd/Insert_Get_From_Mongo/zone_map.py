@@ -0,0 +1,231 @@
+import bisect
+import threading
+from BackEnd.Create.catalog import load_catalog, save_catalog
+from BackEnd.Create.schema import table_schema
+from BackEnd.Storage.engine import StorageError, get_store, zone_map_collection_name
+
+# Zone map: per-block min / max of the INT, FLOAT and DATE columns of a table.
+# A block is a contiguous _id range: it holds the keys from its low key up to the next
+# block's low key (the first block has low key "" and covers everything below).
+# Entries: {"_id": low key, "count": rows, "min": {column: value}, "max": {column: value}},
+# a None bound means the block cannot be pruned on that column (e.g. untyped old values).
+# Deletes only decrease the count: the min / max stay a valid (wider) bound.
+
+ZONE_BLOCK_SIZE = 1024      # Sorok száma egy blokkban építéskor / felosztáskor
+ZONE_COLUMN_TYPES = ("INT", "FLOAT", "DATE")
+ZONE_MAP_FLAG = "zone_map"  # Katalógus jelző: a tábla zone map-je fel van építve és karban van tartva
+FIRST_BLOCK = ""
+
+# Blokk kizárása: (min, max, literál) -> lehet-e a blokkban illeszkedő sor
+PRUNE_TESTS = {
+    "=": lambda low, high, target: low <= target <= high,
+    ">": lambda low, high, target: high > target,
+    ">=": lambda low, high, target: high >= target,
+    "<": lambda low, high, target: low < target,
+    "<=": lambda low, high, target: low <= target
+}
+
+_zone_maps = {}     # (database, table) -> ZoneMap
+_zone_lock = threading.RLock()
+
+def zone_columns(schema):
+    return [name for name, col_type in schema.column_types.items() if col_type in ZONE_COLUMN_TYPES]
+
+def zone_value(col_type, value):
+    """Value as tracked in the zone map (compared like compare_values does), None if not trackable"""
+    if col_type == "DATE":
+        return value.strip() if isinstance(value, str) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+def empty_block(low):
+    return {"_id": low, "count": 0, "min": {}, "max": {}}
+
+def add_to_block(block, schema, columns, row):
+    block["count"] += 1
+    for name in columns:
+        value = zone_value(schema.column_types[name], row[schema.positions[name]])
+        if value is None or (name in block["min"] and block["min"][name] is None):
+            block["min"][name] = block["max"][name] = None
+        elif name not in block["min"]:
+            block["min"][name] = block["max"][name] = value
+        elif value < block["min"][name]:
+            block["min"][name] = value
+        elif value > block["max"][name]:
+            block["max"][name] = value
+
+def stored_block(block):
+    # Másolat: a tároló ne ossza meg a gyorsítótárban módosított dict-eket
+    return {"_id": block["_id"], "count": block["count"], "min": dict(block["min"]), "max": dict(block["max"])}
+
+class ZoneMap:
+    def __init__(self, entries):
+        self.blocks = {entry["_id"]: entry for entry in entries}
+        if FIRST_BLOCK not in self.blocks:
+            self.blocks[FIRST_BLOCK] = empty_block(FIRST_BLOCK)
+        self.lows = sorted(self.blocks)
+
+    def block_of(self, key):
+        return self.blocks[self.lows[bisect.bisect_right(self.lows, key) - 1]]
+
+    def next_low(self, low):
+        i = bisect.bisect_left(self.lows, low) + 1
+        return self.lows[i] if i < len(self.lows) else None
+
+    def add(self, block):
+        if block["_id"] not in self.blocks:
+            bisect.insort(self.lows, block["_id"])
+        self.blocks[block["_id"]] = block
+
+    def remove(self, low):
+        del self.blocks[low]
+        self.lows.remove(low)
+
+def get_zone_map(database, table):
+    with _zone_lock:
+        zone_map = _zone_maps.get((database, table))
+        if zone_map is None:
+            zone_map = ZoneMap(get_store(database, zone_map_collection_name(table)).scan())
+            _zone_maps[(database, table)] = zone_map
+        return zone_map
+
+def write_blocks(database, table, operations):
+    failures = get_store(database, zone_map_collection_name(table)).bulk_write(operations, ordered=False)
+    if failures:
+        raise StorageError(f"Zone map write failed: {failures[0][1]}")
+
+def blocks_from_docs(schema, columns, docs, first_low):
+    """Key-ordered documents -> blocks of ZONE_BLOCK_SIZE rows (the first one keeps first_low)"""
+    blocks = []
+    block = None
+    for doc in docs:
+        if block is None or block["count"] >= ZONE_BLOCK_SIZE:
+            block = empty_block(first_low if block is None else doc["_id"])
+            blocks.append(block)
+        add_to_block(block, schema, columns, schema.decode(doc))
+    return blocks or [empty_block(first_low)]
+
+def split_block(database, table, schema, columns, zone_map, low):
+    """Re-summarize an overfull block from its rows, split into ZONE_BLOCK_SIZE pieces"""
+    high = zone_map.next_low(low)
+    docs = get_store(database, table).range_scan(low=low or None, high=high, include_high=False)
+    blocks = blocks_from_docs(schema, columns, docs, low)
+    for block in blocks:
+        zone_map.add(block)
+    return [("upsert", stored_block(block)) for block in blocks]
+
+def update_zone_map(database, table, table_data, operation, entries):
+    """Zone map maintenance for inserted / deleted rows: entries is a list of (key, typed row)"""
+    schema = table_schema(table_data)
+    columns = zone_columns(schema)
+    if not columns:
+        return
+
+    with _zone_lock:
+        # A hívó katalógusa régebbi lehet: egy SELECT közben felépíthette a zone map-et,
+        # ezért a jelző a build_zone_map-pel közös zár alatt a katalógusból is ellenőrizve
+        if not table_data.get(ZONE_MAP_FLAG) and not load_catalog(database)["tables"].get(table, {}).get(ZONE_MAP_FLAG):
+            return
+        zone_map = get_zone_map(database, table)
+        touched = {}
+        for key, row in entries:
+            block = zone_map.block_of(key)
+            if operation == "insert":
+                add_to_block(block, schema, columns, row)
+            else:
+                block["count"] = max(block["count"] - 1, 0)
+            touched[block["_id"]] = block
+
+        operations = []
+        for low, block in touched.items():
+            if block["count"] == 0 and low != FIRST_BLOCK:
+                # Üres blokk: a tartományát az előző blokk veszi át
+                zone_map.remove(low)
+                operations.append(("delete", low))
+            elif block["count"] > 2 * ZONE_BLOCK_SIZE:
+                operations.extend(split_block(database, table, schema, columns, zone_map, low))
+            else:
+                operations.append(("upsert", stored_block(block)))
+        write_blocks(database, table, operations)
+
+def build_zone_map(database, table, table_data):
+    """(Re)build the zone map of a table from a key-ordered scan, then mark it in the catalog"""
+    schema = table_schema(table_data)
+    columns = zone_columns(schema)
+    with _zone_lock:
+        blocks = blocks_from_docs(schema, columns, get_store(database, table).range_scan(), FIRST_BLOCK)
+        get_store(database, zone_map_collection_name(table)).clear()
+        write_blocks(database, table, [("upsert", stored_block(block)) for block in blocks])
+        _zone_maps[(database, table)] = ZoneMap(blocks)
+
+        db_content = load_catalog(database, for_update=True)
+        db_content["tables"][table][ZONE_MAP_FLAG] = True
+        save_catalog(database, db_content)
+    print(f"Zone map of '{table}' built: {len(blocks)} blocks")
+
+def drop_zone_map(database, table=None):
+    """Forget the cached zone map of a table (or of every table of the database)"""
+    with _zone_lock:
+        for entry in [entry for entry in _zone_maps if entry[0] == database and (table is None or entry[1] == table)]:
+            del _zone_maps[entry]
+
+def prune_target(schema, cond):
+    """Zone map comparable literal of a condition, None if the condition cannot prune"""
+    col_type = schema.column_types.get(cond["column"])
+    if col_type not in ZONE_COLUMN_TYPES or cond["op"] not in PRUNE_TESTS or not isinstance(cond["value"], str):
+        return None
+    if col_type == "DATE":
+        # A dátum literál szövegként hasonlít (mint a compare_values-ban)
+        return cond["value"].strip()
+    return zone_value(col_type, schema.literal(cond["column"], cond["value"].strip()))
+
+def block_may_match(block, column, op, target):
+    low = block["min"].get(column)
+    high = block["max"].get(column)
+    if low is None or high is None:
+        return True
+    try:
+        return PRUNE_TESTS[op](low, high, target)
+    except TypeError:
+        return True
+
+def candidate_ranges(database, table, table_data, conditions):
+    """
+    Key ranges [(low, high), ...] (low inclusive, high exclusive, None = open) of the blocks
+    that can hold rows matching the range / equality conditions, None when no condition prunes
+    """
+    schema = table_schema(table_data)
+    prunable = []
+    for cond in conditions:
+        target = prune_target(schema, cond)
+        if target is not None:
+            prunable.append((cond["column"], cond["op"], target))
+    if not prunable:
+        return None
+
+    if not table_data.get(ZONE_MAP_FLAG):
+        # Régebbi tábla: a zone map az első tartomány lekérdezéskor épül fel
+        with _zone_lock:
+            if not load_catalog(database)["tables"][table].get(ZONE_MAP_FLAG):
+                build_zone_map(database, table, table_data)
+
+    with _zone_lock:
+        zone_map = get_zone_map(database, table)
+        ranges = []
+        for low in zone_map.lows:
+            block = zone_map.blocks[low]
+            if block["count"] == 0 or not all(block_may_match(block, *cond) for cond in prunable):
+                continue
+            high = zone_map.next_low(low)
+            if ranges and ranges[-1][1] == low:
+                ranges[-1] = (ranges[-1][0], high)
+            else:
+                ranges.append((low or None, high))
+        print(f"DEBUG: Zone map of '{table}': {len(ranges)} key ranges from {len(zone_map.lows)} blocks")
+        return ranges
+
+def scan_ranges(store, ranges):
+    """Documents of the given key ranges"""
+    for low, high in ranges:
+        yield from store.range_scan(low=low, high=high, include_high=False)
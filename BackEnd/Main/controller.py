@@ -3,11 +3,22 @@ import os
 import json
 from BackEnd.Create.table import parse_create_table
 from BackEnd.Create.database import create_database, get_metadata_file
-from BackEnd.Insert_Get_From_Mongo.insert import parse_insert
-from BackEnd.Insert_Get_From_Mongo.delete import parse_delete
+from BackEnd.Create.catalog import load_catalog, save_catalog
+from BackEnd.Insert_Get_From_Mongo.insert import parse_insert, execute_insert
+from BackEnd.Insert_Get_From_Mongo.delete import parse_delete, execute_delete
+from BackEnd.Insert_Get_From_Mongo.load_data import parse_copy
 from BackEnd.Create.drop import *
 from BackEnd.Create.index import parse_create_index
-from BackEnd.Select.select import parse_select
+from BackEnd.Create.alter import parse_alter_table
+from BackEnd.Create.analyze import parse_analyze
+from BackEnd.Select.select import parse_select, run_select
+from BackEnd.Storage.engine import ENGINE_NAMES, DEFAULT_ENGINE, StorageError
+from BackEnd.Storage.buffer_pool import buffer_pool_stats
+from BackEnd.Storage.index_cache import index_cache_stats
+from BackEnd.Storage.wal import get_wal
+from BackEnd.Parser.plan_cache import plan_cache_stats
+from BackEnd.Parser.prepared import compile_statement, prepare_statement, get_prepared_statement, deallocate_statement
+from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
 
 # Function to remove SQL comments from statements
 def remove_sql_comments(sql_statement):
@@ -30,12 +41,24 @@ def process_statement(stmt, current_database):
     # If after removing comments the statement is empty, return
     if not clean_stmt:
         return {"message": "Empty statement after removing comments"}
+
+    # Első utasítás előtt a write-ahead log visszajátszása (leállás utáni helyreállítás);
+    # az aktuális adatbázisnak csak az őt használó utasításokhoz kell helyreállnia
+    stmt_upper = clean_stmt.upper()
+    uses_database = not stmt_upper.startswith(("CREATE DATABASE", "USE", "DROP DATABASE", "SHOW"))
+    try:
+        ensure_recovered(current_database if uses_database else None)
+    except StorageError as e:
+        return {"error": f"Storage error: {e}"}
     
     def create_db():
-        match = re.search(r'CREATE DATABASE (\w+)', clean_stmt, re.IGNORECASE)
+        match = re.search(r'CREATE DATABASE (\w+)(?:\s+ENGINE\s*=?\s*(\w+))?\s*;?\s*$', clean_stmt, re.IGNORECASE)
         if match:
             dbname = match.group(1)
-            return create_database(dbname)
+            engine = (match.group(2) or DEFAULT_ENGINE).lower()
+            if engine not in ENGINE_NAMES:
+                return {"error": f"Unknown storage engine '{match.group(2)}' ({', '.join(ENGINE_NAMES)})"}
+            return create_database(dbname, engine)
         return {"error": f"Invalid CREATE DATABASE statement: {clean_stmt}"}
 
     def use_db():
@@ -59,16 +82,13 @@ def process_statement(stmt, current_database):
         if "error" in table_data:
             return table_data
 
-        db_file = get_metadata_file(current_database)
         try:
-            with open(db_file, 'r') as f:
-                db_content = json.load(f)
+            db_content = load_catalog(current_database, for_update=True)
 
             table_name = table_data["table_name"]
             db_content["tables"][table_name] = table_data
 
-            with open(db_file, 'w') as f:
-                json.dump(db_content, f, indent=4)
+            save_catalog(current_database, db_content)
 
             return {"message": f"Table '{table_name}' created in '{current_database}'"}
         except FileNotFoundError:
@@ -95,9 +115,29 @@ def process_statement(stmt, current_database):
     
     def create_index():
         return parse_create_index(clean_stmt, current_database)
+
+    def copy_data():
+        return parse_copy(clean_stmt, current_database)
+
+    def alter_table():
+        return parse_alter_table(clean_stmt, current_database)
+
+    def analyze():
+        return parse_analyze(clean_stmt, current_database)
+
+    def show_buffer_pool():
+        return {"message": "Buffer pool statistics", **buffer_pool_stats()}
+
+    def show_index_cache():
+        return {"message": "Index cache statistics", **index_cache_stats()}
+
+    def show_wal():
+        return {"message": "Write-ahead log statistics", **get_wal().stats()}
+
+    def show_plan_cache():
+        return {"message": "Plan cache statistics", **plan_cache_stats()}
     
     # Determine the command type and call the appropriate function
-    stmt_upper = clean_stmt.upper()
     if stmt_upper.startswith("CREATE DATABASE"):
         return create_db()
     elif stmt_upper.startswith("USE"):
@@ -106,6 +146,10 @@ def process_statement(stmt, current_database):
         return create_table()
     elif stmt_upper.startswith("CREATE INDEX"):
         return create_index()
+    elif stmt_upper.startswith("ALTER TABLE"):
+        return alter_table()
+    elif stmt_upper.startswith("ANALYZE"):
+        return analyze()
     elif stmt_upper.startswith("DROP TABLE"):
         return drop_table()
     elif stmt_upper.startswith("DROP DATABASE"):
@@ -114,14 +158,99 @@ def process_statement(stmt, current_database):
         return insert_data()
     elif stmt_upper.startswith("DELETE FROM"):
         return delete_data()
+    elif stmt_upper.startswith("COPY") or stmt_upper.startswith("LOAD DATA"):
+        return copy_data()
+    elif stmt_upper.startswith("SHOW BUFFER POOL"):
+        return show_buffer_pool()
+    elif stmt_upper.startswith("SHOW INDEX CACHE"):
+        return show_index_cache()
+    elif stmt_upper.startswith("SHOW WAL"):
+        return show_wal()
+    elif stmt_upper.startswith("SHOW PLAN CACHE"):
+        return show_plan_cache()
     elif stmt_upper.startswith("SELECT"):
         return parse_select(clean_stmt, current_database)
     else:
         return {"error": f"Unsupported statement: {clean_stmt}"}
 
 
-def handle_sql_commands(sql):
-    """Split SQL commands by semicolon and process each statement"""
+def run_parsed(parsed, current_database):
+    """Execute a parsed SELECT / INSERT / DELETE"""
+    if parsed["type"] == "insert":
+        return execute_insert(parsed, current_database)
+    if parsed["type"] == "delete":
+        return execute_delete(parsed, current_database)
+    return run_select(parsed, current_database)
+
+def execute_statement(statement, current_database, params=None, batch=None):
+    """Run a prepared statement with params, or once per parameter set of batch"""
+    try:
+        ensure_recovered(current_database)
+    except StorageError as e:
+        return {"error": f"Storage error: {e}"}
+
+    if batch is None:
+        parsed = statement.bind(params)
+        if "error" in parsed:
+            return parsed
+        return run_parsed(parsed, current_database)
+
+    if not isinstance(batch, list) or not batch:
+        return {"error": "batch must be a non-empty list of parameter sets"}
+    bound = []
+    for number, params in enumerate(batch, start=1):
+        parsed = statement.bind(params)
+        if "error" in parsed:
+            return {"error": f"Parameter set {number}: {parsed['error']}"}
+        bound.append(parsed)
+
+    # INSERT: az összes paraméterkészlet sorai egyetlen bulk írásban (egy WAL rekord)
+    if statement.type == "insert":
+        merged = dict(bound[0], rows=[row for parsed in bound for row in parsed["rows"]])
+        return run_parsed(merged, current_database)
+
+    results = [run_parsed(parsed, current_database) for parsed in bound]
+    return {"message": f"Statement executed {len(results)} times", "results": results}
+
+def database_exists(dbname):
+    return os.path.exists(get_metadata_file(dbname))
+
+def prepare_command(sql, database=None):
+    """Parse a SELECT / INSERT / DELETE once and keep it under a handle"""
+    clean_stmt = remove_sql_comments(sql or "").strip()
+    if not clean_stmt:
+        return {"error": "Empty statement"}
+    if database is not None and not database_exists(database):
+        return {"error": f"Database '{database}' does not exist"}
+
+    statement = prepare_statement(clean_stmt, database)
+    if isinstance(statement, dict):
+        return statement
+    return {"message": "Statement prepared", **statement.describe()}
+
+def execute_command(handle, params=None, batch=None, database=None):
+    """Execute a prepared statement; database overrides the one given at prepare time"""
+    statement = get_prepared_statement(handle)
+    if statement is None:
+        return {"error": f"Unknown prepared statement '{handle}'"}
+
+    database = database or statement.database
+    if database is None:
+        return {"error": "No database selected"}
+    if not database_exists(database):
+        return {"error": f"Database '{database}' does not exist"}
+    return execute_statement(statement, database, params, batch)
+
+def deallocate_command(handle):
+    if not deallocate_statement(handle):
+        return {"error": f"Unknown prepared statement '{handle}'"}
+    return {"message": f"Prepared statement '{handle}' deallocated"}
+
+def handle_sql_commands(sql, params=None, batch=None, database=None):
+    """
+    Split SQL commands by semicolon and process each statement.
+    params / batch are bound to the placeholders ('?' or ':name') of the statements that have them.
+    """
     # First, replace all newlines with spaces to handle multi-line statements better
     statements = []
     current_statement = ""
@@ -141,6 +270,8 @@ def handle_sql_commands(sql):
             elif char == quote_char:
                 in_quotes = False
                 quote_char = None
+            # Keep the quote so values like 'Alma, Szia' stay one literal
+            current_statement += char
         
         # Handle comments (only when not in quotes)
         elif not in_quotes and i + 1 < len(sql) and sql[i:i+2] == "--":
@@ -168,11 +299,21 @@ def handle_sql_commands(sql):
     if current_statement.strip():
         statements.append(current_statement.strip())
     
-    current_database = None
+    current_database = database
     responses = []
 
     for stmt in statements:
-        response = process_statement(stmt, current_database)
+        response = None
+        if params is not None or batch is not None:
+            clean_stmt = remove_sql_comments(stmt).strip()
+            if clean_stmt.upper().startswith(("SELECT", "INSERT INTO", "DELETE FROM")):
+                statement = compile_statement(clean_stmt)
+                if isinstance(statement, dict):
+                    response = statement
+                elif statement.placeholders:
+                    response = execute_statement(statement, current_database, params, batch)
+        if response is None:
+            response = process_statement(stmt, current_database)
         responses.append(response)
 
         if response.get('database'):
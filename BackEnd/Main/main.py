@@ -1,6 +1,7 @@
 from flask import Flask, request, jsonify
 from .controller import *
 from BackEnd.Create.database import *
+from BackEnd.Create.catalog import load_catalog
 from flask_cors import CORS
 import os
 import json
@@ -16,9 +17,43 @@ def parse_sql():
         return jsonify({"error": "Missing SQL statement"}), 400
     
     sql = data['sql']
-    response = handle_sql_commands(sql)
+    # Opcionális: "params" (lista '?', objektum ':name' esetén), "batch" (paraméterkészletek), "db"
+    dbname = data.get('db')
+    if dbname and not database_exists(dbname):
+        return jsonify({"error": f"Database '{dbname}' not found"}), 404
+
+    response = handle_sql_commands(sql, data.get('params'), data.get('batch'), dbname)
+    return jsonify(response), 200
+
+@app.route('/PREPARE', methods=['POST'])
+def prepare_sql():
+    data = request.json
+
+    if 'sql' not in data:
+        return jsonify({"error": "Missing SQL statement"}), 400
+
+    response = prepare_command(data['sql'], data.get('db'))
     return jsonify(response), 200
 
+@app.route('/EXECUTE', methods=['POST'])
+def execute_sql():
+    data = request.json
+
+    if 'handle' not in data:
+        return jsonify({"error": "Missing prepared statement handle"}), 400
+
+    response = execute_command(data['handle'], data.get('params'), data.get('batch'), data.get('db'))
+    return jsonify(response), 200
+
+@app.route('/DEALLOCATE', methods=['POST'])
+def deallocate_sql():
+    data = request.json
+
+    if 'handle' not in data:
+        return jsonify({"error": "Missing prepared statement handle"}), 400
+
+    return jsonify(deallocate_command(data['handle'])), 200
+
 @app.route('/tables', methods=['GET'])
 def list_tables():
     dbname = request.args.get('db')
@@ -30,8 +65,7 @@ def list_tables():
     if not os.path.exists(db_file):
         return jsonify({"error": f"Database '{dbname}' not found"}), 404
 
-    with open(db_file, 'r') as f:
-        db_content = json.load(f)
+    db_content = load_catalog(dbname)
 
     return jsonify(db_content.get("tables", {})), 200
 
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+from BackEnd.Parser.tokenizer import tokenize, normalize, SQLSyntaxError
+from BackEnd.Parser.sql_parser import Parser, bind, parameter_values
+
+# Cache of parsed statements keyed by the normalized statement text (literals replaced by '?').
+# A repeated statement shape is only tokenized: the cached AST template gets the literals of
+# the new statement bound into a fresh copy, the parser does not run again.
+
+PLAN_CACHE_SIZE = 1024                          # Ennyi különböző utasítás alak marad a cache-ben
+CACHED_TYPES = ("select", "join_select", "insert", "delete")
+
+class PlanCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()    # normalizált szöveg -> AST sablon, a legrégebben használt elöl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            template = self.entries.get(key)
+            if template is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return template
+
+    def put(self, key, template):
+        with self.lock:
+            self.entries[key] = template
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+            }
+
+plan_cache = PlanCache(PLAN_CACHE_SIZE)
+
+def parse_template(stmt):
+    """(AST template, literal values, placeholders) of one statement, raises SQLSyntaxError"""
+    key, literals, placeholders = normalize(stmt)
+    template = plan_cache.get(key)
+    if template is None:
+        parser = Parser(tokenize(stmt))
+        template = parser.statement()
+        if parser.cacheable and template["type"] in CACHED_TYPES:
+            plan_cache.put(key, template)
+    return template, literals, placeholders
+
+def parse_statement(stmt, params=None):
+    """AST of one statement with params bound to its placeholders, {"error": ...} if it does not parse"""
+    try:
+        template, literals, placeholders = parse_template(stmt)
+        return bind(template, literals, parameter_values(placeholders, params))
+    except SQLSyntaxError as e:
+        return {"error": str(e)}
+
+def plan_cache_stats():
+    return plan_cache.stats()
@@ -0,0 +1,77 @@
+import threading
+import uuid
+from collections import OrderedDict
+from BackEnd.Parser.tokenizer import SQLSyntaxError
+from BackEnd.Parser.sql_parser import bind, check_placeholders, parameter_values
+from BackEnd.Parser.plan_cache import parse_template
+
+# Prepared statements of the HTTP API (/PREPARE, /EXECUTE). A statement is parsed once and kept
+# under a handle; an execution only binds its parameter values into a copy of the AST.
+
+MAX_PREPARED_STATEMENTS = 1024                  # A legrégebben használt handle-ök esnek ki
+PREPARABLE_TYPES = ("select", "join_select", "insert", "delete")
+
+class PreparedStatement:
+    def __init__(self, sql, template, literals, placeholders, database=None):
+        self.handle = uuid.uuid4().hex
+        self.sql = sql
+        self.template = template
+        self.literals = literals
+        self.placeholders = placeholders
+        self.type = template["type"]
+        self.database = database
+
+    def parameters(self):
+        """Parameter count for '?', the names for ':name' placeholders"""
+        names = check_placeholders(self.placeholders)
+        return list(dict.fromkeys(names)) if names else len(self.placeholders)
+
+    def bind(self, params):
+        """AST of one execution, {"error": ...} if params do not fit the placeholders"""
+        try:
+            return bind(self.template, self.literals, parameter_values(self.placeholders, params))
+        except SQLSyntaxError as e:
+            return {"error": str(e)}
+
+    def describe(self):
+        return {
+            "handle": self.handle,
+            "type": self.type,
+            "parameters": self.parameters(),
+            "database": self.database
+        }
+
+_statements = OrderedDict()     # handle -> PreparedStatement
+_lock = threading.Lock()
+
+def compile_statement(sql, database=None):
+    """PreparedStatement of one SELECT / INSERT / DELETE (not registered), {"error": ...} if it does not parse"""
+    try:
+        template, literals, placeholders = parse_template(sql)
+        check_placeholders(placeholders)
+    except SQLSyntaxError as e:
+        return {"error": f"Invalid statement: {e}"}
+    if template["type"] not in PREPARABLE_TYPES:
+        return {"error": "Only SELECT, INSERT and DELETE statements can be prepared"}
+    return PreparedStatement(sql, template, literals, placeholders, database)
+
+def prepare_statement(sql, database=None):
+    statement = compile_statement(sql, database)
+    if isinstance(statement, dict):
+        return statement
+    with _lock:
+        _statements[statement.handle] = statement
+        while len(_statements) > MAX_PREPARED_STATEMENTS:
+            _statements.popitem(last=False)
+    return statement
+
+def get_prepared_statement(handle):
+    with _lock:
+        statement = _statements.get(handle)
+        if statement is not None:
+            _statements.move_to_end(handle)
+        return statement
+
+def deallocate_statement(handle):
+    with _lock:
+        return _statements.pop(handle, None) is not None
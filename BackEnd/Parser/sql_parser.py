@@ -0,0 +1,390 @@
+import re
+from BackEnd.Parser.tokenizer import NAME, NUMBER, STRING, OP, PUNCT, PARAM, SQLSyntaxError
+
+# Recursive-descent parser over the token list. The AST of a statement is a plain dict
+# (the SELECT form is the one the select / join executors consume):
+#   select / join_select: columns, table, joins, where, distinct, group_by, aggregations, order_by
+#   insert:        table, columns (optional column list), rows (lists of literal values)
+#   delete:        table, where
+#   create_index:  name, table, columns, using (None, "BLOOM" or "BTREE")
+#   create_table:  table, columns [{name, type, constraint, dictionary, references}], primary_key
+# Literal values are Slot placeholders in the AST, bind() fills in the values of one statement.
+# Placeholders ('?' / ':name') are Param nodes, bound from the parameter values of one execution.
+
+AGGREGATE_FUNCTIONS = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+COMPARISON_OPS = ("=", ">=", "<=", "<", ">")
+TABLE_NAME_PATTERN = re.compile(r"\w+")
+
+class Slot:
+    """Position of a literal in the statement"""
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+class Param:
+    """Placeholder of a parameter: its position ('?') or name (':name')"""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+def bind(node, values, params=None):
+    """Copy of an AST template with every Slot / Param replaced by its literal / parameter value"""
+    if isinstance(node, Slot):
+        return values[node.index]
+    if isinstance(node, Param):
+        return params[node.key]
+    if isinstance(node, dict):
+        return {key: bind(value, values, params) for key, value in node.items()}
+    if isinstance(node, list):
+        return [bind(item, values, params) for item in node]
+    return node
+
+def parameter_text(value):
+    """Statement text of a typed parameter value, the same text a literal would have"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    raise SQLSyntaxError(f"unsupported parameter value {value!r}")
+
+def check_placeholders(placeholders):
+    """Named placeholders of a statement ([] for '?' placeholders)"""
+    names = [p[1:] for p in placeholders if p != "?"]
+    if names and len(names) != len(placeholders):
+        raise SQLSyntaxError("cannot mix '?' and ':name' placeholders in one statement")
+    return names
+
+def parameter_values(placeholders, params):
+    """
+    Parameter texts by Param key. placeholders are the '?' / ':name' tokens of the statement,
+    params a list for '?' and an object for ':name' placeholders
+    """
+    if not placeholders:
+        return None
+    names = check_placeholders(placeholders)
+    if params is None:
+        raise SQLSyntaxError(f"statement has {len(placeholders)} placeholder(s) but no parameters were given")
+
+    if names:
+        if not isinstance(params, dict):
+            raise SQLSyntaxError("named placeholders need an object of parameter values")
+        missing = [name for name in names if name not in params]
+        if missing:
+            raise SQLSyntaxError(f"missing parameter(s): {', '.join(dict.fromkeys(missing))}")
+        return {name: parameter_text(params[name]) for name in names}
+
+    if not isinstance(params, (list, tuple)):
+        raise SQLSyntaxError("'?' placeholders need a list of parameter values")
+    if len(params) != len(placeholders):
+        raise SQLSyntaxError(f"statement has {len(placeholders)} placeholder(s), {len(params)} parameter(s) given")
+    return [parameter_text(value) for value in params]
+
+class Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        # Hamis, ha egy literál nem Slot-ként került az AST-be (pl. VARCHAR(20) mérete):
+        # az ilyen AST nem használható más literálokkal
+        self.cacheable = True
+
+    # --- Token helpers ---
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else None
+
+    def error(self, expected):
+        token = self.peek()
+        near = f"near '{token.text}'" if token is not None else "at end of statement"
+        raise SQLSyntaxError(f"expected {expected} {near}")
+
+    def is_keyword(self, word, offset=0):
+        token = self.peek(offset)
+        return token is not None and token.kind == NAME and token.text.upper() == word
+
+    def is_punct(self, char, offset=0):
+        token = self.peek(offset)
+        return token is not None and token.kind == PUNCT and token.text == char
+
+    def accept_keyword(self, *words):
+        if all(self.is_keyword(word, offset) for offset, word in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect_keyword(self, *words):
+        if not self.accept_keyword(*words):
+            self.error(" ".join(words))
+
+    def accept_punct(self, char):
+        if self.is_punct(char):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_punct(self, char):
+        if not self.accept_punct(char):
+            self.error(f"'{char}'")
+
+    def identifier(self, what="a name"):
+        token = self.peek()
+        if token is None or token.kind != NAME:
+            self.error(what)
+        self.pos += 1
+        return token.text
+
+    def table_name(self):
+        token = self.peek()
+        if token is None or token.kind != NAME or not TABLE_NAME_PATTERN.fullmatch(token.text):
+            self.error("a table name")
+        self.pos += 1
+        return token.text
+
+    def name_list(self, what="a column"):
+        names = [self.identifier(what)]
+        while self.accept_punct(","):
+            names.append(self.identifier(what))
+        return names
+
+    def literal(self):
+        """Value of a condition or VALUES list: a Slot for literals, a Param for placeholders, bare words as text"""
+        token = self.peek()
+        if token is not None and token.kind in (NUMBER, STRING):
+            self.pos += 1
+            return Slot(token.slot)
+        if token is not None and token.kind == PARAM:
+            self.pos += 1
+            return Param(token.value)
+        if token is not None and token.kind == NAME:
+            self.pos += 1
+            return token.text
+        self.error("a value")
+
+    def number(self):
+        token = self.peek()
+        if token is None or token.kind != NUMBER:
+            self.error("a number")
+        self.pos += 1
+        self.cacheable = False
+        return token.value
+
+    # --- Statements ---
+
+    def statement(self):
+        if self.is_keyword("SELECT"):
+            ast = self.select()
+        elif self.is_keyword("INSERT"):
+            ast = self.insert()
+        elif self.is_keyword("DELETE"):
+            ast = self.delete()
+        elif self.is_keyword("CREATE") and self.is_keyword("TABLE", 1):
+            ast = self.create_table()
+        elif self.is_keyword("CREATE") and self.is_keyword("INDEX", 1):
+            ast = self.create_index()
+        else:
+            self.error("SELECT, INSERT, DELETE, CREATE TABLE or CREATE INDEX")
+        self.accept_punct(";")
+        if self.peek() is not None:
+            self.error("end of statement")
+        return ast
+
+    def select(self):
+        self.expect_keyword("SELECT")
+        distinct = self.accept_keyword("DISTINCT")
+        columns, aggregations = self.select_list()
+        self.expect_keyword("FROM")
+        table = self.table_name()
+
+        joins = []
+        while self.is_keyword("JOIN") or (self.is_keyword("INNER") and self.is_keyword("JOIN", 1)):
+            self.accept_keyword("INNER")
+            self.expect_keyword("JOIN")
+            join_table = self.table_name()
+            self.expect_keyword("ON")
+            left_column = self.identifier("a column")
+            if not (self.peek() is not None and self.peek().kind == OP and self.peek().text == "="):
+                self.error("'='")
+            self.pos += 1
+            right_column = self.identifier("a column")
+            joins.append({
+                "type": "INNER JOIN",
+                "table": join_table,
+                "left_column": left_column,
+                "right_column": right_column
+            })
+
+        where = self.where() if self.accept_keyword("WHERE") else []
+        group_by = self.name_list() if self.accept_keyword("GROUP", "BY") else []
+        order_by = self.order_by() if self.accept_keyword("ORDER", "BY") else []
+
+        return {
+            "type": "join_select" if joins else "select",
+            "columns": columns,
+            "table": table,
+            "joins": joins,
+            "where": where,
+            "distinct": distinct,
+            "group_by": group_by,
+            "aggregations": aggregations,
+            "order_by": order_by
+        }
+
+    def aggregate_call(self):
+        """FUNC(column | *) -> (function, target), None if the next tokens are not a call"""
+        token = self.peek()
+        if token is None or token.kind != NAME or token.text.upper() not in AGGREGATE_FUNCTIONS or not self.is_punct("(", 1):
+            return None
+        self.pos += 2
+        target = "*" if self.accept_punct("*") else self.identifier("a column or '*'")
+        self.expect_punct(")")
+        return token.text.upper(), target
+
+    def select_list(self):
+        columns = []
+        aggregations = []
+        while True:
+            call = self.aggregate_call()
+            if call is not None:
+                func, target = call
+                aggregations.append({
+                    "function": func,
+                    "column": target,
+                    "alias": f"{func}_{target}".replace("*", "ALL").replace(".", "_"),
+                    "index": len(columns)
+                })
+                columns.append(target)
+            elif self.accept_punct("*"):
+                columns.append("*")
+            else:
+                columns.append(self.identifier("a column"))
+            if not self.accept_punct(","):
+                return columns, aggregations
+
+    def where(self):
+        """AND-ed comparisons: column op value (column BETWEEN low AND high is >= and <=)"""
+        conditions = []
+        while True:
+            column = self.identifier("a column")
+            if self.accept_keyword("BETWEEN"):
+                low = self.literal()
+                self.expect_keyword("AND")
+                conditions.append({"column": column, "op": ">=", "value": low})
+                conditions.append({"column": column, "op": "<=", "value": self.literal()})
+                if not self.accept_keyword("AND"):
+                    return conditions
+                continue
+            token = self.peek()
+            if token is None or token.kind != OP or token.text not in COMPARISON_OPS:
+                self.error("a comparison operator")
+            self.pos += 1
+            conditions.append({"column": column, "op": token.text, "value": self.literal()})
+            if not self.accept_keyword("AND"):
+                return conditions
+
+    def order_by(self):
+        order_columns = []
+        while True:
+            call = self.aggregate_call()
+            # Aggregációra az eredmény fejléce szerint lehet rendezni, pl. COUNT(*)
+            column = f"{call[0]}({call[1]})" if call else self.identifier("a column")
+            direction = "ASC"
+            if self.accept_keyword("DESC"):
+                direction = "DESC"
+            else:
+                self.accept_keyword("ASC")
+            order_columns.append({"column": column, "direction": direction})
+            if not self.accept_punct(","):
+                return order_columns
+
+    def insert(self):
+        self.expect_keyword("INSERT", "INTO")
+        table = self.table_name()
+        columns = []
+        if self.accept_punct("("):
+            columns = self.name_list()
+            self.expect_punct(")")
+        self.expect_keyword("VALUES")
+
+        rows = []
+        while True:
+            self.expect_punct("(")
+            row = [self.literal()]
+            while self.accept_punct(","):
+                row.append(self.literal())
+            self.expect_punct(")")
+            rows.append(row)
+            if not self.accept_punct(","):
+                break
+        return {"type": "insert", "table": table, "columns": columns, "rows": rows}
+
+    def delete(self):
+        self.expect_keyword("DELETE", "FROM")
+        table = self.table_name()
+        where = self.where() if self.accept_keyword("WHERE") else []
+        return {"type": "delete", "table": table, "where": where}
+
+    def create_index(self):
+        self.expect_keyword("CREATE", "INDEX")
+        name = self.table_name()
+        self.expect_keyword("ON")
+        table = self.table_name()
+        self.expect_punct("(")
+        columns = self.name_list()
+        self.expect_punct(")")
+        using = self.identifier("an index method").upper() if self.accept_keyword("USING") else None
+        return {"type": "create_index", "name": name, "table": table, "columns": columns, "using": using}
+
+    def create_table(self):
+        self.expect_keyword("CREATE", "TABLE")
+        table = self.table_name()
+        self.expect_punct("(")
+
+        columns = []
+        primary_key = []
+        while True:
+            if self.is_keyword("PRIMARY") and self.is_keyword("KEY", 1) and self.is_punct("(", 2):
+                # Tábla szintű PRIMARY KEY (a, b)
+                self.pos += 3
+                primary_key.extend(self.name_list())
+                self.expect_punct(")")
+            else:
+                columns.append(self.column_definition())
+            if not self.accept_punct(","):
+                break
+        self.expect_punct(")")
+        return {"type": "create_table", "table": table, "columns": columns, "primary_key": primary_key}
+
+    def column_definition(self):
+        column = {
+            "name": self.table_name(),
+            "type": self.column_type(),
+            "constraint": None,
+            "dictionary": False,
+            "references": None
+        }
+        if self.accept_keyword("REFERENCES"):
+            ref_table = self.table_name()
+            self.expect_punct("(")
+            ref_column = self.table_name()
+            self.expect_punct(")")
+            column["references"] = {"table": ref_table, "column": ref_column}
+            return column
+
+        if self.accept_keyword("PRIMARY", "KEY"):
+            column["constraint"] = "PRIMARY KEY"
+        elif self.accept_keyword("UNIQUE"):
+            column["constraint"] = "UNIQUE"
+        if self.accept_keyword("DICTIONARY"):
+            column["dictionary"] = True
+        return column
+
+    def column_type(self):
+        col_type = self.identifier("a column type")
+        if self.accept_punct("("):
+            col_type = f"{col_type}({self.number()})"
+            self.expect_punct(")")
+        return col_type
@@ -0,0 +1,102 @@
+import re
+from collections import namedtuple
+
+# Single-pass SQL tokenizer.
+# Kinds: NAME (identifiers and keywords, dotted names like t.col), NUMBER (bare literals
+# starting with a digit or sign: 5, -2.5, 2024-01-01), STRING (quoted, value unescaped),
+# OP (comparison operators), PUNCT ( ( ) , ; * ) and PARAM (placeholders: '?' numbered in
+# order, ':name' by name) of prepared / parameterized statements.
+# Literal tokens (NUMBER / STRING) are numbered in order ("slot"), the normalized text of a
+# statement has a '?' in their place, so statements differing only in literals share a key.
+
+NAME = "name"
+NUMBER = "number"
+STRING = "string"
+OP = "op"
+PUNCT = "punct"
+PARAM = "param"
+
+Token = namedtuple("Token", ["kind", "text", "value", "slot"])
+
+# Egy találat egy token: (string, operátor / írásjel, paraméter, szó, váratlan karakter) csoportok
+_TOKEN_PATTERN = re.compile(r"""\s*(?:
+    ('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (<=|>=|<>|!=|=|<|>|[(),;*])
+  | (\?|:\w+)
+  | ([^\s(),;=<>!'"*?]+)
+  | (\S)
+)""", re.VERBOSE | re.DOTALL)
+
+_NUMBER_START = re.compile(r"[-+]?\.?\d")
+_OPERATORS = ("<=", ">=", "<>", "!=", "=", "<", ">")
+
+class SQLSyntaxError(Exception):
+    """Statement that does not tokenize or parse"""
+
+def _unquote(text):
+    quote = text[0]
+    body = text[1:-1]
+    if "\\" not in body and quote * 2 not in body:
+        return body
+    # Csak az escape-elt idézőjel ('' vagy \') változik, a többi backslash szó szerint marad
+    return re.sub(r"\\(.)|" + quote * 2, lambda m: quote if m.group(1) in (None, quote) else m.group(0), body, flags=re.DOTALL)
+
+def _unexpected(char):
+    if char in "'\"":
+        return SQLSyntaxError("unterminated string literal")
+    return SQLSyntaxError(f"unexpected character '{char}'")
+
+def tokenize(stmt):
+    tokens = []
+    slot = 0
+    position = 0
+    for string, symbol, param, word, bad in _TOKEN_PATTERN.findall(stmt):
+        if string:
+            tokens.append(Token(STRING, string, _unquote(string), slot))
+            slot += 1
+        elif symbol:
+            tokens.append(Token(OP if symbol in _OPERATORS else PUNCT, symbol, symbol, None))
+        elif param:
+            # '?': sorszám szerinti, ':name': név szerinti paraméter
+            if param == "?":
+                tokens.append(Token(PARAM, param, position, None))
+                position += 1
+            else:
+                tokens.append(Token(PARAM, param, param[1:], None))
+        elif word:
+            if _NUMBER_START.match(word):
+                tokens.append(Token(NUMBER, word, word, slot))
+                slot += 1
+            else:
+                tokens.append(Token(NAME, word, word, None))
+        else:
+            raise _unexpected(bad)
+    return tokens
+
+def normalize(stmt):
+    """
+    (normalized statement text, literal values in slot order, placeholders in order)
+    without building tokens
+    """
+    parts = []
+    literals = []
+    placeholders = []
+    for string, symbol, param, word, bad in _TOKEN_PATTERN.findall(stmt):
+        if string:
+            parts.append("?")
+            literals.append(_unquote(string))
+        elif symbol:
+            parts.append(symbol)
+        elif param:
+            # A literálok '?' jelétől eltérő alak, így "id = ?" és "id = 5" külön sablon
+            parts.append("?" + param)
+            placeholders.append(param)
+        elif word:
+            if _NUMBER_START.match(word):
+                parts.append("?")
+                literals.append(word)
+            else:
+                parts.append(word)
+        else:
+            raise _unexpected(bad)
+    return " ".join(parts), literals, placeholders
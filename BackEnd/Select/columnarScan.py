@@ -0,0 +1,164 @@
+import time
+from BackEnd.Create.schema import table_schema
+from BackEnd.Select.whereEvaluator import compare_values, COMPARISON_OPERATORS, _number_literal
+from BackEnd.Select.aggregationProcessor import process_group_by_and_aggregations, apply_order_by
+from BackEnd.Storage.columnar import get_columnar_table
+
+# Aggregációs lekérdezések oszlopos táblákon: csak a hivatkozott oszlopok
+# szegmensei kerülnek beolvasásra (mmap, másolás nélkül), a többi oszlop nem dekódolódik.
+# Szótár kódolt oszlopoknál a WHERE, GROUP BY és DISTINCT a kódokat hasonlítja,
+# a szövegek csak az eredmény sorokban dekódolódnak.
+
+NUMERIC_TYPES = ("INT", "FLOAT")
+
+def simple_name(column):
+    return column.split(".")[-1]
+
+def referenced_columns(schema, selected_columns, conditions, group_by_columns, aggregations):
+    """Columns the query reads (DISTINCT select list, GROUP BY, aggregation targets, WHERE), None if one is unknown"""
+    names = [simple_name(col) for col in selected_columns]
+    names += [simple_name(col) for col in group_by_columns]
+    names += [simple_name(agg["column"]) for agg in aggregations if agg["column"] != "*"]
+    names += [cond["column"] for cond in conditions]
+
+    columns = []
+    for name in names:
+        if name not in schema.positions:
+            return None
+        if name not in columns:
+            columns.append(name)
+    return columns
+
+def condition_filter(segment, col_type, cond):
+    """Row position -> bool for one WHERE condition"""
+    compare = COMPARISON_OPERATORS.get(cond["op"])
+    value = cond["value"]
+    if compare is None:
+        return lambda i: False
+
+    if segment.dictionary is not None:
+        # A feltétel a szótár minden értékére egyszer, a sorokra csak kód halmaz-tagság
+        codes = segment.matching_codes(lambda text: compare_values(text, cond["op"], value))
+        return lambda i: segment.code(i) in codes
+
+    if col_type in NUMERIC_TYPES and isinstance(value, str):
+        # Numerikus oszlop: a literál egyszer konvertálva, összehasonlítás közvetlenül a bufferen
+        target = _number_literal(value.strip())
+        if target is None:
+            return lambda i: False
+        values = segment.numeric()
+        return lambda i: compare(values[i], target)
+
+    return lambda i: compare_values(segment[i], cond["op"], value)
+
+def global_numeric_aggregations(reader, schema, positions, aggregations):
+    """Aggregations without GROUP BY directly over the INT / FLOAT buffers (same result as process_global_aggregations)"""
+    headers = []
+    row = []
+    for agg in aggregations:
+        func = agg["function"]
+        column = simple_name(agg["column"])
+        headers.append("COUNT(*)" if func == "COUNT" and agg["column"] == "*" else f"{func}({agg['column']})")
+
+        if func == "COUNT":
+            row.append(len(positions))
+            continue
+
+        values = reader[column].numeric()
+        if not isinstance(positions, range) or len(positions) != len(values):
+            values = [values[i] for i in positions]
+
+        if schema.column_types[column] == "FLOAT":
+            total = sum(values) if func in ("SUM", "AVG") else None
+        else:
+            total = float(sum(values)) if func in ("SUM", "AVG") else None
+
+        if func == "SUM":
+            row.append(total)
+        elif func == "AVG":
+            row.append(total / len(positions))
+        elif func == "MIN":
+            row.append(float(min(values)))
+        else:
+            row.append(float(max(values)))
+
+    return {"headers": headers, "rows": [row]}
+
+def coded_rows(reader, columns, positions, coded_columns):
+    """Rows of the given columns, dictionary codes instead of text for coded_columns"""
+    getters = []
+    for name in columns:
+        segment = reader[name]
+        getters.append(segment.code if name in coded_columns else segment.__getitem__)
+    return [[get(i) for get in getters] for i in positions]
+
+def decode_codes(rows, reader, slots):
+    """Replace the codes at the given (row slot, column) pairs with their text"""
+    dictionaries = [(slot, reader[name].dictionary) for slot, name in slots]
+    for row in rows:
+        for slot, dictionary in dictionaries:
+            row[slot] = dictionary[row[slot]]
+    return rows
+
+def execute_columnar_select(database, table_name, table_metadata, selected_columns, conditions,
+                            group_by_columns, aggregations, order_by_columns, is_distinct=False):
+    """
+    GROUP BY / aggregation query (or a plain DISTINCT select) of a columnar table from its segments.
+    Returns None when the query cannot be answered from the segments (the row store path is used).
+    """
+    schema = table_schema(table_metadata)
+    if is_distinct:
+        selected_columns = [name for col in selected_columns
+                            for name in (schema.column_names if col == "*" else [simple_name(col)])]
+    else:
+        selected_columns = []
+    columns = referenced_columns(schema, selected_columns, conditions, group_by_columns, aggregations)
+    if columns is None:
+        return None
+
+    start_time = time.time()
+    with get_columnar_table(database, table_name, schema).reader(columns) as reader:
+        positions = reader.live_positions()
+        for cond in conditions:
+            matches = condition_filter(reader[cond["column"]], schema.column_types[cond["column"]], cond)
+            positions = [i for i in positions if matches(i)]
+
+        print(f"DEBUG: Columnar scan of '{table_name}': {len(positions)} of {reader.rows} rows, columns {columns} in {time.time() - start_time:.3f} seconds")
+
+        if is_distinct:
+            # DISTINCT a kód tuple-ökön, dekódolás csak a megmaradt sorokra
+            coded = {name for name in selected_columns if reader[name].dictionary is not None}
+            rows = coded_rows(reader, selected_columns, positions, coded)
+            rows = [list(row) for row in dict.fromkeys(tuple(row) for row in rows)]
+            rows = decode_codes(rows, reader, [(slot, name) for slot, name in enumerate(selected_columns) if name in coded])
+            print(f"DEBUG: Found {len(rows)} rows matching conditions")
+            result = {"headers": selected_columns, "rows": rows}
+            return apply_order_by(rows, selected_columns, order_by_columns) if order_by_columns else result
+
+        if not positions:
+            return {"headers": [], "rows": []}
+
+        fast_path = (
+            aggregations and not group_by_columns and not order_by_columns and
+            all(agg["function"] in ("COUNT", "SUM", "AVG", "MIN", "MAX") and
+                (agg["column"] == "*" and agg["function"] == "COUNT" or
+                 schema.column_types[simple_name(agg["column"])] in NUMERIC_TYPES)
+                for agg in aggregations)
+        )
+        if fast_path:
+            return global_numeric_aggregations(reader, schema, positions, aggregations)
+
+        # Csak a szükséges oszlopokból épített sorok a közös GROUP BY / aggregáció feldolgozáshoz;
+        # a csak csoportosításra használt szótár oszlopok kódokként csoportosulnak
+        group_names = [simple_name(col) for col in group_by_columns]
+        aggregated = {simple_name(agg["column"]) for agg in aggregations}
+        coded = {name for name in group_names if reader[name].dictionary is not None and name not in aggregated}
+        rows = coded_rows(reader, columns, positions, coded)
+
+        result = process_group_by_and_aggregations(rows, columns, group_by_columns, aggregations)
+        if coded:
+            decode_codes(result["rows"], reader, [(slot, name) for slot, name in enumerate(group_names) if name in coded])
+
+    if order_by_columns:
+        result = apply_order_by(result["rows"], result["headers"], order_by_columns)
+    return result
@@ -0,0 +1,390 @@
+import bisect
+import math
+from BackEnd.Create.schema import table_schema
+from BackEnd.Create.analyze import histogram_value
+
+# Költség alapú tervező az ANALYZE statisztikái alapján (a katalógus "statistics" bejegyzése).
+# A költség egysége egy dokumentum szekvenciális olvasása; a kulcs szerinti olvasás drágább,
+# minden külön lekérdezés (round trip) egy fix költséggel jár. Statisztika nélküli táblánál
+# a tervező nem dönt: minden használható index és a megírt JOIN sorrend marad.
+
+SEQ_ROW_COST = 1.0          # Egy dokumentum olvasása table scan közben
+RANDOM_ROW_COST = 4.0       # Egy dokumentum olvasása kulcs szerint (get_many)
+INDEX_ENTRY_COST = 0.2      # Egy index bejegyzés (elsődleges kulcs) olvasása
+PROBE_COST = 8.0            # Egy kulcs szerinti lekérdezés alapköltsége
+PROBE_BATCH_KEYS = 10000    # Ennyi JOIN kulcs keresődik egy lekérdezéssel (joinExecutor.BATCH_SIZE)
+HASH_BUILD_ROW_COST = 0.5   # Egy sor felvétele a hash join memóriabeli táblájába (a beolvasáson felül)
+HASH_PROBE_COST = 0.1       # Egy külső sor kulcsának keresése a hash táblában
+MERGE_ROW_COST = 0.1        # Egy sor összefésülése a merge join-ban
+SORT_ROW_COST = 0.05        # Egy sor egy összehasonlítási szintje rendezéskor (n log2 n)
+SORT_RUN_ROWS = 100000      # Külső rendezés: ennyi sor rendeződik memóriában, a többi futamokban a lemezen
+SPILL_ROW_COST = 2.0        # Egy sor kiírása egy futamba és visszaolvasása
+DEFAULT_EQ_SELECTIVITY = 0.005
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+JOIN_ENUMERATION_LIMIT = 7  # Ennyi tábláig minden összefüggő JOIN sorrend kiértékelődik, felette mohó választás
+
+INDEX_NESTED_LOOP = "index_nested_loop"     # Kulcs / index szerinti keresés a belső táblában soronként
+HASH_JOIN = "hash_join"                     # A belső tábla egyszeri bejárása, hash tábla a JOIN kulcsra
+MERGE_JOIN = "merge_join"                   # Két, a JOIN kulcs szerint rendezett bemenet egyszeri összefésülése
+
+# Merge join kulcsa: "typed" az értékek sorrendje (sortable_text, csak azonos típusú JOIN oszlopoknál),
+# "text" a key text sorrendje (az egyoszlopos elsődleges kulcs _id sorrendje)
+MERGE_KEY_TYPED = "typed"
+MERGE_KEY_TEXT = "text"
+
+def table_statistics(table_metadata):
+    return table_metadata.get("statistics")
+
+# --- Selectivity ---
+
+def condition_literal(schema, column, value):
+    """Literal of a condition as a histogram value of the column, None if it does not compare with them"""
+    col_type = schema.column_types.get(column)
+    if isinstance(value, str):
+        value = value.strip()
+        if col_type in ("INT", "FLOAT", "BOOL"):
+            value = schema.literal(column, value)
+            if isinstance(value, str):
+                return None
+    return histogram_value(value, col_type)
+
+def fraction_below(bounds, value, inclusive=False):
+    """Fraction of the (non-null) values below value (or equal to it) by the equi-depth histogram bounds"""
+    buckets = len(bounds) - 1
+    if value < bounds[0] or (value == bounds[0] and not inclusive):
+        return 0.0
+    if value > bounds[-1] or (value == bounds[-1] and inclusive) or buckets == 0:
+        return 1.0
+    position = bisect.bisect_right(bounds, value) if inclusive else bisect.bisect_left(bounds, value)
+    bucket = min(max(position - 1, 0), buckets - 1)
+    low, high = bounds[bucket], bounds[bucket + 1]
+    within = 0.5
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and high > low:
+        # Egy vödrön belül egyenletes eloszlás
+        within = min(max((value - low) / (high - low), 0.0), 1.0)
+    return (bucket + within) / buckets
+
+def equality_selectivity(column_stats, value):
+    if value is not None and column_stats.get("min") is not None:
+        if value < column_stats["min"] or value > column_stats["max"]:
+            return 0.0
+    distinct = column_stats.get("distinct") or 0
+    return 1.0 / distinct if distinct else 0.0
+
+def column_selectivity(schema, statistics, column, conditions):
+    """Estimated fraction of the rows matching the conditions of one column"""
+    column_stats = statistics.get("columns", {}).get(column)
+    rows = statistics.get("rows", 0)
+    if not column_stats or not rows:
+        selectivity = 1.0
+        for cond in conditions:
+            selectivity *= DEFAULT_EQ_SELECTIVITY if cond["op"] == "=" else DEFAULT_RANGE_SELECTIVITY
+        return selectivity
+
+    selectivity = 1.0
+    low, high = 0.0, 1.0
+    bounds = column_stats.get("histogram")
+    for cond in conditions:
+        op = cond["op"]
+        value = condition_literal(schema, column, cond["value"])
+        if op == "=":
+            selectivity *= equality_selectivity(column_stats, value) if value is not None else DEFAULT_EQ_SELECTIVITY
+        elif op in (">", ">=", "<", "<=") and value is not None and bounds:
+            # > v: 1 - F(<= v), >= v: 1 - F(< v), < v: F(< v), <= v: F(<= v)
+            fraction = fraction_below(bounds, value, inclusive=op in (">", "<="))
+            if op in (">", ">="):
+                low = max(low, fraction)
+            else:
+                high = min(high, fraction)
+        else:
+            selectivity *= DEFAULT_RANGE_SELECTIVITY
+    selectivity *= max(high - low, 0.0)
+    return selectivity * (rows - column_stats.get("nulls", 0)) / rows
+
+def conditions_selectivity(table_metadata, conditions):
+    """Estimated fraction of the rows matching all conditions (columns taken as independent)"""
+    statistics = table_statistics(table_metadata) or {}
+    schema = table_schema(table_metadata)
+    by_column = {}
+    for cond in conditions:
+        by_column.setdefault(cond["column"].split(".")[-1], []).append(cond)
+    selectivity = 1.0
+    for column, column_conditions in by_column.items():
+        selectivity *= column_selectivity(schema, statistics, column, column_conditions)
+    return selectivity
+
+def estimated_rows(table_metadata, conditions=()):
+    """Estimated row count after the conditions, None without statistics"""
+    statistics = table_statistics(table_metadata)
+    if not statistics:
+        return None
+    return statistics["rows"] * conditions_selectivity(table_metadata, conditions)
+
+# --- Access path: index lookup or full scan ---
+
+def access_plan(table_metadata, paths):
+    """
+    (cost, chosen paths) of reading the rows of one table: index accesses are added in order of
+    their estimated selectivity while reading one more index saves more row fetches than it costs;
+    an empty list means a full scan is cheaper. Without statistics every path is used (cost None).
+    """
+    statistics = table_statistics(table_metadata)
+    if not statistics:
+        return None, paths
+    schema = table_schema(table_metadata)
+    rows = statistics["rows"]
+    scan_cost = rows * SEQ_ROW_COST
+    if not paths:
+        return scan_cost, []
+
+    estimated = sorted(((column_selectivity(schema, statistics, path["column"], path["conditions"]), path) for path in paths),
+                       key=lambda entry: entry[0])
+    chosen = []
+    fetched = rows
+    cost = 0.0
+    for selectivity, path in estimated:
+        read_cost = PROBE_COST + rows * selectivity * INDEX_ENTRY_COST
+        if chosen and read_cost >= fetched * (1 - selectivity) * RANDOM_ROW_COST:
+            continue
+        chosen.append(path)
+        cost += read_cost
+        fetched *= selectivity
+    index_cost = cost + fetched * RANDOM_ROW_COST
+    if index_cost >= scan_cost:
+        return scan_cost, []
+    return index_cost, chosen
+
+def choose_access_paths(table_metadata, paths):
+    """Index accesses to use for one table (see access_plan)"""
+    cost, chosen = access_plan(table_metadata, paths)
+    if paths and not chosen:
+        print(f"DEBUG: Planner: full scan of '{table_metadata.get('table_name')}' is cheaper than its indexes (cost {cost:.0f})")
+    return chosen
+
+# --- Join order and join method ---
+
+def column_table(column, tables, metadata_all):
+    """(table, column name) of a table.column or bare column among tables (the last one having a bare name)"""
+    if "." in column:
+        table, name = column.split(".", 1)
+        if table in tables and name in table_schema(metadata_all[table]).positions:
+            return table, name
+        return None, name
+    for table in reversed(tables):
+        if column in table_schema(metadata_all[table]).positions:
+            return table, column
+    return None, column
+
+def join_edges(main_table, joins, metadata_all):
+    """
+    ON conditions as (table, column, table, column) in the written order, None if one of them does not
+    name a column of an earlier table and one of the joined table (the executor would find no rows)
+    """
+    edges = []
+    joined = [main_table]
+    for join in joins:
+        table = join["table"]
+        left_table, left_column = column_table(join["left_column"], joined, metadata_all)
+        right_column = join["right_column"].split(".")[-1]
+        if left_table is None or right_column not in table_schema(metadata_all[table]).positions:
+            return None
+        edges.append((left_table, left_column, table, right_column))
+        joined.append(table)
+    return edges
+
+def probe_method(table_metadata, column):
+    """Join method without statistics: probing by key / index if one leads with the column, else a hash join"""
+    schema = table_schema(table_metadata)
+    if schema.primary_keys and schema.primary_keys[0] == column:
+        return INDEX_NESTED_LOOP
+    if any(idx.get("columns", [None])[0] == column for idx in schema.indexes):
+        return INDEX_NESTED_LOOP
+    return HASH_JOIN
+
+def distinct_count(table_metadata, column):
+    statistics = table_statistics(table_metadata) or {}
+    column_stats = statistics.get("columns", {}).get(column) or {}
+    return max(column_stats.get("distinct") or 1, 1)
+
+def join_step(outer_rows, edge, inner, metadata_all, table_rows, inner_read_cost):
+    """
+    (cost, output rows, method, oriented edge) of joining the inner table to outer_rows rows through
+    edge with the cheaper method; inner_read_cost is the cost of reading the inner table under its
+    own conditions (the build side of a hash join)
+    """
+    outer_table, outer_column, inner_table, inner_column = edge
+    if inner_table != inner:
+        outer_table, outer_column, inner_table, inner_column = inner_table, inner_column, outer_table, outer_column
+    inner_metadata = metadata_all[inner_table]
+    outer_distinct = distinct_count(metadata_all[outer_table], outer_column)
+    inner_distinct = distinct_count(inner_metadata, inner_column)
+    inner_total = table_statistics(inner_metadata)["rows"]
+
+    # Hash join: a belső tábla egyszer beolvasva és felépítve, a külső sorok csak kulcsot keresnek
+    cost = inner_read_cost + table_rows[inner_table] * HASH_BUILD_ROW_COST + outer_rows * HASH_PROBE_COST
+    method = HASH_JOIN
+    if probe_method(inner_metadata, inner_column) == INDEX_NESTED_LOOP:
+        # Egy batch-en belül az ismétlődő JOIN értékek egyszer, a batch összes kulcsa egy lekérdezéssel keresődik
+        probes = min(outer_rows, outer_distinct)
+        batches = math.ceil(outer_rows / PROBE_BATCH_KEYS)
+        probe_cost = batches * PROBE_COST + probes * (INDEX_ENTRY_COST + inner_total / inner_distinct * RANDOM_ROW_COST)
+        if probe_cost < cost:
+            cost, method = probe_cost, INDEX_NESTED_LOOP
+    output = outer_rows * table_rows[inner_table] / max(outer_distinct, inner_distinct)
+    return cost, output, method, (outer_table, outer_column, inner_table, inner_column)
+
+def sort_cost(rows):
+    """Cost of sorting rows in memory"""
+    return rows * math.log2(rows) * SORT_ROW_COST if rows > 1 else 0.0
+
+def external_sort_cost(rows):
+    """Cost of sorting rows with sorted runs spilled to disk above SORT_RUN_ROWS rows"""
+    return sort_cost(rows) + (rows * SPILL_ROW_COST if rows > SORT_RUN_ROWS else 0.0)
+
+def ordered_sources(table_metadata, column):
+    """Merge key mode -> reading the table in column order: {"primary_key": column} or {"index": name}"""
+    from BackEnd.Select.indexReader import ordered_index_for    # az indexReader importálja a costModel-t
+    schema = table_schema(table_metadata)
+    sources = {}
+    if schema.primary_keys == [column]:
+        sources[MERGE_KEY_TEXT] = {"primary_key": column}
+        # Szöveges és DATE oszlopnál a sortable_text maga a key text
+        if schema.column_types.get(column) not in ("INT", "FLOAT", "BOOL"):
+            sources[MERGE_KEY_TYPED] = {"primary_key": column}
+    index = ordered_index_for(schema, column)
+    if index is not None:
+        sources[MERGE_KEY_TYPED] = {"index": index["name"]}
+    return sources
+
+def ordered_read_cost(table_metadata, source):
+    """Cost of reading every row of a table in primary key / ordered index order"""
+    total = table_statistics(table_metadata)["rows"]
+    if "primary_key" in source:
+        return total * SEQ_ROW_COST
+    return math.ceil(total / PROBE_BATCH_KEYS) * PROBE_COST + total * (INDEX_ENTRY_COST + RANDOM_ROW_COST)
+
+def merge_input(table_metadata, column, mode, rows, read_cost):
+    """(cost, source) of one merge join input: read in order (source) or read and sorted (None)"""
+    best = (read_cost + external_sort_cost(rows), None)
+    source = ordered_sources(table_metadata, column).get(mode)
+    if source is not None:
+        cost = ordered_read_cost(table_metadata, source)
+        if cost < best[0]:
+            best = (cost, source)
+    return best
+
+def merge_steps(outer_rows, outer_read_cost, edge, inner, metadata_all, table_rows, inner_read_cost):
+    """
+    (cost, output rows, merge plan, oriented edge) of a sort-merge join of two tables read under
+    their own conditions, for every merge key mode; outer_read_cost is already paid (the cost
+    replaces it when the outer input is read in order). Merge plan: {"key": mode, "outer": source,
+    "inner": source}.
+    """
+    outer_table, outer_column, inner_table, inner_column = edge
+    if inner_table != inner:
+        outer_table, outer_column, inner_table, inner_column = inner_table, inner_column, outer_table, outer_column
+    outer_metadata, inner_metadata = metadata_all[outer_table], metadata_all[inner_table]
+
+    outer_distinct = distinct_count(outer_metadata, outer_column)
+    inner_distinct = distinct_count(inner_metadata, inner_column)
+    output = outer_rows * table_rows[inner_table] / max(outer_distinct, inner_distinct)
+
+    modes = [MERGE_KEY_TEXT]
+    if table_schema(outer_metadata).column_types.get(outer_column) == table_schema(inner_metadata).column_types.get(inner_column):
+        modes.append(MERGE_KEY_TYPED)
+    for mode in modes:
+        outer_cost, outer_source = merge_input(outer_metadata, outer_column, mode, outer_rows, outer_read_cost)
+        inner_cost, inner_source = merge_input(inner_metadata, inner_column, mode, table_rows[inner_table], inner_read_cost)
+        cost = outer_cost - outer_read_cost + inner_cost + (outer_rows + table_rows[inner_table]) * MERGE_ROW_COST
+        yield cost, output, {"key": mode, "outer": outer_source, "inner": inner_source}, (outer_table, outer_column, inner_table, inner_column)
+
+def plan_join(main_table, joins, table_conditions, metadata_all, access_costs=None, order_column=None):
+    """
+    Join plan: {"table": driving table, "joins": join dicts in execution order (with "method",
+    merge joins with "merge"), "cost": estimated cost (None without statistics), "sorted": the
+    rows come out ordered by order_column}. Every connected order of the tables is costed (greedy
+    above JOIN_ENUMERATION_LIMIT tables); a table without statistics keeps the written order.
+    access_costs: table -> cost of reading its rows under its own conditions; order_column:
+    table.column of the only (ascending) ORDER BY column (a merge join on a numeric key returns
+    the rows already sorted, the final sort is then skipped).
+    """
+    written = {"table": main_table, "cost": None, "sorted": False,
+               "joins": [dict(join, method=probe_method(metadata_all[join["table"]], join["right_column"].split(".")[-1]))
+                         for join in joins]}
+    tables = [main_table] + [join["table"] for join in joins]
+    edges = join_edges(main_table, joins, metadata_all)
+    if edges is None or len(set(tables)) != len(tables) or not all(table_statistics(metadata_all[t]) for t in tables):
+        return written
+
+    access_costs = access_costs or {}
+    table_rows = {table: max(estimated_rows(metadata_all[table], table_conditions.get(table, [])), 1.0) for table in tables}
+
+    def extensions(order):
+        joined = set(order)
+        for edge in edges:
+            if (edge[0] in joined) != (edge[2] in joined):
+                yield edge[2] if edge[0] in joined else edge[0], edge
+
+    def read_cost(table):
+        cost = access_costs.get(table)
+        return cost if cost is not None else table_statistics(metadata_all[table])["rows"] * SEQ_ROW_COST
+
+    def step_options(order, rows, ordered):
+        """(cost, output rows, oriented edge, method, merge plan, output ordered) of the next joins"""
+        for inner, edge in extensions(order):
+            step_cost, output, method, oriented = join_step(rows, edge, inner, metadata_all, table_rows, read_cost(inner))
+            yield step_cost, output, oriented, method, None, ordered
+            if len(order) == 1:
+                # Merge join a két első tábla között: mindkét bemenet egy tábla a saját feltételeivel
+                for step_cost, output, merge, oriented in merge_steps(rows, read_cost(order[0]), edge, inner, metadata_all, table_rows, read_cost(inner)):
+                    # Csak szám kulcs: az ORDER BY rendezése (apply_order_by) ugyanígy rendez
+                    sorted_output = merge["key"] == MERGE_KEY_TYPED and order_column in (
+                        f"{oriented[0]}.{oriented[1]}", f"{oriented[2]}.{oriented[3]}") and \
+                        table_schema(metadata_all[oriented[0]]).column_types.get(oriented[1]) in ("INT", "FLOAT")
+                    yield step_cost, output, oriented, MERGE_JOIN, merge, sorted_output
+
+    def final_sort_cost(rows, ordered):
+        # ORDER BY: a merge join kulcsa szerint már rendezett eredmény rendezése nem kerül semmibe
+        return sort_cost(rows) if order_column and not ordered else 0.0
+
+    best = None
+    if len(tables) <= JOIN_ENUMERATION_LIMIT:
+        # Mélységi bejárás az összefüggő sorrendeken, a legjobbnál drágább ágak levágásával
+        stack = [([table], table_rows[table], read_cost(table), [], False) for table in tables]
+        while stack:
+            order, rows, cost, steps, ordered = stack.pop()
+            if best is not None and cost >= best[0]:
+                continue
+            if len(order) == len(tables):
+                cost += final_sort_cost(rows, ordered)
+                if best is None or cost < best[0]:
+                    best = (cost, order, steps, ordered)
+                continue
+            for step_cost, output, oriented, method, merge, sorted_output in step_options(order, rows, ordered):
+                stack.append((order + [oriented[2]], output, cost + step_cost, steps + [(oriented, method, merge)], sorted_output))
+    else:
+        for start in tables:
+            order, rows, cost, steps, ordered = [start], table_rows[start], read_cost(start), [], False
+            while len(order) < len(tables):
+                step_cost, output, oriented, method, merge, ordered = min(step_options(order, rows, ordered), key=lambda option: option[0])
+                order, rows, cost = order + [oriented[2]], output, cost + step_cost
+                steps = steps + [(oriented, method, merge)]
+            cost += final_sort_cost(rows, ordered)
+            if best is None or cost < best[0]:
+                best = (cost, order, steps, ordered)
+
+    cost, order, steps, ordered = best
+    planned = []
+    for (outer_table, outer_column, inner_table, inner_column), method, merge in steps:
+        join = {
+            "type": "INNER JOIN",
+            "table": inner_table,
+            "left_column": f"{outer_table}.{outer_column}",
+            "right_column": f"{inner_table}.{inner_column}",
+            "method": method
+        }
+        if merge is not None:
+            join["merge"] = merge
+        planned.append(join)
+    print(f"DEBUG: Join plan: {' -> '.join(order)} ({', '.join(step['method'] for step in planned)}), estimated cost {cost:.0f}")
+    return {"table": order[0], "joins": planned, "cost": cost, "sorted": ordered}
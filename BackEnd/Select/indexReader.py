@@ -1,41 +1,163 @@
-from BackEnd.Insert_Get_From_Mongo.db_connection import get_db_collection
-
-def load_index(database, table, name):
-
-    index_collection_name = f"{table}_{name}_ind"
-    try:
-        collection = get_db_collection(database, index_collection_name)
-        index_entries = collection.find()
-        index_map = {}
-        for doc in index_entries:
-            value = doc.get("value", "")
-            doc_ids = value.split("#") if value else []
-            index_map[doc["_id"]] = doc_ids
-        return index_map
-    except Exception as e:
-        print(f"Error loading index from MongoDB for {name}: {e}")
+from BackEnd.Storage.engine import get_store, get_index_store, index_collection_name, prefix_upper_bound
+from BackEnd.Storage.index_cache import index_cache
+from BackEnd.Create.schema import KEY_SEPARATOR, INT_RANGE, key_prefix, table_schema
+from BackEnd.Select.costModel import choose_access_paths
+from BackEnd.Insert_Get_From_Mongo.index_controller import index_entry_ids
+
+# Az index bejegyzései kulcsonként olvasódnak (egy get_many / $in a hiányzó kulcsokra, összetett
+# indexnél egy _id prefix range), a folyamat szintű index cache-en keresztül; a teljes index soha.
+
+def index_entries(database, table, index_name, keys):
+    """key -> primary keys of the index entries of keys (an empty tuple if a key is not in the index)"""
+    collection = index_collection_name(table, index_name)
+    version = index_cache.version(database, collection)
+    found, missing = index_cache.get_many(database, collection, "key", keys)
+    if missing:
+        loaded = dict.fromkeys(missing, ())
+        for doc in get_store(database, collection).get_many(missing):
+            loaded[doc["_id"]] = tuple(index_entry_ids(doc))
+        index_cache.put_many(database, collection, "key", version, loaded)
+        found.update(loaded)
+    return found
+
+def index_prefix_ids(database, table, index_name, prefix):
+    """Primary keys of the index entries whose key starts with prefix (leading columns of a composite index)"""
+    collection = index_collection_name(table, index_name)
+    version = index_cache.version(database, collection)
+    found, missing = index_cache.get_many(database, collection, "prefix", [prefix])
+    if not missing:
+        return found[prefix]
+    ids = []
+    for doc in get_store(database, collection).range_scan(prefix=prefix):
+        ids.extend(index_entry_ids(doc))
+    ids = tuple(ids)
+    index_cache.put_many(database, collection, "prefix", version, {prefix: ids})
+    return ids
+
+def index_key_ids(database, table, index, part):
+    """Primary keys of the rows whose first index column has the key text part"""
+    if len(index["columns"]) == 1:
+        return set(index_entries(database, table, index["name"], [part])[part])
+    return set(index_prefix_ids(database, table, index["name"], key_prefix(part)))
+
+def equality_index_for(schema, column):
+    """Unordered index led by column (the fewest columns first), None if there is none"""
+    candidates = [idx for idx in schema.indexes
+                  if not idx.get("ordered") and idx.get("columns") and idx["columns"][0] == column]
+    return min(candidates, key=lambda idx: len(idx["columns"]), default=None)
+
+# Rendezett (BTREE) indexek: a kulcsok az oszlop típusa szerint rendezhetők (schema.sortable_text),
+# így a tartomány, BETWEEN és '=' feltételek egy _id range scan-nel (O(log n + k)) olvashatók,
+# az index teljes betöltése nélkül. Az eredmény jelölt sorok halmaza, a WHERE utána is ellenőriz.
+
+RANGE_OPERATORS = ("=", ">", ">=", "<", "<=")
+FIXED_WIDTH_TYPES = ("INT", "FLOAT", "BOOL", "DATE")    # Fix szélességű kulcsrész: összetett indexen is rendezett
+
+def ordered_index_for(schema, column):
+    """Ordered index with column as its first column whose keys keep the order of column, None if there is none"""
+    candidates = []
+    for idx in schema.indexes:
+        columns = idx.get("columns", [])
+        if not idx.get("ordered") or not columns or columns[0] != column:
+            continue
+        # Összetett kulcsban a '$' elválasztó a szöveges első oszlop sorrendjét elrontaná
+        if len(columns) == 1 or schema.column_types.get(column) in FIXED_WIDTH_TYPES:
+            candidates.append(idx)
+    return min(candidates, key=lambda idx: len(idx["columns"]), default=None)
+
+def range_bound(schema, index, value):
+    """Key text of a condition value in the first column of an index, None if it has no exact key"""
+    column = index["columns"][0]
+    col_type = schema.column_types.get(column)
+    if not isinstance(value, str):
         return None
+    if col_type in ("INT", "FLOAT", "BOOL"):
+        value = schema.literal(column, value.strip())
+        if isinstance(value, str) or (col_type == "INT" and not INT_RANGE[0] <= value <= INT_RANGE[1]):
+            return None
+    else:
+        # DATE és szöveg: a WHERE is szövegként hasonlít
+        value = value.strip()
+    return schema.index_part(index, 0, value)
+
+def index_key_range(schema, index, conditions):
+    """
+    (low, high, include_low, include_high) _id bounds of the conditions on the first column of
+    an ordered index, None if none of them can be turned into a key
+    """
+    composite = len(index["columns"]) > 1
+    low = high = None
+    include_low = include_high = True
+    used = False
+    for cond in conditions:
+        op = cond["op"]
+        part = range_bound(schema, index, cond["value"])
+        if op not in RANGE_OPERATORS or part is None:
+            continue
+        used = True
+        # Összetett index: az érték összes kulcsa part + '$' + ... alakú
+        if op in ("=", ">", ">="):
+            if composite and op == ">":
+                key, inclusive = prefix_upper_bound(part + KEY_SEPARATOR), True
+            else:
+                key, inclusive = part, op != ">"
+            if low is None or key > low or (key == low and not inclusive):
+                low, include_low = key, inclusive
+        if op in ("=", "<", "<="):
+            if composite and op != "<":
+                key, inclusive = prefix_upper_bound(part + KEY_SEPARATOR), False
+            else:
+                key, inclusive = part, op != "<"
+            if high is None or key < high or (key == high and not inclusive):
+                high, include_high = key, inclusive
+    return (low, high, include_low, include_high) if used else None
+
+def ordered_range_ids(database, table, index, key_range):
+    """Primary keys of the index entries inside key_range"""
+    low, high, include_low, include_high = key_range
+    ids = set()
+    for doc in get_index_store(database, table, index["name"]).range_scan(low, high, include_low, include_high):
+        ids.update(index_entry_ids(doc))
+    return ids
+
+def index_access_paths(schema, conditions):
+    """
+    Index accesses usable for the conditions: the key range of every column leading an ordered
+    index, the key of every '=' condition on a column leading an unordered one
+    ([{"index", "column", "conditions", "key_range" or "part"}])
+    """
+    by_column = {}
+    for cond in conditions:
+        if cond["op"] in RANGE_OPERATORS:
+            by_column.setdefault(cond["column"], []).append(cond)
+
+    paths = []
+    for column, column_conditions in by_column.items():
+        index = ordered_index_for(schema, column)
+        if index is not None:
+            key_range = index_key_range(schema, index, column_conditions)
+            if key_range is not None:
+                paths.append({"index": index, "column": column, "conditions": column_conditions, "key_range": key_range})
+            continue
+        index = equality_index_for(schema, column)
+        for cond in column_conditions:
+            part = range_bound(schema, index, cond["value"]) if index and cond["op"] == "=" else None
+            if part is not None:
+                paths.append({"index": index, "column": column, "conditions": [cond], "part": part})
+    return paths
+
+def read_access_path(database, table, path):
+    """Candidate primary keys of one index access"""
+    index = path["index"]
+    if "key_range" in path:
+        ids = ordered_range_ids(database, table, index, path["key_range"])
+        print(f"DEBUG: Ordered index '{index['name']}' range scan on '{path['column']}': {len(ids)} rows")
+    else:
+        ids = index_key_ids(database, table, index, path["part"])
+        print(f"DEBUG: Index '{index['name']}' lookup on '{path['column']}': {len(ids)} rows")
+    return ids
 
-def get_matching_ids_from_index(index_data, operator, target):
-
-    matching_ids = set()
-    for key, id_list in index_data.items():
-        try:
-            k = float(key)
-            t = float(target)
-        except ValueError:
-            k = key
-            t = target
-
-        if operator == "=" and k == t:
-            matching_ids.update(id_list)
-        elif operator == ">" and k > t:
-            matching_ids.update(id_list)
-        elif operator == "<" and k < t:
-            matching_ids.update(id_list)
-        elif operator == ">=" and k >= t:
-            matching_ids.update(id_list)
-        elif operator == "<=" and k <= t:
-            matching_ids.update(id_list)
-
-    return matching_ids
+def index_id_sets(database, table, table_metadata, conditions):
+    """Candidate primary key sets of the index accesses the planner chose (an empty list: full scan)"""
+    paths = index_access_paths(table_schema(table_metadata), conditions)
+    return [read_access_path(database, table, path) for path in choose_access_paths(table_metadata, paths)]
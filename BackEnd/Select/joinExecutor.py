@@ -1,37 +1,73 @@
-from BackEnd.Insert_Get_From_Mongo.db_connection import get_db_collection
-from BackEnd.Select.indexReader import load_index
-from BackEnd.Select.whereEvaluator import apply_where_conditions
+import os
+import heapq
+from BackEnd.Storage.engine import get_store, index_collection_name
+from BackEnd.Select.indexReader import index_access_paths, index_id_sets, index_entries, index_prefix_ids
+from BackEnd.Select.costModel import access_plan, plan_join, column_table, HASH_JOIN, MERGE_JOIN, MERGE_KEY_TYPED, SORT_RUN_ROWS
+from BackEnd.Select.whereEvaluator import compare_values, compile_conditions, condition_predicate, predicate_rank, all_of
+from BackEnd.Create.schema import table_schema, key_text, key_prefix, sortable_text
+from BackEnd.Insert_Get_From_Mongo.zone_map import candidate_ranges, scan_ranges
+from BackEnd.Insert_Get_From_Mongo.bloom_filter import bloom_may_contain
+from BackEnd.Insert_Get_From_Mongo.index_controller import index_entry_ids, spill_sorted_run, read_sorted_run
+from BackEnd.Select.aggregationProcessor import get_column_index
 
 # Batch size konfigurálása
 BATCH_SIZE = 10000  # Egyszerre max 1000 sor memóriában
-MAX_JOIN_CACHE_SIZE = 5000  # JOIN táblák cache mérete
 
-def execute_join(database, main_table, joins, selected_columns, conditions, metadata_all, is_distinct=False):
+def execute_join(database, main_table, joins, selected_columns, conditions, metadata_all, is_distinct=False, order_by=None):
     all_tables = [main_table] + [join["table"] for join in joins]
+
+    # Prefix nélküli oszlopnevek feloldása a megírt tábla sorrend szerint (a végrehajtási sorrendet a tervező adja)
+    output_columns = [qualify_column(col, all_tables, metadata_all) for col in selected_columns]
+    conditions = [dict(cond, column=qualify_column(cond["column"], all_tables, metadata_all)) for cond in conditions]
     
     # 1. WHERE feltételek szétválasztása MINDEN TÁBLÁRA külön
     table_conditions = separate_conditions_by_table(conditions, all_tables, metadata_all)
-    
-    # 2. Index cache betöltése (csak metadata, nem a teljes adat)
+
+    # 1b. JOIN sorrend és módszer a statisztikák alapján (költség modell)
+    access_costs = {}
+    for table in all_tables:
+        paths = index_access_paths(table_schema(metadata_all[table]), table_conditions.get(table, []))
+        access_costs[table] = access_plan(metadata_all[table], paths)[0]
+    # Egyetlen növekvő ORDER BY oszlop: a JOIN kulcsán merge join-nal már rendezett az eredmény
+    # (a DISTINCT halmaza a sorrendet nem őrzi meg)
+    order_column = None
+    if order_by and len(order_by) == 1 and order_by[0].get("direction", "ASC").upper() == "ASC" and not is_distinct:
+        order_column = qualify_column(order_by[0]["column"], all_tables, metadata_all)
+    plan = plan_join(main_table, joins, table_conditions, metadata_all, access_costs, order_column)
+    main_table, joins = plan["table"], plan["joins"]
+    
+    # 2. Használható indexek (csak metadata, a bejegyzések kulcsonként olvasódnak)
     index_cache = preload_all_indexes(database, joins, all_tables, metadata_all)
     
     # 3. JOIN táblák query-inek előkészítése (NEM betöltés!)
     join_queries = prepare_join_table_queries(database, table_conditions, joins, metadata_all)
+
+    # 3b. Hash join: a belső tábla egyszeri bejárása (a saját feltételeivel szűrve), hash tábla a JOIN kulcsra
+    for join in joins:
+        if join.get("method") == HASH_JOIN:
+            query_info = join_queries[join["table"]]
+            query_info["hash_table"] = build_hash_table(query_info, join["right_column"].split(".")[-1])
     
-    # 4. Main table batch-enkénti feldolgozása
+    # 4. Main table batch-enkénti feldolgozása (merge join esetén az első JOIN összefésült sorai)
     result_rows = []
     main_query = build_query_for_table(database, main_table, table_conditions.get(main_table, []), metadata_all[main_table])
+    if joins and joins[0]["method"] == MERGE_JOIN:
+        batches = merge_join_batches(database, main_query, joins[0], join_queries[joins[0]["table"]], BATCH_SIZE)
+        first_join = 1
+    else:
+        batches = get_table_batches(main_query, BATCH_SIZE)
+        first_join = 0
     
     batch_count = 0
-    for main_batch in get_table_batches(main_query, BATCH_SIZE):
+    for main_batch in batches:
         batch_count += 1
         print(f"Processing main table batch {batch_count} with {len(main_batch)} records")
         
         # Batch-re JOIN végrehajtás
         batch_results = process_main_batch(
             database, main_batch, main_table, joins, 
-            join_queries, selected_columns, conditions, 
-            metadata_all, index_cache
+            join_queries, output_columns, conditions, 
+            metadata_all, index_cache, all_tables, first_join
         )
         
         result_rows.extend(batch_results)
@@ -59,19 +95,32 @@ def execute_join(database, main_table, joins, selected_columns, conditions, meta
             
     return {
         "headers": actual_headers,
-        "rows": result_rows
+        "rows": result_rows,
+        "sorted": output_sorted_by(actual_headers, order_by, order_column, plan, all_tables, metadata_all)
     }
 
+def output_sorted_by(headers, order_by, order_column, plan, all_tables, metadata_all):
+    """The ORDER BY sort can be skipped: the plan returns the rows ordered by the column the sort would use"""
+    if not order_column or not plan.get("sorted"):
+        return False
+    # Az apply_order_by ugyanígy keresi meg a rendező oszlopot a fejlécben
+    position = get_column_index(headers, order_by[0]["column"])
+    return position != -1 and qualify_column(headers[position], all_tables, metadata_all) == order_column
+
+def query_docs(query_info, batch_size=None):
+    """Documents of a prepared table query: the index-filtered ids, the zone map key ranges or a full scan"""
+    store = query_info["store"]
+    ids = query_info["ids"]
+    if ids is not None:
+        return store.get_many(ids)
+    if query_info.get("ranges") is not None:
+        return scan_ranges(store, query_info["ranges"])
+    return store.scan(batch_size)
+
 def get_table_batches(query_info, batch_size):
-    """Batch-enkénti lekérés MongoDB cursor-ral"""
-    collection = query_info["collection"]
-    query_filter = query_info["filter"]
-    projection = query_info["projection"]
-    
-    cursor = collection.find(query_filter, projection).batch_size(batch_size)
-    
+    """Batch-enkénti lekérés a tárolóból"""
     batch = []
-    for doc in cursor:
+    for doc in query_docs(query_info, batch_size):
         batch.append(doc)
         
         if len(batch) >= batch_size:
@@ -84,10 +133,9 @@ def get_table_batches(query_info, batch_size):
 
 def build_query_for_table(database, table_name, conditions, table_metadata):
     """JAVÍTOTT: Main table-ből is megfelelően betöltjük a value mezőt"""
-    collection = get_db_collection(database, table_name)
+    store = get_store(database, table_name)
     
     # Index használható feltételek feldolgozása
-    query_filter = {}
     remaining_conditions = []
     
     # Megkeressük az indexed oszlopokat
@@ -96,7 +144,7 @@ def build_query_for_table(database, table_name, conditions, table_metadata):
         if isinstance(idx, dict) and "columns" in idx:
             indexed_columns.update(idx["columns"])
     
-    # MongoDB query építése index feltételekből
+    # Index feltételek és maradék feltételek szétválasztása
     for cond in conditions:
         column = cond["column"]
         
@@ -110,42 +158,27 @@ def build_query_for_table(database, table_name, conditions, table_metadata):
     
     # Index-alapú ID-k lekérése
     indexed_ids = load_indexed_ids_for_conditions(database, table_name, conditions, table_metadata)
-    
-    if indexed_ids is not None:
-        query_filter["_id"] = {"$in": list(indexed_ids)}
-    
-    # JAVÍTOTT PROJEKCIÓ LOGIKA - MINDIG BETÖLTJÜK A VALUE MEZŐT
-    projection = {"_id": 1, "value": 1}  # Mindig betöltjük mindkét mezőt
+
+    # Index nélkül: a tartomány feltételek a zone map blokkjait szűkítik
+    ranges = None
+    if indexed_ids is None:
+        ranges = candidate_ranges(database, table_name, table_metadata, conditions)
     
     return {
-        "collection": collection,
-        "filter": query_filter,
-        "projection": projection,
+        "store": store,
+        "ids": indexed_ids,  # None: nincs index szűrés, teljes bejárás
+        "ranges": ranges,    # None: nincs zone map szűkítés
         "remaining_conditions": remaining_conditions,
+        "conditions": conditions,
         "table_metadata": table_metadata,
         "table_name": table_name
     }
 
 def load_indexed_ids_for_conditions(database, table_name, conditions, table_metadata):
     """Index-ek használatával ID-k lekérése WHERE feltételekhez"""
-    matching_ids_sets = []
-    
-    indexed_columns = set()
-    for idx in table_metadata.get("indexes", []):
-        if isinstance(idx, dict) and "columns" in idx:
-            indexed_columns.update(idx["columns"])
-    
-    for cond in conditions:
-        if cond["column"] in indexed_columns and cond["op"] == "=":
-            # Keresünk megfelelő indexet
-            best_index = find_best_index_for_column(table_metadata, cond["column"])
-            if best_index:
-                index_data = load_index(database, table_name, best_index["name"])
-                if index_data and cond["value"] in index_data:
-                    ids = index_data[cond["value"]]
-                    if isinstance(ids, str):
-                        ids = [ids]
-                    matching_ids_sets.append(set(ids))
+    # Rendezett (BTREE) indexek: tartomány és '=' feltételek range scan-nel, a többi index '='
+    # feltételei kulcsonkénti olvasással (statisztikák esetén a költség modell szerint)
+    matching_ids_sets = index_id_sets(database, table_name, table_metadata, conditions)
     
     if matching_ids_sets:
         # Metszet az összes index feltételből
@@ -166,220 +199,327 @@ def prepare_join_table_queries(database, table_conditions, joins, metadata_all):
             database, table, table_conds, metadata_all[table]
         )
         
-        # JAVÍTÁS: A projekció már megfelelően van beállítva a build_query_for_table-ben
-        # Nincs szükség további módosításra
-        
         join_queries[table] = query_info
     
     return join_queries
 
-def process_main_batch(database, main_batch, main_table, joins, join_queries, selected_columns, conditions, metadata_all, index_cache):
-    """Javított batch feldolgozás"""
+def process_main_batch(database, main_batch, main_table, joins, join_queries, selected_columns, conditions, metadata_all, index_cache, output_tables=None, first_join=0):
+    """
+    Javított batch feldolgozás (output_tables: a '*' oszlopainak tábla sorrendje; first_join = 1:
+    a batch a main table és az első JOIN tábla merge join-nal összefésült sorait tartalmazza)
+    """
     batch_results = []
-    join_cache = {}
-    
-    for main_doc in main_batch:
-        # JAVÍTÁS: Main table WHERE feltételek alkalmazása
-        main_table_conditions = []
-        for cond in conditions:
-            column = cond["column"]
-            # Ha prefix nélküli vagy main table prefixű
-            if "." not in column:
-                # Ellenőrizzük, hogy a main table-ben van-e ilyen oszlop
-                main_table_columns = [col["name"] for col in metadata_all[main_table]["columns"]]
-                if column in main_table_columns:
-                    main_table_conditions.append(cond)
-            elif column.startswith(f"{main_table}."):
-                cond_copy = cond.copy()
-                cond_copy["column"] = column.split(".")[1]
-                main_table_conditions.append(cond_copy)
-        
-        # Main sor szűrése
-        if main_table_conditions and not apply_where_conditions(main_doc, metadata_all[main_table], main_table_conditions):
-            continue
-        
-        # JOIN végrehajtás
-        joined_row = build_row_from_doc(main_doc, main_table, metadata_all[main_table])
-        
-        join_results = execute_joins_with_batch_cache(
-            database, joined_row, joins, 0, join_queries, 
-            join_cache, index_cache, metadata_all
-        )
-        
-        for join_result in join_results:
-            # JAVÍTÁS: Cross-table WHERE feltételek
-            cross_table_conditions = []
-            for cond in conditions:
-                column = cond["column"]
-                if "." in column:
-                    table_name = column.split(".")[0]
-                    if table_name != main_table and table_name in [j["table"] for j in joins]:
-                        cross_table_conditions.append(cond)
-                elif column not in [col["name"] for col in metadata_all[main_table]["columns"]]:
-                    # Nem main table oszlop - lehet JOIN table oszlop
-                    cross_table_conditions.append(cond)
-            
-            if apply_cross_table_conditions(join_result, cross_table_conditions, [main_table] + [j["table"] for j in joins], metadata_all):
-                selected_row = select_join_columns(join_result, selected_columns, [main_table] + [j["table"] for j in joins], metadata_all)
-                batch_results.append(selected_row)
+    all_tables = [main_table] + [j["table"] for j in joins]
+    output_tables = output_tables or all_tables
+    join_tables = all_tables[1:]
+
+    # A feltételek szétosztása és lefordítása batch-enként egyszer (nem soronként)
+    main_schema = table_schema(metadata_all[main_table])
+    main_table_conditions = []
+    cross_table_conditions = []
+    for cond in conditions:
+        column = cond["column"]
+        # Ha prefix nélküli vagy main table prefixű
+        if "." not in column:
+            if column in main_schema.positions:
+                main_table_conditions.append(cond)
+            else:
+                # Nem main table oszlop - lehet JOIN table oszlop
+                cross_table_conditions.append(cond)
+        elif column.startswith(f"{main_table}."):
+            cond_copy = cond.copy()
+            cond_copy["column"] = column.split(".")[1]
+            main_table_conditions.append(cond_copy)
+        elif column.split(".")[0] in join_tables:
+            cross_table_conditions.append(cond)
+
+    main_matches = compile_conditions(main_schema, main_table_conditions)
+    cross_matches = compile_cross_table_conditions(cross_table_conditions, join_tables, metadata_all)
+
+    # Main sorok szűrése, majd a JOIN-ok a teljes batch-re szintenként
+    if first_join:
+        # A merge join bemenetei már a saját feltételeikkel szűrtek
+        joined_rows = main_batch
+    else:
+        joined_rows = []
+        for main_doc in main_batch:
+            values = main_schema.decode(main_doc)
+            if main_matches(values):
+                joined_rows.append(build_row_from_values(values, main_table, main_schema))
+
+    join_results = execute_joins_batched(database, joined_rows, joins, first_join, join_queries, index_cache, metadata_all)
+
+    for join_result in join_results:
+        # Cross-table WHERE feltételek
+        if cross_matches(join_result):
+            selected_row = select_join_columns(join_result, selected_columns, output_tables, metadata_all)
+            batch_results.append(selected_row)
     
     return batch_results
 
-def execute_joins_with_batch_cache(database, current_row, joins, join_index, join_queries, join_cache, index_cache, metadata_all):
-    """JOIN végrehajtás batch-specifikus cache-sel"""
-    if join_index >= len(joins):
-        return [current_row]
-    
+def compile_cross_table_conditions(conditions, join_tables, metadata_all):
+    """Conditions on JOIN table columns -> function of a joined row dict -> bool"""
+    compiled = []
+    for cond in conditions:
+        column = cond["column"]
+        if "." in column:
+            table, name = column.split(".", 1)
+        else:
+            table = next((t for t in join_tables if column in table_schema(metadata_all[t]).positions), None)
+            name = column
+        col_type = table_schema(metadata_all[table]).column_types.get(name) if table in metadata_all else None
+
+        # A JOIN sor prefixes és prefix nélküli kulcsokat is tartalmaz
+        read = lambda row, key=column: row.get(key)
+        predicate = condition_predicate(read, col_type, cond["op"], cond["value"])
+        compiled.append((predicate_rank(cond["op"], col_type), predicate))
+
+    compiled.sort(key=lambda entry: entry[0])
+    return all_of([predicate for _, predicate in compiled])
+
+def execute_joins_batched(database, rows, joins, join_index, join_queries, index_cache, metadata_all):
+    """
+    JOIN végrehajtás szintenként: a sorok BATCH_SIZE méretű csoportjainak különböző JOIN értékei
+    egyetlen lekérdezéssel ($in az _id-ra / index kulcsokra) olvasódnak a következő táblából
+    """
+    if join_index >= len(joins) or not rows:
+        return rows
+
     current_join = joins[join_index]
     join_table = current_join["table"]
     left_column = current_join["left_column"]
     right_column = current_join["right_column"].split(".")[-1]
-    
-    left_value = get_column_value_from_row(current_row, left_column)
-    if left_value is None:
-        return []
-    
-    # Cache kulcs a JOIN értékhez
-    cache_key = f"{join_table}_{right_column}_{left_value}"
-    
-    # Cache ellenőrzés
-    if cache_key in join_cache:
-        matching_docs = join_cache[cache_key]
-    else:
-        # Cache-ben nincs: lekérés és cache-lés
-        matching_docs = find_matching_docs_with_batch_optimization(
-            database, join_table, right_column, left_value,
-            join_queries[join_table], index_cache, metadata_all[join_table]
-        )
-        
-        # Cache size limit ellenőrzés
-        if len(join_cache) < MAX_JOIN_CACHE_SIZE:
-            join_cache[cache_key] = matching_docs
-        else:
-            # Cache full: LRU vagy nincs cache
-            pass
-    
-    matching_rows = []
-    for join_doc in matching_docs:
-        join_row = build_row_from_doc(join_doc, join_table, metadata_all[join_table])
-        combined_row = {**current_row, **join_row}
-        
-        # Rekurzív következő JOIN
-        sub_results = execute_joins_with_batch_cache(
-            database, combined_row, joins, join_index + 1,
-            join_queries, join_cache, index_cache, metadata_all
-        )
-        matching_rows.extend(sub_results)
-    
-    return matching_rows
+    query_info = join_queries[join_table]
+    table_metadata = metadata_all[join_table]
 
-def find_matching_docs_with_batch_optimization(database, table, column, value, query_info, index_cache, table_metadata):
-    """JOIN oszlop alapján keresés batch-optimalizált módon"""
-    
-    # 1. Index használat prioritása
-    matching_docs = []
-    
-    # Primary Key ellenőrzés
+    results = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
+
+        # A batch különböző JOIN értékei (key text -> érték)
+        values = {}
+        for row in chunk:
+            value = get_column_value_from_row(row, left_column)
+            if value is not None:
+                values.setdefault(key_text(value), value)
+
+        # Hash join: a belső tábla sorai a JOIN kulcs szerint előre csoportosítva,
+        # egyébként a batch kulcs -> dokumentumok térképe egy lekérdezésből
+        matching = query_info.get("hash_table")
+        if matching is None:
+            matching = find_matching_docs_batch(database, join_table, right_column, values, query_info, index_cache, table_metadata)
+
+        joined_rows = {}    # key text -> a belső tábla JOIN sorai (dokumentumonként egyszer dekódolva)
+        next_rows = []
+        for row in chunk:
+            value = get_column_value_from_row(row, left_column)
+            if value is None:
+                continue
+            key = key_text(value)
+            if key not in joined_rows:
+                joined_rows[key] = [build_row_from_doc(doc, join_table, table_metadata) for doc in matching.get(key, ())]
+            for join_row in joined_rows[key]:
+                next_rows.append({**row, **join_row})
+
+        results.extend(execute_joins_batched(database, next_rows, joins, join_index + 1, join_queries, index_cache, metadata_all))
+
+    return results
+
+def find_matching_docs_batch(database, table, column, values, query_info, index_cache, table_metadata):
+    """key text -> documents of table whose column matches the value, for all values of a batch at once"""
+
+    # 0. Bloom filter: a biztosan hiányzó értékekre nincs sem index, sem table scan
+    values = {key: value for key, value in values.items()
+              if bloom_may_contain(database, table, table_metadata, column, value)}
+    if not values:
+        return {}
+    print(f"DEBUG: Batched JOIN lookup on '{table}.{column}': {len(values)} keys")
+
+    # 1. Primary Key ellenőrzés
     primary_keys = table_metadata.get("constraints", {}).get("primary_key", [])
     if column in primary_keys:
-        matching_docs = search_by_primary_key_with_query(
-            database, table, column, value, primary_keys, query_info
-        )
-        return matching_docs
-    
+        return search_by_primary_key_batch(database, table, column, values, primary_keys, query_info)
+
     # 2. Explicit index használat
     for index_key, index_info in index_cache.items():
         if (index_key.startswith(f"{table}_") and 
             index_info.get("type") in ["explicit", "where_index"] and
-            column in index_info.get("metadata", {}).get("columns", [])):
-            
-            matching_docs = search_with_index_and_query(
-                database, table, column, value, index_info, query_info
-            )
-            return matching_docs
-    
-    # 3. Fallback: filtered table scan
-    return search_with_table_scan_filtered(database, table, column, value, query_info)
+            index_info.get("metadata", {}).get("columns", [None])[0] == column):
+            return search_with_index_batch(database, table, values, index_info, query_info)
+
+    # 3. Fallback: egyetlen szűrt table scan az összes értékre
+    return search_with_table_scan_batch(table, column, values, query_info)
+
+def search_by_primary_key_batch(database, table, column, values, primary_keys, query_info):
+    """Primary key keresés: egyszerű PK-nál egy _id $in lekérdezés a batch összes kulcsára"""
+    store = query_info["store"]
+    allowed_ids = query_info["ids"]
 
-def search_by_primary_key_with_query(database, table, column, value, primary_keys, query_info):
-    """Primary key keresés a pre-built query-vel kombinálva"""
-    collection = query_info["collection"]
-    base_filter = query_info["filter"].copy()
-    projection = query_info["projection"]
-    
     if len(primary_keys) == 1:
-        # Egyszerű PK
-        if column == primary_keys[0]:
-            base_filter["_id"] = str(value)
+        # Egyszerű PK: a JOIN érték key text-je maga az _id
+        matching = {}
+        for doc in store.get_many(list(values)):
+            matching.setdefault(doc["_id"], []).append(doc)
+    elif primary_keys.index(column) == 0:
+        # Composite PK: kulcs-prefix szerinti range scan értékenként
+        matching = {key: list(store.range_scan(prefix=key_prefix(value))) for key, value in values.items()}
     else:
-        # Composite PK: regex keresés
-        column_position = primary_keys.index(column)
-        if column_position == 0:
-            base_filter["_id"] = {"$regex": f"^{value}($|\\$)"}
-        else:
-            # Composite PK közepén: table scan
-            return search_with_table_scan_filtered(database, table, column, value, query_info)
-    
-    return list(collection.find(base_filter, projection))
-
-def search_with_index_and_query(database, table, column, value, index_info, query_info):
-    """Index + query kombináció"""
-    index_data = index_info["data"]
-    index_metadata = index_info["metadata"]
-    columns = index_metadata["columns"]
-    
-    # Index-ből ID-k lekérése
-    matching_ids = set()
-    column_position = columns.index(column) if column in columns else -1
-    
-    if column_position == 0:
-        # Prefix match
-        if str(value) in index_data:
-            ids = index_data[str(value)]
-            if isinstance(ids, str):
-                matching_ids.add(ids)
-            else:
-                matching_ids.update(ids)
-    
-    if not matching_ids:
-        return []
-    
+        # Composite PK közepén: table scan
+        return search_with_table_scan_batch(table, column, values, query_info)
+
+    if allowed_ids is not None:
+        matching = {key: [doc for doc in docs if doc["_id"] in allowed_ids] for key, docs in matching.items()}
+    return matching
+
+def search_with_index_batch(database, table, values, index_info, query_info):
+    """Index + query kombináció: a batch kulcsainak index bejegyzései, majd egy _id $in lekérdezés"""
+    # A JOIN értékek bejegyzései (összetett indexnél kulcs prefix), a rendezett indexek kulcsa típus szerint kódolt
+    schema = table_schema(query_info["table_metadata"])
+    index = schema.get_index(index_info["metadata"]["name"]) or index_info["metadata"]
+    parts = {key: schema.index_part(index, 0, value) for key, value in values.items()}
+    if len(index["columns"]) == 1:
+        entries = index_entries(database, table, index["name"], list(set(parts.values())))
+    else:
+        entries = {part: index_prefix_ids(database, table, index["name"], key_prefix(part)) for part in set(parts.values())}
+
     # Query + index ID-k kombinálása
-    collection = query_info["collection"]
-    base_filter = query_info["filter"].copy()
-    
-    if "_id" in base_filter:
+    all_ids = set()
+    for ids in entries.values():
+        all_ids.update(ids)
+    if query_info["ids"] is not None:
         # Metszet a már meglévő ID szűrővel
-        existing_ids = base_filter["_id"]["$in"] if "$in" in base_filter["_id"] else []
-        final_ids = matching_ids.intersection(set(existing_ids)) if existing_ids else matching_ids
-    else:
-        final_ids = matching_ids
-    
-    base_filter["_id"] = {"$in": list(final_ids)}
-    
-    return list(collection.find(base_filter, query_info["projection"]))
+        all_ids &= query_info["ids"]
+    if not all_ids:
+        return {}
 
-def search_with_table_scan_filtered(database, table, column, value, query_info):
-    """Filtered table scan (query alapú szűréssel)"""
-    collection = query_info["collection"]
-    base_filter = query_info["filter"]
-    projection = query_info["projection"]
-    
-    matching_docs = []
-    
-    # Batch-enkénti feldolgozás a table scan-hez is
-    cursor = collection.find(base_filter, projection).batch_size(500)
-    
-    for doc in cursor:
+    docs_by_id = {doc["_id"]: doc for doc in query_info["store"].get_many(all_ids)}
+    return {key: [docs_by_id[i] for i in entries[part] if i in docs_by_id] for key, part in parts.items()}
+
+def search_with_table_scan_batch(table, column, values, query_info):
+    """Filtered table scan (query alapú szűréssel), egy bejárás a batch összes JOIN értékére"""
+    matching = {}
+    for doc in query_docs(query_info, 500):
         doc_row = build_row_from_doc(doc, table, query_info["table_metadata"])
-        if str(get_column_value_from_row(doc_row, column)) == str(value):
-            matching_docs.append(doc)
-            
-            # Memory limit a table scan-re
-            if len(matching_docs) > 1000:  # Max 1000 match per JOIN
-                break
-    
-    return matching_docs
+        key = key_text(get_column_value_from_row(doc_row, column))
+        if key in values:
+            matching.setdefault(key, []).append(doc)
+    return matching
+
+def build_hash_table(query_info, column):
+    """Build side of a hash join: key text of column -> documents of the table matching its own conditions"""
+    schema = table_schema(query_info["table_metadata"])
+    if column not in schema.positions:
+        # Az ON feltétel nem a JOIN tábla oszlopát nevezi meg: nincs illeszkedő sor
+        return {}
+    matches = compile_conditions(schema, query_info["conditions"])
+    position = schema.positions[column]
+    hash_table = {}
+    rows = 0
+    for doc in query_docs(query_info, BATCH_SIZE):
+        values = schema.decode(doc)
+        if matches(values) and values[position] is not None:
+            hash_table.setdefault(key_text(values[position]), []).append(doc)
+            rows += 1
+    print(f"DEBUG: Hash join build on '{query_info['table_name']}.{column}': {rows} rows, {len(hash_table)} keys")
+    return hash_table
+
+def merge_join_batches(database, outer_query, join, inner_query, batch_size):
+    """
+    Sort-merge join of the main table and the first JOIN table: both inputs are read under their
+    own conditions in join key order (primary key / ordered index order, or externally sorted)
+    and merged in one pass; batches of joined rows in join key order
+    """
+    merge = join["merge"]
+    run_files = []
+    try:
+        outer = sorted_join_input(database, outer_query, join["left_column"].split(".")[-1], merge["key"], merge["outer"], run_files)
+        inner = sorted_join_input(database, inner_query, join["right_column"].split(".")[-1], merge["key"], merge["inner"], run_files)
+        batch = []
+        for outer_row, inner_row in merge_pairs(outer, inner):
+            batch.append({**outer_row, **inner_row})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        for path in run_files:
+            os.remove(path)
+
+def merge_pairs(outer, inner):
+    """Row pairs of equal keys of two key-ordered (key, row) streams; only one inner key group is kept in memory"""
+    inner = iter(inner)
+    current = next(inner, None)
+    group_key, group = None, []
+    for key, outer_row in outer:
+        if key != group_key:
+            while current is not None and current[0] < key:
+                current = next(inner, None)
+            group_key, group = key, []
+            while current is not None and current[0] == key:
+                group.append(current[1])
+                current = next(inner, None)
+        for inner_row in group:
+            yield outer_row, inner_row
+
+def sorted_join_input(database, query_info, column, mode, source, run_files):
+    """(merge key, join row) pairs of a table matching its own conditions, in merge key order"""
+    table = query_info["table_name"]
+    schema = table_schema(query_info["table_metadata"])
+    matches = compile_conditions(schema, query_info["conditions"])
+    position = schema.positions[column]
+    col_type = schema.column_types.get(column)
+    merge_key = (lambda value: sortable_text(value, col_type)) if mode == MERGE_KEY_TYPED else key_text
+
+    if source is None:
+        docs = query_docs(query_info, BATCH_SIZE)
+    elif "primary_key" in source:
+        docs = query_info["store"].range_scan()
+    else:
+        docs = ordered_index_docs(database, query_info, source["index"])
+    pairs = ((merge_key(values[position]), values) for values in map(schema.decode, docs)
+             if values[position] is not None and matches(values))
+    if source is None:
+        pairs = external_sort(pairs, run_files)
+    print(f"DEBUG: Merge join input '{table}.{column}': {'sorted' if source is None else source}")
+
+    for key, values in pairs:
+        yield key, build_row_from_values(values, table, schema)
+
+def ordered_index_docs(database, query_info, index_name):
+    """Documents of a table in the key order of one of its ordered indexes (batched _id lookups)"""
+    store = query_info["store"]
+    index_store = get_store(database, index_collection_name(query_info["table_name"], index_name))
+    ids = []
+    for entry in index_store.range_scan():
+        ids.extend(index_entry_ids(entry))
+        if len(ids) >= BATCH_SIZE:
+            yield from docs_in_order(store, ids)
+            ids = []
+    if ids:
+        yield from docs_in_order(store, ids)
+
+def docs_in_order(store, ids):
+    docs_by_id = {doc["_id"]: doc for doc in store.get_many(ids)}
+    return [docs_by_id[i] for i in ids if i in docs_by_id]
+
+def external_sort(pairs, run_files):
+    """
+    (key, values) pairs in key order: sorted runs of SORT_RUN_ROWS pairs, spilled to temp files
+    and merged (run_files collects the files for the caller to remove)
+    """
+    # A sorszám miatt az értékek sosem hasonlítódnak össze (és a rendezés stabil)
+    run = []
+    spilled = []
+    for number, (key, values) in enumerate(pairs):
+        run.append((key, number, values))
+        if len(run) >= SORT_RUN_ROWS:
+            spilled.append(spill_sorted_run(run))
+            run_files.append(spilled[-1])
+            run = []
+    run.sort()
+    for key, _, values in heapq.merge(iter(run), *(read_sorted_run(path) for path in spilled)):
+        yield key, values
 
 # Eredeti helper függvények változatlanul (csak a neveket újrahasznosítjuk)
 def separate_conditions_by_table(conditions, all_tables, metadata_all):
@@ -440,7 +580,7 @@ def separate_conditions_by_table(conditions, all_tables, metadata_all):
     return table_conditions
 
 def preload_all_indexes(database, joins, all_tables, metadata_all):
-    """Index metadata betöltése (teljes adat nélkül ahol lehetséges)"""
+    """Index metadata of the JOIN and WHERE indexes (the entries are read per key when probed)"""
     index_cache = {}
     
     # JOIN indexek
@@ -465,13 +605,10 @@ def preload_all_indexes(database, joins, all_tables, metadata_all):
         
         if best_index:
             index_key = f"{table}_{best_index['name']}_JOIN"
-            loaded_index = load_index(database, table, best_index["name"])
-            if loaded_index:
-                index_cache[index_key] = {
-                    "type": "explicit",
-                    "data": loaded_index,
-                    "metadata": best_index
-                }
+            index_cache[index_key] = {
+                "type": "explicit",
+                "metadata": best_index
+            }
     
     # WHERE indexek
     for table in all_tables:
@@ -480,49 +617,15 @@ def preload_all_indexes(database, joins, all_tables, metadata_all):
             if isinstance(idx, dict) and "name" in idx:
                 index_key = f"{table}_{idx['name']}_WHERE"
                 if index_key not in index_cache:
-                    loaded_index = load_index(database, table, idx["name"])
-                    if loaded_index:
-                        index_cache[index_key] = {
-                            "type": "where_index",
-                            "data": loaded_index,
-                            "metadata": idx,
-                            "table": table
-                        }
+                    index_cache[index_key] = {
+                        "type": "where_index",
+                        "metadata": idx,
+                        "table": table
+                    }
     
     return index_cache
 
 # További helper függvények (változatlanul az eredeti kódból)
-def find_best_index_for_column(table_metadata, column):
-    suitable_indexes = []
-    
-    for idx in table_metadata.get("indexes", []):
-        if isinstance(idx, dict) and "columns" in idx:
-            if column in idx["columns"]:
-                position = idx["columns"].index(column)
-                suitable_indexes.append({
-                    "name": idx["name"],
-                    "columns": idx["columns"],
-                    "position": position,
-                    "column_count": len(idx["columns"])
-                })
-    
-    if not suitable_indexes:
-        return None
-    
-    single_column = [idx for idx in suitable_indexes if idx["column_count"] == 1 and idx["position"] == 0]
-    if single_column:
-        return single_column[0]
-    
-    prefix_indexes = [idx for idx in suitable_indexes if idx["position"] == 0]
-    if prefix_indexes:
-        return min(prefix_indexes, key=lambda x: x["column_count"])
-    
-    other_indexes = [idx for idx in suitable_indexes if idx["position"] > 0]
-    if other_indexes:
-        return min(other_indexes, key=lambda x: (x["position"], x["column_count"]))
-    
-    return None
-
 def apply_conditions_to_row(row, conditions):
     for cond in conditions:
         column = cond["column"]
@@ -576,30 +679,25 @@ def select_best_index(suitable_indexes, target_column):
 
 def build_row_from_doc(doc, table_name, table_metadata):
     """JAVÍTOTT: Megfelelően feldolgozza a dokumentumot row-vá"""
+    # Prefixes és prefix nélküli kulcsok a lefordított sémából
+    schema = table_schema(table_metadata)
+    return build_row_from_values(schema.decode(doc), table_name, schema)
+
+def build_row_from_values(values, table_name, schema):
+    """JOIN sor (prefixes és prefix nélküli kulcsok) egy már dekódolt sorból"""
     row = {}
-    pk_cols = table_metadata["constraints"].get("primary_key", [])
-    pk_parts = doc["_id"].split("$") if "$" in doc["_id"] else [doc["_id"]]
-    
-    # Primary key oszlopok feldolgozása
-    for i, col in enumerate(pk_cols):
-        prefixed_col = f"{table_name}.{col}"
-        value = pk_parts[i] if i < len(pk_parts) else ""
+    for (prefixed_col, col), value in zip(schema.prefixed_names(table_name), values):
         row[prefixed_col] = value
         row[col] = value
-    
-    # Non-primary key oszlopok feldolgozása
-    if "value" in doc and doc["value"]:
-        values = doc["value"].split("#")
-        non_pk_cols = [col["name"] for col in table_metadata["columns"] if col["name"] not in pk_cols]
-        
-        for i, col in enumerate(non_pk_cols):
-            if i < len(values):
-                prefixed_col = f"{table_name}.{col}"
-                row[prefixed_col] = values[i]
-                row[col] = values[i]
-    
     return row
 
+def qualify_column(column, all_tables, metadata_all):
+    """table.column of a bare column name: the last table having it, as the joined row resolves it"""
+    if column == "*" or "." in column:
+        return column
+    table, name = column_table(column, all_tables, metadata_all)
+    return f"{table}.{name}" if table else column
+
 def get_column_value_from_row(row, column_name):
     if column_name in row:
         return row[column_name]
@@ -640,26 +738,3 @@ def select_join_columns(row, selected_columns, tables, metadata_all):
             value = get_column_value_from_row(row, col)
             result.append(value if value is not None else "")
     return result
-
-def compare_values(actual, operator, target):
-    try:
-        actual_num = float(actual)
-        target_num = float(target)
-        
-        if operator == "=":
-            return actual_num == target_num
-        elif operator == ">":
-            return actual_num > target_num
-        elif operator == "<":
-            return actual_num < target_num
-        elif operator == ">=":
-            return actual_num >= target_num
-        elif operator == "<=":
-            return actual_num <= target_num
-    except ValueError:
-        if operator == "=":
-            return str(actual) == str(target)
-        else:
-            return False
-    
-    return False
\ No newline at end of file
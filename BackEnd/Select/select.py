@@ -1,20 +1,30 @@
 from BackEnd.Select.selectParser import parse_select_statement
-from BackEnd.Select.whereEvaluator import apply_where_conditions
-from BackEnd.Select.indexReader import load_index, get_matching_ids_from_index
+from BackEnd.Select.whereEvaluator import compile_conditions
+from BackEnd.Select.indexReader import index_id_sets
 from BackEnd.Select.joinExecutor import execute_join
-from BackEnd.Create.database import get_metadata_file
-from BackEnd.Insert_Get_From_Mongo.db_connection import get_db_collection
+from BackEnd.Create.catalog import load_catalog
+from BackEnd.Create.schema import table_schema
+from BackEnd.Insert_Get_From_Mongo.migrate import ensure_typed_rows
+from BackEnd.Insert_Get_From_Mongo.zone_map import candidate_ranges, scan_ranges
+from BackEnd.Insert_Get_From_Mongo.bloom_filter import get_bloom_filter, literal_probe
+from BackEnd.Storage.engine import get_store
 from BackEnd.Select.aggregationProcessor import process_group_by_and_aggregations
+from BackEnd.Select.columnarScan import execute_columnar_select
 
-import json
 
-def parse_select(stmt, curr_database):
+def parse_select(stmt, curr_database, params=None):
     if curr_database is None:
         return {"error": "No database selected"}
 
-    parsed = parse_select_statement(stmt)
+    parsed = parse_select_statement(stmt, params)
     if "error" in parsed:
         return parsed
+    return run_select(parsed, curr_database)
+
+def run_select(parsed, curr_database):
+    """Execute an already parsed (e.g. prepared) SELECT"""
+    if curr_database is None:
+        return {"error": "No database selected"}
 
     # Ellenőrizzük, hogy JOIN vagy egyszerű SELECT
     if parsed.get("type") == "join_select":
@@ -32,15 +42,18 @@ def handle_simple_select(parsed, curr_database):
     order_by_columns = parsed.get('order_by', [])
 
     try:
-        with open(get_metadata_file(curr_database), "r") as f:
-            db_content = json.load(f)
+        db_content = load_catalog(curr_database)
     except Exception as e:
         return {"error": f"Error reading metadata: {e}"}
 
     if table_name not in db_content.get("tables", {}):
         return {"error": f"Table '{table_name}' does not exist"}
 
-    table_metadata = db_content["tables"][table_name]
+    # Régi formátumú tábla: átírás típusos sorokra az első használatkor
+    migration_error = ensure_typed_rows(curr_database, table_name)
+    if migration_error:
+        return migration_error
+    table_metadata = load_catalog(curr_database)["tables"][table_name]
 
     # Column cleaning - eltávolítjuk a tábla prefixeket egyszerű SELECT esetén
     clean_selected_columns = []
@@ -58,6 +71,13 @@ def handle_simple_select(parsed, curr_database):
         clean_cond["column"] = cond["column"].split(".")[-1] if "." in cond["column"] else cond["column"]
         clean_conditions.append(clean_cond)
 
+    # Oszlopos tábla: aggregációk (vagy DISTINCT) csak a hivatkozott oszlopok szegmenseiből
+    if table_schema(table_metadata).columnar and bool(group_by_columns or aggregations) != is_distinct:
+        result = execute_columnar_select(curr_database, table_name, table_metadata, clean_selected_columns, clean_conditions,
+                                         group_by_columns, aggregations, order_by_columns, is_distinct)
+        if result is not None:
+            return result
+
     result = execute_select(curr_database, table_name, clean_selected_columns, clean_conditions, table_metadata, is_distinct)
     
     if group_by_columns or aggregations or order_by_columns:
@@ -83,8 +103,7 @@ def handle_join_select(parsed, curr_database):
     order_by_columns = parsed.get('order_by', [])
 
     try:
-        with open(get_metadata_file(curr_database), "r") as f:
-            db_content = json.load(f)
+        db_content = load_catalog(curr_database)
     except Exception as e:
         return {"error": f"Error reading metadata: {e}"}
 
@@ -92,18 +111,28 @@ def handle_join_select(parsed, curr_database):
     all_tables = [main_table] + [join["table"] for join in joins]
     
     # Ellenőrizzük, hogy minden tábla létezik
-    metadata_all = {}
     for table in all_tables:
         if table not in db_content.get("tables", {}):
             return {"error": f"Table '{table}' does not exist"}
-        metadata_all[table] = db_content["tables"][table]
+        migration_error = ensure_typed_rows(curr_database, table)
+        if migration_error:
+            return migration_error
+
+    db_content = load_catalog(curr_database)
+    metadata_all = {table: db_content["tables"][table] for table in all_tables}
 
     # Oszlopok validálása JOIN esetén
     if not validate_join_columns(selected_columns, conditions, metadata_all):
         return {"error": "Invalid column reference in JOIN query"}
 
-    # JOIN végrehajtás - JOIN esetén NEM távolítjuk el a prefixeket
-    result = execute_join(curr_database, main_table, joins, selected_columns, conditions, metadata_all, is_distinct)
+    # JOIN végrehajtás - JOIN esetén NEM távolítjuk el a prefixeket;
+    # GROUP BY / aggregáció nélkül a tervező az ORDER BY-t is figyelembe veheti
+    grouped = bool(group_by_columns or aggregations)
+    result = execute_join(curr_database, main_table, joins, selected_columns, conditions, metadata_all, is_distinct,
+                          None if grouped else order_by_columns)
+    if result.pop("sorted", False) and not grouped:
+        # A merge join kimenete már az (egyetlen, növekvő) ORDER BY oszlop szerint rendezett
+        order_by_columns = []
     
     if group_by_columns or aggregations or order_by_columns:
         processed_result = process_group_by_and_aggregations(
@@ -142,79 +171,43 @@ def validate_join_columns(selected_columns, conditions, metadata_all):
 
 def execute_select(database, table, selected_columns, conditions, metadata, is_distinct=False):
     """Javított SELECT"""
-    collection = get_db_collection(database, table)
-
-    # Index használat előkészítése
-    column_to_index_map = {}
-    for idx in metadata.get("indexes", []):
-        if isinstance(idx, dict) and "name" in idx and "columns" in idx:
-            for col in idx["columns"]:
-                if col not in column_to_index_map:
-                    column_to_index_map[col] = []
-                column_to_index_map[col].append(idx["name"])
-    
-    # JAVÍTÁS: Egyszerűbb megközelítés - használjuk az indexeket ahol lehetséges
-    matching_ids_sets = []
-    index_cache = {}
+    store = get_store(database, table)
+    schema = table_schema(metadata)
 
-    # Index alapú feltételek feldolgozása
+    # Bloom filter: ha egy '=' feltétel értéke biztosan hiányzik, nincs mit beolvasni
     for cond in conditions:
-        column = cond["column"]
-        if column in column_to_index_map and cond["op"] == "=":
-            index_names = column_to_index_map[column]
-            
-            for index_name in index_names:
-                if index_name not in index_cache:
-                    index_cache[index_name] = load_index(database, table, index_name)
-                
-                idx_data = index_cache[index_name]
-                
-                if idx_data:
-                    value = cond["value"]
-                    matching_ids = set()
-                    
-                    # Direkt egyezés
-                    if value in idx_data:
-                        id_list = idx_data[value]
-                        if isinstance(id_list, str):
-                            matching_ids.add(id_list)
-                        elif isinstance(id_list, list):
-                            matching_ids.update(id_list)
-                        else:
-                            # Ha # szeparált string
-                            matching_ids.update(str(id_list).split("#"))
-                    
-                    # Kompozit index prefix keresés
-                    for key in idx_data:
-                        if key.startswith(f"{value}$"):
-                            id_list = idx_data[key]
-                            if isinstance(id_list, str):
-                                matching_ids.update(id_list.split("#"))
-                            else:
-                                matching_ids.update(id_list)
-                    
-                    if matching_ids:
-                        matching_ids_sets.append(matching_ids)
-                        break  # Elég egy index
-
-    # JAVÍTÁS: Mindig betöltjük a teljes projekciót WHERE feltételekhez
-    projection = {"_id": 1, "value": 1}  # Mindig teljes dokumentum
+        if cond["op"] != "=":
+            continue
+        bloom = get_bloom_filter(database, table, metadata, cond["column"])
+        probe = literal_probe(schema, cond["column"], cond["value"]) if bloom else None
+        if probe is not None and not bloom.may_contain(probe):
+            print(f"DEBUG: Bloom filter of '{table}.{cond['column']}' excludes '{cond['value']}'")
+            return {"headers": select_headers(selected_columns, metadata), "rows": []}
+
+    # Rendezett (BTREE) indexek: tartomány / BETWEEN / '=' feltételek range scan-nel,
+    # a többi index '=' feltételei: csak a keresett kulcs (összetett indexnél kulcs prefix) bejegyzései;
+    # statisztikák (ANALYZE) esetén a költség modell választ az indexek és a teljes bejárás között
+    matching_ids_sets = index_id_sets(database, table, metadata, conditions)
 
     # Dokumentumok lekérése
     if matching_ids_sets:
         # Ha van index találat, csak azokat a dokumentumokat kérjük le
         final_ids = set.intersection(*matching_ids_sets) if len(matching_ids_sets) > 1 else matching_ids_sets[0]
-        docs = list(collection.find({"_id": {"$in": list(final_ids)}}, projection))
+        docs = store.get_many(final_ids)
     else:
-        # Ha nincs index találat, minden dokumentumot lekérünk
-        docs = list(collection.find({}, projection))
+        # Ha nincs index találat: tartomány feltételeknél csak a zone map szerint illeszkedő blokkok,
+        # egyébként minden dokumentum
+        ranges = candidate_ranges(database, table, metadata, conditions)
+        docs = store.scan() if ranges is None else scan_ranges(store, ranges)
 
-    # JAVÍTÁS: Minden WHERE feltételt alkalmazunk memóriában
+    # Minden WHERE feltételt alkalmazunk memóriában (egyszer lefordítva)
+    matches = compile_conditions(schema, conditions)
     matching_rows = []
+    positions = schema.projection(selected_columns)
     for doc in docs:
-        if apply_where_conditions(doc, metadata, conditions):
-            row = extract_columns(doc, metadata, selected_columns)
-            matching_rows.append(row)
+        row = schema.decode(doc)
+        if matches(row):
+            matching_rows.append(schema.project(row, positions))
 
     # DISTINCT kezelése
     if is_distinct:
@@ -225,56 +218,19 @@ def execute_select(database, table, selected_columns, conditions, metadata, is_d
     else:
         unique_rows = matching_rows
     
-    # Headers generálása
-    actual_headers = []
-    for col in selected_columns:
-        if col == "*":
-            for table_col in metadata["columns"]:
-                actual_headers.append(table_col["name"])
-        else:
-            actual_headers.append(col)
-    
     print(f"DEBUG: Found {len(unique_rows)} rows matching conditions")
     return {
-        "headers": actual_headers,
+        "headers": select_headers(selected_columns, metadata),
         "rows": unique_rows
     }
 
-def extract_columns(doc, metadata, selected_columns, needed_columns=None):
-    """
-    Javított oszlop kinyerés * kezeléssel
-    """
-    # * kibontása tényleges oszlop nevekre
-    expanded_columns = []
+def select_headers(selected_columns, metadata):
+    """Headers generálása ('*' a tábla összes oszlopa)"""
+    actual_headers = []
     for col in selected_columns:
         if col == "*":
             for table_col in metadata["columns"]:
-                expanded_columns.append(table_col["name"])
+                actual_headers.append(table_col["name"])
         else:
-            expanded_columns.append(col)
-    
-    # Szükséges oszlopok meghatározása
-    if needed_columns is None:
-        needed_columns = set(expanded_columns)
-    
-    # Primary key oszlopok feldolgozása
-    pk_cols = metadata["constraints"].get("primary_key", [])
-    pk_parts = doc["_id"].split("$") if "$" in doc["_id"] else [doc["_id"]]
-    
-    column_map = {}
-    
-    # Primary key értékek
-    for i, col in enumerate(pk_cols):
-        if col in needed_columns or "*" in selected_columns:
-            column_map[col] = pk_parts[i] if i < len(pk_parts) else ""
-    
-    # Non-primary key értékek
-    if "value" in doc and doc["value"]:
-        values = doc["value"].split("#")
-        non_pk_cols = [col["name"] for col in metadata["columns"] if col["name"] not in pk_cols]
-        for i, col in enumerate(non_pk_cols):
-            if (col in needed_columns or "*" in selected_columns) and i < len(values):
-                column_map[col] = values[i]
-    
-    # Eredmény összeállítása a kibontott oszlopok alapján
-    return [column_map.get(col, "") for col in expanded_columns]
\ No newline at end of file
+            actual_headers.append(col)
+    return actual_headers
@@ -1,83 +1,149 @@
 # whereEvaluator.py - Javított verzió
-def apply_where_conditions(doc, metadata, conditions, needed_columns=None):
-    """Javított WHERE feltétel alkalmazás"""
-    
-    if needed_columns is None:
-        needed_columns = {cond["column"] for cond in conditions}
-    
-    if not conditions:
+import operator
+import functools
+from BackEnd.Create.schema import table_schema
+
+COMPARISON_OPERATORS = {
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le
+}
+
+# Lefordított WHERE: a feltételek lekérdezésenként egyszer closure-ökké fordulnak.
+# Az oszlop pozíciója előre számolt, a literál az oszlop típusa szerint egyszer konvertált,
+# a feltételek szelektivitás szerinti sorrendben, az első hamisnál megállva értékelődnek ki.
+
+NUMERIC_TYPES = ("INT", "FLOAT")
+
+def predicate_rank(op, col_type, unique=False):
+    """Evaluation order of a condition: equality on a unique column first, text comparisons last"""
+    if op == "=":
+        rank = 0 if unique else 1
+    elif op in ("<", ">"):
+        rank = 2
+    else:
+        rank = 3
+    text_cost = 0 if col_type in NUMERIC_TYPES or col_type == "BOOL" else 1
+    return rank, text_cost
+
+def condition_predicate(read, col_type, op, value):
+    """row -> bool for one condition; read(row) is the column value, value the literal of the query"""
+    compare = COMPARISON_OPERATORS.get(op)
+    if compare is None:
+        return lambda row: False
+    if not isinstance(value, str):
+        return lambda row: compare_values(read(row), op, value)
+
+    if col_type in NUMERIC_TYPES or col_type == "BOOL":
+        target = _bool_literal(value) if col_type == "BOOL" else _number_literal(value.strip())
+        if target is None:
+            return lambda row: False
+
+        def predicate(row):
+            current = read(row)
+            if current is None:
+                return False
+            try:
+                return compare(current, target)
+            except TypeError:
+                # Régi formátumú sor nem konvertálható (szöveges) értéke
+                return compare_values(current, op, value)
+        return predicate
+
+    # Szöveges (VARCHAR, TEXT, DATE) összehasonlítás, mint a compare_values-ban
+    target = value.strip()
+
+    def predicate(row):
+        current = read(row)
+        if current is None:
+            return False
+        if current.__class__ is str:
+            return compare(current.strip(), target)
+        return compare_values(current, op, value)
+    return predicate
+
+def all_of(predicates):
+    """Conjunction of predicates, stops at the first false one"""
+    if not predicates:
+        return lambda row: True
+    if len(predicates) == 1:
+        return predicates[0]
+    if len(predicates) == 2:
+        first, second = predicates
+        return lambda row: first(row) and second(row)
+
+    def matches(row):
+        for predicate in predicates:
+            if not predicate(row):
+                return False
         return True
-    
-    # Az _id mező feldolgozása (elsődleges kulcs)
-    pk_cols = metadata["constraints"].get("primary_key", [])
-    pk_parts = doc["_id"].split("$") if "$" in doc["_id"] else [doc["_id"]]
-    
-    column_map = {}
-    
-    # JAVÍTÁS: MINDEN elsődleges kulcs oszlop feldolgozása (nem csak a szükségesek)
-    for i, col in enumerate(pk_cols):
-        column_map[col] = pk_parts[i] if i < len(pk_parts) else ""
-    
-    # JAVÍTÁS: MINDEN nem-elsődleges kulcs oszlop feldolgozása
-    if "value" in doc and doc["value"]:
-        values = doc["value"].split("#")
-        non_pk_cols = [col["name"] for col in metadata["columns"] if col["name"] not in pk_cols]
-        for i, col in enumerate(non_pk_cols):
-            if i < len(values):
-                column_map[col] = values[i]
-
-    # Feltételek ellenőrzése
+    return matches
+
+def compile_conditions(schema, conditions):
+    """WHERE conditions -> function of a decoded row (column order) -> bool, built once per query"""
+    schema = table_schema(schema)
+    unique_columns = set(schema.unique_columns)
+    if len(schema.primary_keys) == 1:
+        unique_columns.add(schema.primary_keys[0])
+
+    compiled = []
     for cond in conditions:
-        col, op, val = cond["column"], cond["op"], cond["value"]
-        doc_val = column_map.get(col)
-        
-        # JAVÍTÁS: Ha az oszlop nem található, false visszatérés
-        if doc_val is None:
-            print(f"DEBUG: Column '{col}' not found in document. Available columns: {list(column_map.keys())}")
-            return False
+        col, op = cond["column"], cond["op"]
+        pos = schema.positions.get(col)
+        if pos is None:
+            print(f"DEBUG: Column '{col}' not found in document. Available columns: {schema.column_names}")
+            return lambda row: False
+        col_type = schema.column_types[col]
+        predicate = condition_predicate(operator.itemgetter(pos), col_type, op, cond["value"])
+        compiled.append((predicate_rank(op, col_type, col in unique_columns), predicate))
 
-        # JAVÍTÁS: Jobb típuskonverzió és összehasonlítás
-        if not compare_values(doc_val, op, val):
-            return False
+    compiled.sort(key=lambda entry: entry[0])
+    return all_of([predicate for _, predicate in compiled])
 
-    return True
+@functools.lru_cache(maxsize=1024)
+def _number_literal(text):
+    # Egy WHERE literál numerikus értéke (literálonként egyszer számolva), None ha nem szám
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+def _bool_literal(text):
+    upper = text.strip().upper()
+    if upper in ("TRUE", "1"):
+        return True
+    if upper in ("FALSE", "0"):
+        return False
+    return None
 
 def compare_values(doc_val, op, target_val):
-    """Javított értékösszehasonlítás"""
-    try:
-        # Próbáljuk meg numerikus összehasonlításként
-        doc_val_num = float(doc_val)
-        target_val_num = float(target_val)
-        
-        if op == "=":
-            return doc_val_num == target_val_num
-        elif op == ">":
-            return doc_val_num > target_val_num
-        elif op == "<":
-            return doc_val_num < target_val_num
-        elif op == ">=":
-            return doc_val_num >= target_val_num
-        elif op == "<=":
-            return doc_val_num <= target_val_num
+    """
+    Typed comparison: the stored value decides the type (rows are typed by the schema),
+    the target literal is converted to it. Text columns compare as text, no float() attempt.
+    """
+    compare = COMPARISON_OPERATORS.get(op)
+    if compare is None:
+        return False
+
+    if isinstance(target_val, str):
+        if isinstance(doc_val, bool):
+            target_val = _bool_literal(target_val)
+        elif isinstance(doc_val, (int, float)):
+            target_val = _number_literal(target_val.strip())
         else:
+            # Szöveges (VARCHAR, DATE) összehasonlítás
+            return compare(str(doc_val).strip(), target_val.strip())
+        if target_val is None:
             return False
-            
-    except (ValueError, TypeError):
-        # Ha nem numerikus, akkor szöveges összehasonlítás
-        doc_val_str = str(doc_val).strip()
-        target_val_str = str(target_val).strip()
-        
-        if op == "=":
-            return doc_val_str == target_val_str
-        elif op in [">", "<", ">=", "<="]:
-            # Szöveges összehasonlítás lexikografikusan
-            if op == ">":
-                return doc_val_str > target_val_str
-            elif op == "<":
-                return doc_val_str < target_val_str
-            elif op == ">=":
-                return doc_val_str >= target_val_str
-            elif op == "<=":
-                return doc_val_str <= target_val_str
-        
+    elif isinstance(doc_val, str):
+        return compare(doc_val.strip(), str(target_val))
+
+    try:
+        return compare(doc_val, target_val)
+    except TypeError:
         return False
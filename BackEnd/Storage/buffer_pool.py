@@ -0,0 +1,334 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from BackEnd.Storage.engine import Store, StorageEngine
+
+# Process-wide buffer pool between the query code and a (remote) storage engine.
+# Cached are single documents (get / get_many / existing_keys) and the full scans of
+# collections as pages of SCAN_PAGE_SIZE documents; eviction is LRU under a byte budget.
+# Every write goes through the store wrapper: written documents are put in the pool
+# (write-through), deleted / changed ones dropped, and the cached scan of the collection
+# is invalidated. A write version guards against caching a document read before a write.
+# The pool assumes this process is the only writer of the database (like the catalog cache).
+
+BUFFER_POOL_BYTES = int(os.getenv("BGDTSQL_BUFFER_POOL_BYTES", 64 * 1024 * 1024))
+SCAN_PAGE_SIZE = 256        # Dokumentumok száma egy scan lapon
+SCAN_CACHE_RATIO = 0.5      # Egy kollekció scan-je csak akkor kerül a pool-ba, ha ennyi részébe belefér
+
+def estimated_size(value):
+    """Approximate memory footprint of a document (dicts, lists and scalars)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimated_size(k) + estimated_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimated_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class BufferPool:
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()    # kulcs -> (érték, méret), a legrégebben használt elöl
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_all(self, keys):
+        """Values of every key, or None (one miss) if any of them is not cached"""
+        with self.lock:
+            if any(key not in self.entries for key in keys):
+                self.misses += 1
+                return None
+            for key in keys:
+                self.entries.move_to_end(key)
+            self.hits += 1
+            return [self.entries[key][0] for key in keys]
+
+    def put(self, key, value, size=None):
+        size = estimated_size(value) if size is None else size
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+            if size > self.budget:
+                return
+            self.entries[key] = (value, size)
+            self.used += size
+            while self.used > self.budget:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.used -= evicted_size
+                self.evictions += 1
+
+    def remove(self, key):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+
+    def remove_where(self, predicate):
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                self.used -= self.entries.pop(key)[1]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "budget_bytes": self.budget,
+                "used_bytes": self.used,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions
+            }
+
+class CachedStore(Store):
+    """Store wrapper serving reads from the buffer pool"""
+
+    def __init__(self, pool, store, database, collection):
+        self.pool = pool
+        self.store = store
+        self.database = database
+        self.collection = collection
+        self.version = 0            # Minden írás növeli
+        self.scan_pages = None      # A pool-ban lévő teljes scan lapjainak száma (None: nincs)
+        self.lock = threading.Lock()
+
+    def _doc_key(self, key):
+        return ("doc", self.database, self.collection, key)
+
+    def _page_key(self, page):
+        return ("scan", self.database, self.collection, page)
+
+    def _cache_docs(self, docs, version):
+        with self.lock:
+            # Olvasás közben történt írás: a beolvasott dokumentum már elavult lehet
+            if self.version != version:
+                return
+            for doc in docs:
+                self.pool.put(self._doc_key(doc["_id"]), doc)
+
+    def _written(self, keys, docs=()):
+        """Invalidate after a write: the changed keys, the cached scan; written docs are cached"""
+        with self.lock:
+            self.version += 1
+            for key in keys:
+                self.pool.remove(self._doc_key(key))
+            if self.scan_pages is not None:
+                for page in range(self.scan_pages):
+                    self.pool.remove(self._page_key(page))
+                self.scan_pages = None
+            for doc in docs:
+                self.pool.put(self._doc_key(doc["_id"]), dict(doc))
+
+    # --- Reads ---
+
+    def get(self, key):
+        doc = self.pool.get(self._doc_key(key))
+        if doc is None:
+            version = self.version
+            doc = self.store.get(key)
+            if doc is None:
+                return None
+            self._cache_docs([doc], version)
+        return dict(doc)
+
+    def get_many(self, keys):
+        docs = []
+        missing = []
+        for key in keys:
+            doc = self.pool.get(self._doc_key(key))
+            if doc is None:
+                missing.append(key)
+            else:
+                docs.append(dict(doc))
+        if missing:
+            version = self.version
+            fetched = self.store.get_many(missing)
+            self._cache_docs(fetched, version)
+            docs.extend(dict(doc) for doc in fetched)
+        return docs
+
+    def existing_keys(self, keys):
+        keys = set(keys)
+        # A pool-ban lévő dokumentum biztosan létezik (törléskor kikerül)
+        known = {key for key in keys if self.pool.get(self._doc_key(key)) is not None}
+        missing = keys - known
+        return known | (self.store.existing_keys(missing) if missing else set())
+
+    def scan(self, batch_size=None):
+        pages = None
+        if self.scan_pages is not None:
+            pages = self.pool.get_all([self._page_key(page) for page in range(self.scan_pages)])
+        if pages is not None:
+            for page in pages:
+                for doc in page:
+                    yield dict(doc)
+            return
+
+        # Bejárás a tárolóból, közben lapok gyűjtése (ha a scan végigfut és belefér a keretbe)
+        version = self.version
+        limit = self.pool.budget * SCAN_CACHE_RATIO
+        collected = []
+        page = []
+        size = 0
+        for doc in self.store.scan(batch_size):
+            if collected is not None:
+                page.append(doc)
+                size += estimated_size(doc)
+                if size > limit:
+                    collected = None
+                elif len(page) >= SCAN_PAGE_SIZE:
+                    collected.append(page)
+                    page = []
+            yield dict(doc)
+
+        if collected is None:
+            return
+        if page:
+            collected.append(page)
+        with self.lock:
+            if self.version != version:
+                return
+            for number, page in enumerate(collected):
+                self.pool.put(self._page_key(number), page)
+            self.scan_pages = len(collected)
+
+    def range_scan(self, low=None, high=None, include_low=True, include_high=True, prefix=None):
+        return self.store.range_scan(low, high, include_low, include_high, prefix)
+
+    def count(self):
+        return self.store.count()
+
+    # --- Writes (write-through) ---
+
+    def put(self, doc):
+        try:
+            self.store.put(doc)
+        except Exception:
+            self._written([doc["_id"]])
+            raise
+        self._written([], [doc])
+
+    def upsert(self, doc):
+        try:
+            self.store.upsert(doc)
+        except Exception:
+            self._written([doc["_id"]])
+            raise
+        self._written([], [doc])
+
+    def delete(self, key):
+        try:
+            return self.store.delete(key)
+        finally:
+            self._written([key])
+
+    def bulk_write(self, operations, ordered=False):
+        try:
+            failures = self.store.bulk_write(operations, ordered)
+        except Exception:
+            self._written([op[1]["_id"] if op[0] in ("insert", "upsert") else op[1] for op in operations])
+            raise
+        failed = {position for position, _ in failures}
+        keys = []
+        docs = []
+        for position, op in enumerate(operations):
+            if op[0] in ("insert", "upsert") and position not in failed and not (ordered and failed):
+                docs.append(op[1])
+            else:
+                keys.append(op[1]["_id"] if op[0] in ("insert", "upsert") else op[1])
+        self._written(keys, docs)
+        return failures
+
+    def add_to_set(self, key, field, values):
+        try:
+            self.store.add_to_set(key, field, values)
+        finally:
+            self._written([key])
+
+    def pull(self, key, field, values):
+        try:
+            return self.store.pull(key, field, values)
+        finally:
+            self._written([key])
+
+    def delete_if_empty(self, key, field):
+        try:
+            self.store.delete_if_empty(key, field)
+        finally:
+            self._written([key])
+
+    def clear(self):
+        try:
+            self.store.clear()
+        finally:
+            self.forget()
+
+    def forget(self):
+        """Drop everything cached for the collection"""
+        with self.lock:
+            self.version += 1
+            self.scan_pages = None
+            self.pool.remove_where(lambda entry: entry[1] == self.database and entry[2] == self.collection)
+
+class BufferedEngine(StorageEngine):
+    """Engine wrapper handing out CachedStore-s over one shared pool"""
+
+    def __init__(self, engine, pool):
+        self.engine = engine
+        self.name = engine.name
+        self.pool = pool
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def store(self, database, collection):
+        with self.lock:
+            store = self.stores.get((database, collection))
+            if store is None:
+                store = CachedStore(self.pool, self.engine.store(database, collection), database, collection)
+                self.stores[(database, collection)] = store
+            return store
+
+    def drop_store(self, database, collection):
+        with self.lock:
+            store = self.stores.pop((database, collection), None)
+        try:
+            self.engine.drop_store(database, collection)
+        finally:
+            if store is not None:
+                store.forget()
+            self.pool.remove_where(lambda entry: entry[1] == database and entry[2] == collection)
+
+    def sync(self):
+        self.engine.sync()
+
+    def drop_database(self, database):
+        with self.lock:
+            stores = [self.stores.pop(key) for key in [key for key in self.stores if key[0] == database]]
+        try:
+            self.engine.drop_database(database)
+        finally:
+            for store in stores:
+                store.forget()
+            self.pool.remove_where(lambda entry: entry[1] == database)
+
+buffer_pool = BufferPool(BUFFER_POOL_BYTES)
+
+def buffered(engine):
+    return BufferedEngine(engine, buffer_pool)
+
+def buffer_pool_stats():
+    return buffer_pool.stats()
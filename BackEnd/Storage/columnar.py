@@ -0,0 +1,445 @@
+import os
+import mmap
+import array
+import shutil
+import threading
+from BackEnd.Storage import local_engine
+from BackEnd.Storage.engine import StorageError
+from BackEnd.Create.catalog import load_catalog, save_catalog
+from BackEnd.Create.schema import COLUMNAR_STORAGE
+
+# Optional columnar replica of a table for analytical scans:
+# Data/<database>/_columnar/<table>/<column>.dat (+ <column>.off for VARCHAR).
+# Fixed-width arrays for INT (int64), FLOAT (float64), BOOL (uint8) and DATE (int32 YYYYMMDD);
+# VARCHAR columns keep uint64 end offsets (n + 1 entries, starting at 0) plus the UTF-8 data,
+# or - dictionary encoded - uint32 codes in <column>.dat and the distinct values in
+# <column>.dict.off / <column>.dict.dat (same layout as a VARCHAR segment, code = position).
+# _keys is a VARCHAR segment of the primary keys, _deleted one byte per row (1 = deleted);
+# its length is the row count of the segment set.
+# The row store stays authoritative, the segments are appended / marked on every write.
+# The catalog "storage" flag is switched and the segments are built under _storage_lock, and
+# the write path re-reads the flag under the same lock, so no row change can fall in between.
+
+COLUMNAR_FOLDER = "_columnar"
+KEYS_SEGMENT = "_keys"
+DELETED_SEGMENT = "_deleted"
+FIXED_FORMATS = {"INT": "q", "FLOAT": "d", "BOOL": "B", "DATE": "i"}
+CODE_FORMAT = "I"
+DICTIONARY_SUFFIX = ".dict"
+DICTIONARY_MAX_VALUES = 65536   # Ennél több különböző érték esetén nincs automatikus szótár kódolás
+DICTIONARY_MAX_RATIO = 0.5      # ... és akkor sem, ha a különböző értékek aránya ennél nagyobb
+
+def columnar_folder(database, table=None):
+    folder = os.path.join(local_engine.DATA_FOLDER, database, COLUMNAR_FOLDER)
+    return os.path.join(folder, table) if table else folder
+
+def column_format(col_type):
+    """array / memoryview format of a fixed-width column, None for VARCHAR"""
+    return FIXED_FORMATS.get(col_type)
+
+def is_text_type(col_type):
+    return column_format(col_type) is None
+
+def choose_dictionary_columns(schema, docs):
+    """
+    VARCHAR / TEXT columns to dictionary encode: the ones declared DICTIONARY, plus the
+    ones whose observed cardinality is low (one pass over the documents)
+    """
+    declared = {col["name"] for col in schema.columns if col.get("encoding") == "dictionary"}
+    candidates = [name for name, col_type in schema.column_types.items() if is_text_type(col_type) and name not in declared]
+    if not candidates:
+        return declared
+
+    distinct = {name: set() for name in candidates}
+    rows = 0
+    for doc in docs:
+        row = schema.decode(doc)
+        rows += 1
+        for name in list(distinct):
+            values = distinct[name]
+            values.add(row[schema.positions[name]])
+            if len(values) > DICTIONARY_MAX_VALUES:
+                del distinct[name]
+        if not distinct:
+            break
+
+    return declared | {name for name, values in distinct.items() if rows and len(values) <= rows * DICTIONARY_MAX_RATIO}
+
+def encode_date(text):
+    return int(text[0:4] + text[5:7] + text[8:10])
+
+def decode_date(number):
+    return f"{number // 10000:04d}-{number // 100 % 100:02d}-{number % 100:02d}"
+
+class ColumnSegment:
+    """Read-only, memory-mapped view of one column (zero-copy for fixed-width columns)"""
+
+    def __init__(self, folder, name, col_type, rows, dictionary=False):
+        self.col_type = col_type
+        self.fmt = column_format(col_type)
+        self.dictionary = None
+        self._maps = []
+        if dictionary:
+            # Szótár kódolt oszlop: a kódok mmap-elve, a (kis) szótár egyszer dekódolva
+            self.codes = self._map(os.path.join(folder, f"{name}.dat"), CODE_FORMAT, rows)
+            offsets = self._map(os.path.join(folder, f"{name}{DICTIONARY_SUFFIX}.off"), "Q", None)
+            data = self._map(os.path.join(folder, f"{name}{DICTIONARY_SUFFIX}.dat"), "B", None)
+            self.dictionary = [str(data[offsets[i]:offsets[i + 1]], "utf-8") for i in range(len(offsets) - 1)]
+        elif self.fmt:
+            self.values = self._map(os.path.join(folder, f"{name}.dat"), self.fmt, rows)
+        else:
+            self.offsets = self._map(os.path.join(folder, f"{name}.off"), "Q", rows + 1)
+            self.data = self._map(os.path.join(folder, f"{name}.dat"), "B", None)
+
+    def _map(self, path, fmt, count):
+        if os.path.getsize(path) == 0:
+            return memoryview(b"").cast(fmt)
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        views = [memoryview(mm)]
+        views.append(views[-1].cast(fmt))
+        if count is not None:
+            views.append(views[-1][:count])
+        self._maps.append((mm, views))
+        return views[-1]
+
+    def numeric(self):
+        """The raw int / float array of an INT or FLOAT column (no copy)"""
+        return self.values
+
+    def code(self, i):
+        """Dictionary code of row i (dictionary encoded columns only)"""
+        return self.codes[i]
+
+    def matching_codes(self, predicate):
+        """Codes of the dictionary values for which predicate holds"""
+        return {code for code, value in enumerate(self.dictionary) if predicate(value)}
+
+    def __getitem__(self, i):
+        if self.dictionary is not None:
+            return self.dictionary[self.codes[i]]
+        if self.fmt is None:
+            return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+        value = self.values[i]
+        if self.col_type == "BOOL":
+            return bool(value)
+        if self.col_type == "DATE":
+            return decode_date(value)
+        return value
+
+    def close(self):
+        # A memoryview-kat a mmap bezárása előtt fel kell szabadítani
+        for mm, views in self._maps:
+            for view in reversed(views):
+                view.release()
+            mm.close()
+        self._maps = []
+
+class ColumnarReader:
+    """Open segments of one query; rows are the row positions, live the not deleted ones"""
+
+    def __init__(self, folder, column_types, rows, dictionary_columns=()):
+        self.rows = rows
+        self.segments = {}
+        self.deleted = ColumnSegment(folder, DELETED_SEGMENT, "BOOL", rows)
+        try:
+            for name, col_type in column_types.items():
+                self.segments[name] = ColumnSegment(folder, name, col_type, rows, name in dictionary_columns)
+        except OSError as e:
+            self.close()
+            raise StorageError(f"Columnar segment error: {e}") from e
+
+    def live_positions(self):
+        """Row positions not marked deleted (a range when nothing is deleted)"""
+        deleted = self.deleted.values
+        if self.rows == 0 or 1 not in deleted:
+            return range(self.rows)
+        return [i for i in range(self.rows) if not deleted[i]]
+
+    def __getitem__(self, name):
+        return self.segments[name]
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+        self.deleted.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ColumnarTable:
+    def __init__(self, database, table, schema):
+        self.folder = columnar_folder(database, table)
+        self.column_types = dict(schema.column_types)
+        self.lock = threading.Lock()
+        self.key_positions = None   # _id -> sor pozíció, az első törléskor épül fel
+        self.dictionaries = None    # szótár kódolt oszlop -> {érték: kód}, az első íráskor töltődik be
+        self.dictionary_columns = set()
+        if os.path.isdir(self.folder):
+            self.dictionary_columns = {name for name, col_type in self.column_types.items()
+                                       if is_text_type(col_type) and os.path.exists(self._path(name + DICTIONARY_SUFFIX))}
+            self._repair()
+
+    # --- Segment files ---
+
+    def _path(self, name, suffix="dat", folder=None):
+        return os.path.join(folder or self.folder, f"{name}.{suffix}")
+
+    def _segment_types(self):
+        types = dict(self.column_types)
+        types[KEYS_SEGMENT] = "VARCHAR"
+        return types
+
+    def row_count(self):
+        path = self._path(DELETED_SEGMENT)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _repair(self):
+        """Cut every segment back to the row count (a write interrupted between segments)"""
+        rows = self.row_count()
+        for name, col_type in self._segment_types().items():
+            if name in self.dictionary_columns:
+                self._truncate(self._path(name), rows * array.array(CODE_FORMAT).itemsize)
+                self._repair_text(name + DICTIONARY_SUFFIX, None)
+                continue
+            fmt = column_format(col_type)
+            if fmt:
+                self._truncate(self._path(name), rows * array.array(fmt).itemsize)
+            else:
+                self._repair_text(name, rows)
+
+    def _repair_text(self, name, rows):
+        """Offsets + data segment cut back to rows entries (None: to the last complete offset)"""
+        off_path = self._path(name, "off")
+        size = os.path.getsize(off_path)
+        self._truncate(off_path, (rows + 1) * 8 if rows is not None else size - size % 8)
+        offsets = array.array("Q")
+        with open(off_path, "rb") as f:
+            offsets.frombytes(f.read())
+        self._truncate(self._path(name), offsets[-1] if offsets else 0)
+
+    @staticmethod
+    def _truncate(path, size):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _load_dictionaries(self):
+        self.dictionaries = {}
+        for name in self.dictionary_columns:
+            offsets = array.array("Q")
+            with open(self._path(name + DICTIONARY_SUFFIX, "off"), "rb") as f:
+                offsets.frombytes(f.read())
+            with open(self._path(name + DICTIONARY_SUFFIX), "rb") as f:
+                data = f.read()
+            self.dictionaries[name] = {str(data[offsets[i]:offsets[i + 1]], "utf-8"): i for i in range(len(offsets) - 1)}
+
+    def _write_segments(self, folder, keys, rows, append, dictionaries):
+        """Write (or append) the given keys and typed rows to every segment of folder"""
+        mode = "ab" if append else "wb"
+        columns = list(self.column_types.items())
+        try:
+            for pos, (name, col_type) in enumerate(columns):
+                values = [row[pos] for row in rows]
+                if name in dictionaries:
+                    self._write_codes(folder, name, values, mode, dictionaries[name])
+                else:
+                    self._write_column(folder, name, col_type, values, mode)
+            self._write_column(folder, KEYS_SEGMENT, "VARCHAR", keys, mode)
+            # A _deleted szegmens utoljára: a hossza határozza meg a sorok számát
+            with open(self._path(DELETED_SEGMENT, folder=folder), mode) as f:
+                f.write(bytes(len(keys)))
+        except (TypeError, ValueError, OverflowError) as e:
+            raise StorageError(f"Value does not fit the columnar segment of column '{name}': {e}") from e
+        except OSError as e:
+            raise StorageError(f"Columnar segment error: {e}") from e
+
+    def _write_column(self, folder, name, col_type, values, mode):
+        fmt = column_format(col_type)
+        if fmt:
+            if col_type == "DATE":
+                values = [encode_date(value) for value in values]
+            with open(self._path(name, folder=folder), mode) as f:
+                f.write(array.array(fmt, values).tobytes())
+            return
+
+        encoded = [str(value).encode("utf-8") for value in values]
+        data_path = self._path(name, folder=folder)
+        offset = os.path.getsize(data_path) if mode == "ab" and os.path.exists(data_path) else 0
+        offsets = array.array("Q", [] if mode == "ab" else [0])
+        for item in encoded:
+            offset += len(item)
+            offsets.append(offset)
+        with open(data_path, mode) as f:
+            f.write(b"".join(encoded))
+        with open(self._path(name, "off", folder=folder), mode) as f:
+            f.write(offsets.tobytes())
+
+    def _write_codes(self, folder, name, values, mode, dictionary):
+        """Dictionary encoded column: new values go to the dictionary first, then the codes"""
+        new_values = []
+        codes = array.array(CODE_FORMAT)
+        for value in values:
+            code = dictionary.get(value)
+            if code is None:
+                code = len(dictionary)
+                dictionary[value] = code
+                new_values.append(value)
+            codes.append(code)
+        if new_values or mode == "wb":
+            self._write_column(folder, name + DICTIONARY_SUFFIX, "VARCHAR", new_values, mode)
+        with open(self._path(name, folder=folder), mode) as f:
+            f.write(codes.tobytes())
+
+    # --- Maintenance ---
+
+    def build(self, docs, schema, dictionary_columns=()):
+        """Rebuild every segment from the documents of the row store, returns the row count"""
+        with self.lock:
+            building = self.folder + ".building"
+            shutil.rmtree(building, ignore_errors=True)
+            os.makedirs(building)
+            dictionaries = {name: {} for name in dictionary_columns}
+            count = 0
+            self._write_segments(building, [], [], False, dictionaries)
+            keys, rows = [], []
+            for doc in docs:
+                keys.append(doc["_id"])
+                rows.append(schema.decode(doc))
+                if len(keys) >= 10000:
+                    self._write_segments(building, keys, rows, True, dictionaries)
+                    count += len(keys)
+                    keys, rows = [], []
+            if keys:
+                self._write_segments(building, keys, rows, True, dictionaries)
+                count += len(keys)
+
+            shutil.rmtree(self.folder, ignore_errors=True)
+            os.replace(building, self.folder)
+            self.key_positions = None
+            self.dictionaries = dictionaries
+            self.dictionary_columns = set(dictionaries)
+            return count
+
+    def append(self, keys, rows):
+        with self.lock:
+            if self.dictionaries is None:
+                self._load_dictionaries()
+            start = self.row_count()
+            self._write_segments(self.folder, keys, rows, True, self.dictionaries)
+            if self.key_positions is not None:
+                for i, key in enumerate(keys):
+                    self.key_positions[key] = start + i
+
+    def live_keys(self, keys):
+        """The keys among keys that already have a not deleted row in the segments"""
+        wanted = set(keys)
+        with self.lock:
+            rows = self.row_count()
+            with ColumnarReader(self.folder, {KEYS_SEGMENT: "VARCHAR"}, rows) as reader:
+                segment = reader[KEYS_SEGMENT]
+                return {segment[i] for i in reader.live_positions() if segment[i] in wanted}
+
+    def delete(self, key):
+        with self.lock:
+            if self.key_positions is None:
+                rows = self.row_count()
+                with ColumnarReader(self.folder, {KEYS_SEGMENT: "VARCHAR"}, rows) as reader:
+                    keys = reader[KEYS_SEGMENT]
+                    # Később beszúrt, azonos kulcsú sor felülírja a korábbi pozíciót
+                    self.key_positions = {keys[i]: i for i in range(rows)}
+            position = self.key_positions.pop(key, None)
+            if position is None:
+                return
+            try:
+                with open(self._path(DELETED_SEGMENT), "r+b") as f:
+                    f.seek(position)
+                    f.write(b"\x01")
+            except OSError as e:
+                raise StorageError(f"Columnar segment error: {e}") from e
+
+    def reader(self, columns):
+        """Memory-mapped reader over the given columns (use as a context manager)"""
+        with self.lock:
+            rows = self.row_count()
+            return ColumnarReader(self.folder, {name: self.column_types[name] for name in columns}, rows, self.dictionary_columns)
+
+_tables = {}
+_tables_lock = threading.Lock()
+_storage_lock = threading.RLock()   # Jelző váltás + építés vs. a sorok szegmensekbe írása
+
+def get_columnar_table(database, table, schema):
+    with _tables_lock:
+        entry = _tables.get((database, table))
+        if entry is None:
+            entry = ColumnarTable(database, table, schema)
+            _tables[(database, table)] = entry
+        return entry
+
+def build_columnar(database, table, schema, store):
+    """(Re)build the segments of a table from its row store, returns (rows, dictionary columns)"""
+    with _storage_lock:
+        drop_columnar(database, table)
+        # Szótár kódolás: a DICTIONARY oszlopok és a kis kardinalitású szöveges oszlopok
+        dictionary_columns = choose_dictionary_columns(schema, store.scan())
+        rows = get_columnar_table(database, table, schema).build(store.scan(), schema, dictionary_columns)
+        return rows, dictionary_columns
+
+def is_columnar(database, table):
+    # A katalógusból: a hívó table_data-ja egy párhuzamos ALTER TABLE előtti lehet
+    table_data = load_catalog(database).get("tables", {}).get(table)
+    return table_data is not None and table_data.get("storage") == COLUMNAR_STORAGE
+
+def enable_columnar(database, table, schema, store):
+    """Build the segments and mark the table columnar in the catalog, returns (rows, dictionary columns)"""
+    with _storage_lock:
+        try:
+            rows, dictionary_columns = build_columnar(database, table, schema, store)
+        except StorageError:
+            drop_columnar(database, table)
+            raise
+        db_content = load_catalog(database, for_update=True)
+        db_content["tables"][table]["storage"] = COLUMNAR_STORAGE
+        save_catalog(database, db_content)
+        return rows, dictionary_columns
+
+def disable_columnar(database, table):
+    """Back to row storage: clear the catalog flag and remove the segments"""
+    with _storage_lock:
+        db_content = load_catalog(database, for_update=True)
+        db_content["tables"][table].pop("storage", None)
+        save_catalog(database, db_content)
+        drop_columnar(database, table)
+
+def append_columnar_rows(database, table, schema, rows):
+    """
+    Append typed rows to the segments, if the table is columnar. schema is the caller's view:
+    if it was loaded before the table became columnar, the rows may already be in the build.
+    """
+    with _storage_lock:
+        if not is_columnar(database, table):
+            return
+        columnar_table = get_columnar_table(database, table, schema)
+        keys = [schema.encode_key(row) for row in rows]
+        if not schema.columnar:
+            # Az építés a sor írása után olvashatta a táblát: ami már benne van, nem kerül be újra
+            built = columnar_table.live_keys(keys)
+            rows = [row for key, row in zip(keys, rows) if key not in built]
+            keys = [key for key in keys if key not in built]
+        if rows:
+            columnar_table.append(keys, rows)
+
+def delete_columnar_row(database, table, schema, key):
+    with _storage_lock:
+        if is_columnar(database, table):
+            get_columnar_table(database, table, schema).delete(key)
+
+def drop_columnar(database, table=None):
+    """Remove the segments of one table (or of every table of the database)"""
+    with _tables_lock:
+        for entry in [entry for entry in _tables if entry[0] == database and (table is None or entry[1] == table)]:
+            del _tables[entry]
+    shutil.rmtree(columnar_folder(database, table), ignore_errors=True)
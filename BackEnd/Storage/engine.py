@@ -0,0 +1,157 @@
+import os
+import threading
+from BackEnd.Create.catalog import load_catalog
+
+# Storage engine abstraction: every table and index collection is reached through a Store.
+# The engine of a database comes from the "engine" key of its catalog ("mongo" or "local");
+# catalogs written before engines existed keep using MongoDB.
+
+ENGINE_NAMES = ("mongo", "local")
+LEGACY_ENGINE = "mongo"
+DEFAULT_ENGINE = os.getenv("BGDTSQL_DEFAULT_ENGINE", "mongo").lower()  # Új adatbázisok motorja
+
+class StorageError(Exception):
+    """Engine independent storage failure (network, disk, ...)"""
+
+class DuplicateKeyError(StorageError):
+    """Insert of an _id that already exists"""
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+class Store:
+    """
+    One collection of documents keyed by a string "_id".
+    bulk_write takes a list of operation tuples:
+        ("insert", doc)                      new document, fails on an existing _id
+        ("upsert", doc)                      insert or replace the whole document
+        ("delete", key)
+        ("add_to_set", key, field, values)   add missing values to a list field (creates the document)
+        ("pull", key, field, values)         remove values from a list field
+        ("delete_if_empty", key, field)      delete the document if the list field is empty
+                                             and it has no legacy "value" field
+    and returns the failed operations as a list of (position, message).
+    Documents returned by the store must not be modified by the caller.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Existing documents among the given keys (order not guaranteed)"""
+        docs = []
+        for key in keys:
+            doc = self.get(key)
+            if doc is not None:
+                docs.append(doc)
+        return docs
+
+    def existing_keys(self, keys):
+        """Which of the given keys exist"""
+        return {doc["_id"] for doc in self.get_many(keys)}
+
+    def put(self, doc):
+        """Insert a new document, DuplicateKeyError if the _id exists"""
+        raise NotImplementedError
+
+    def upsert(self, doc):
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Delete one document, True if it existed"""
+        raise NotImplementedError
+
+    def scan(self, batch_size=None):
+        """Every document of the collection"""
+        raise NotImplementedError
+
+    def range_scan(self, low=None, high=None, include_low=True, include_high=True, prefix=None):
+        """Documents with low <= _id <= high (or starting with prefix) in _id order"""
+        raise NotImplementedError
+
+    def bulk_write(self, operations, ordered=False):
+        raise NotImplementedError
+
+    def add_to_set(self, key, field, values):
+        self._single(("add_to_set", key, field, list(values)))
+
+    def pull(self, key, field, values):
+        """Remove values from a list field, True if the document changed"""
+        raise NotImplementedError
+
+    def delete_if_empty(self, key, field):
+        self._single(("delete_if_empty", key, field))
+
+    def count(self):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def _single(self, operation):
+        failures = self.bulk_write([operation], ordered=True)
+        if failures:
+            raise StorageError(failures[0][1])
+
+class StorageEngine:
+    name = None
+    memory_resident = False     # Minden dokumentum memóriában van: nem kell elé buffer pool
+
+    def store(self, database, collection):
+        raise NotImplementedError
+
+    def drop_store(self, database, collection):
+        raise NotImplementedError
+
+    def drop_database(self, database):
+        raise NotImplementedError
+
+    def sync(self):
+        """Make every applied write durable (the write-ahead log is truncated afterwards)"""
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(name=None):
+    """Engine instance by name (created on first use)"""
+    name = (name or DEFAULT_ENGINE).lower()
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            # A motorok modulja csak használatkor töltődik be (pymongo nélkül is fut a local motor)
+            if name == "mongo":
+                from BackEnd.Storage.mongo_engine import MongoEngine
+                engine = MongoEngine()
+            elif name == "local":
+                from BackEnd.Storage.local_engine import LocalEngine
+                engine = LocalEngine()
+            else:
+                raise StorageError(f"Unknown storage engine '{name}'")
+            if not engine.memory_resident:
+                from BackEnd.Storage.buffer_pool import buffered
+                engine = buffered(engine)
+            _engines[name] = engine
+    return engine
+
+def database_engine(database):
+    """Engine selected in the catalog of a database"""
+    return get_engine(load_catalog(database).get("engine", LEGACY_ENGINE))
+
+def sync_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+    for engine in engines:
+        engine.sync()
+
+def get_store(database, collection):
+    return database_engine(database).store(database, collection)
+
+def index_collection_name(table, index_name):
+    return f"{table}_{index_name}_ind"
+
+def zone_map_collection_name(table):
+    return f"{table}_zonemap"
+
+def get_index_store(database, table, index_name):
+    return get_store(database, index_collection_name(table, index_name))
@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import OrderedDict
+from BackEnd.Storage.buffer_pool import estimated_size
+
+# Process-wide cache of index entries read by the queries: (database, index collection, key)
+# -> primary keys of the entry. Keys missing from the index are cached too (empty tuple), so
+# repeated probes of absent values (joins) are not read again; the prefix lookups of composite
+# indexes are cached under their prefix. Eviction is LRU under a byte budget.
+# Every index collection has a write version: the index writers bump it after a change
+# (invalidate_index), entries of an older version count as missing, and a lookup that
+# started before a write does not cache what it read.
+
+INDEX_CACHE_BYTES = int(os.getenv("BGDTSQL_INDEX_CACHE_BYTES", 16 * 1024 * 1024))
+
+class IndexCache:
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()    # (adatbázis, kollekció, fajta, kulcs) -> (verzió, pk-k, méret)
+        self.versions = {}              # (adatbázis, kollekció) -> írási verzió
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def version(self, database, collection):
+        """Write version of a collection (to be passed to put_many after the read)"""
+        with self.lock:
+            return self.versions.setdefault((database, collection), 0)
+
+    def get_many(self, database, collection, kind, keys):
+        """(key -> cached primary keys, keys that are not cached)"""
+        found = {}
+        missing = []
+        with self.lock:
+            version = self.versions.get((database, collection), 0)
+            for key in keys:
+                entry_key = (database, collection, kind, key)
+                entry = self.entries.get(entry_key)
+                if entry is None or entry[0] != version:
+                    if entry is not None:
+                        self._remove(entry_key)
+                    missing.append(key)
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(entry_key)
+                found[key] = entry[1]
+                self.hits += 1
+        return found, missing
+
+    def put_many(self, database, collection, kind, version, values):
+        """Cache key -> primary keys read at version (nothing if the collection was written since)"""
+        with self.lock:
+            if self.versions.get((database, collection), 0) != version:
+                return
+            for key, ids in values.items():
+                entry_key = (database, collection, kind, key)
+                self._remove(entry_key)
+                size = estimated_size(entry_key) + estimated_size(ids)
+                if size > self.budget:
+                    continue
+                self.entries[entry_key] = (version, ids, size)
+                self.used += size
+            while self.used > self.budget:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.used -= evicted_size
+                self.evictions += 1
+
+    def _remove(self, entry_key):
+        old = self.entries.pop(entry_key, None)
+        if old is not None:
+            self.used -= old[2]
+
+    def invalidate(self, database, collection):
+        # A régi verziójú bejegyzések olvasáskor vagy LRU szerint esnek ki
+        with self.lock:
+            self.versions[(database, collection)] = self.versions.get((database, collection), 0) + 1
+
+    def invalidate_database(self, database):
+        with self.lock:
+            for key in self.versions:
+                if key[0] == database:
+                    self.versions[key] += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "budget_bytes": self.budget,
+                "used_bytes": self.used,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions
+            }
+
+index_cache = IndexCache(INDEX_CACHE_BYTES)
+
+def invalidate_index(database, collection):
+    """Called after every write of an index collection"""
+    index_cache.invalidate(database, collection)
+
+def invalidate_database_indexes(database):
+    index_cache.invalidate_database(database)
+
+def index_cache_stats():
+    return index_cache.stats()
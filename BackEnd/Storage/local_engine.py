@@ -0,0 +1,303 @@
+import os
+import json
+import shutil
+import bisect
+import threading
+from BackEnd.Storage.engine import Store, StorageEngine, StorageError, DuplicateKeyError, prefix_upper_bound
+
+# Embedded, file-backed engine: every collection lives in memory and is persisted to an
+# append-only log (Data/<database>/<collection>.log), compacted when it grows too large.
+# Log records: ["P", doc] (put / replace) and ["D", key] (delete).
+
+DATA_FOLDER = os.getenv("BGDTSQL_DATA_FOLDER") or os.path.abspath(os.path.join(os.path.dirname(__file__), "../../Data"))
+COMPACT_MIN_RECORDS = 10000   # Ennyi log rekord alatt nincs tömörítés
+COMPACT_RATIO = 2             # Tömörítés, ha a log több mint ennyiszer annyi rekord, mint az élő dokumentum
+FSYNC_WRITES = False          # os.fsync minden írás után (lassú, de áramszünet-biztos)
+SORTED_KEYS_INSORT_LIMIT = 64 # Ennyi kulcsváltozásig bisect-tel frissül a rendezett kulcslista
+
+def _copy_doc(doc):
+    # A listák (posting listák) másolása, hogy a hívó későbbi módosítása ne érje el a tárolót
+    return {field: list(value) if isinstance(value, list) else value for field, value in doc.items()}
+
+class LocalStore(Store):
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.docs = None          # _id -> dokumentum, első használatkor töltődik be
+        self.sorted_keys = None   # Rendezett kulcslista range_scan-hez, írásnál helyben frissítve
+        self.log_records = 0
+        self.log_file = None
+
+    # --- Persistence ---
+
+    def _load(self):
+        if self.docs is not None:
+            return
+        docs = {}
+        records = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        kind, payload = json.loads(line)
+                    except ValueError:
+                        # Félbeszakadt utolsó írás: a hiányos sort kihagyjuk
+                        continue
+                    if kind == "P":
+                        docs[payload["_id"]] = payload
+                    else:
+                        docs.pop(payload, None)
+                    records += 1
+        self.docs = docs
+        self.log_records = records
+
+    def _append(self, records):
+        if not records:
+            return
+        try:
+            if self.log_file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.log_file = open(self.path, "a", encoding="utf-8")
+            self.log_file.write("".join(json.dumps(record) + "\n" for record in records))
+            self.log_file.flush()
+            if FSYNC_WRITES:
+                os.fsync(self.log_file.fileno())
+        except OSError as e:
+            raise StorageError(f"Local storage error: {e}") from e
+
+        self.log_records += len(records)
+        if self.log_records > COMPACT_MIN_RECORDS and self.log_records > COMPACT_RATIO * len(self.docs):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log with one put record per live document"""
+        self.close()
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for doc in self.docs.values():
+                    f.write(json.dumps(["P", doc]) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            raise StorageError(f"Local storage error: {e}") from e
+        self.log_records = len(self.docs)
+
+    def sync(self):
+        """Force the written log records to disk"""
+        with self.lock:
+            if self.log_file is not None:
+                try:
+                    os.fsync(self.log_file.fileno())
+                except OSError as e:
+                    raise StorageError(f"Local storage error: {e}") from e
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+    # --- Store interface ---
+
+    def get(self, key):
+        with self.lock:
+            self._load()
+            doc = self.docs.get(key)
+            return dict(doc) if doc is not None else None
+
+    def get_many(self, keys):
+        with self.lock:
+            self._load()
+            return [dict(self.docs[key]) for key in keys if key in self.docs]
+
+    def existing_keys(self, keys):
+        with self.lock:
+            self._load()
+            return {key for key in keys if key in self.docs}
+
+    def put(self, doc):
+        failures = self.bulk_write([("insert", doc)])
+        if failures:
+            raise DuplicateKeyError(failures[0][1])
+
+    def upsert(self, doc):
+        self.bulk_write([("upsert", doc)])
+
+    def delete(self, key):
+        with self.lock:
+            self._load()
+            if key not in self.docs:
+                return False
+            self.bulk_write([("delete", key)])
+            return True
+
+    def scan(self, batch_size=None):
+        # Pillanatkép: a bejárás alatti írások nem zavarják az iterációt
+        with self.lock:
+            self._load()
+            docs = list(self.docs.values())
+        for doc in docs:
+            yield dict(doc)
+
+    def range_scan(self, low=None, high=None, include_low=True, include_high=True, prefix=None):
+        with self.lock:
+            self._load()
+            if self.sorted_keys is None:
+                self.sorted_keys = sorted(self.docs)
+            keys = self.sorted_keys
+            if prefix:
+                low, high, include_low, include_high = prefix, prefix_upper_bound(prefix), True, False
+            start = 0 if low is None else (bisect.bisect_left(keys, low) if include_low else bisect.bisect_right(keys, low))
+            end = len(keys) if high is None else (bisect.bisect_right(keys, high) if include_high else bisect.bisect_left(keys, high))
+            docs = [self.docs[key] for key in keys[start:end]]
+        for doc in docs:
+            yield dict(doc)
+
+    def bulk_write(self, operations, ordered=False):
+        failures = []
+        records = []
+        touched = {}    # Létrejött / törölt kulcsok -> létezett-e a batch előtt
+        with self.lock:
+            self._load()
+            docs = self.docs
+            for position, operation in enumerate(operations):
+                kind = operation[0]
+                if kind == "insert":
+                    doc = operation[1]
+                    if doc["_id"] in docs:
+                        failures.append((position, f"Duplicate key: '{doc['_id']}'"))
+                        if ordered:
+                            break
+                        continue
+                    doc = _copy_doc(doc)
+                    touched.setdefault(doc["_id"], False)
+                elif kind == "upsert":
+                    doc = _copy_doc(operation[1])
+                    if doc["_id"] not in docs:
+                        touched.setdefault(doc["_id"], False)
+                elif kind == "delete":
+                    key = operation[1]
+                    if docs.pop(key, None) is not None:
+                        touched.setdefault(key, True)
+                        records.append(["D", key])
+                    continue
+                elif kind in ("add_to_set", "pull"):
+                    _, key, field, values = operation
+                    existing = docs.get(key)
+                    if existing is None:
+                        if kind == "pull":
+                            continue
+                        existing = {"_id": key}
+                        touched.setdefault(key, False)
+                    current = existing.get(field, [])
+                    if kind == "add_to_set":
+                        seen = set(current)
+                        new_values = [v for v in values if not (v in seen or seen.add(v))]
+                        if not new_values and field in existing:
+                            continue
+                        # Új lista: a korábban visszaadott dokumentumok nem változnak
+                        updated = current + new_values
+                    else:
+                        removed = set(values)
+                        updated = [v for v in current if v not in removed]
+                        if len(updated) == len(current):
+                            continue
+                    doc = dict(existing)
+                    doc[field] = updated
+                elif kind == "delete_if_empty":
+                    _, key, field = operation
+                    existing = docs.get(key)
+                    if existing is not None and not existing.get(field) and "value" not in existing:
+                        del docs[key]
+                        touched.setdefault(key, True)
+                        records.append(["D", key])
+                    continue
+                else:
+                    failures.append((position, f"Unknown storage operation '{kind}'"))
+                    if ordered:
+                        break
+                    continue
+
+                docs[doc["_id"]] = doc
+                records.append(["P", doc])
+
+            self._update_sorted_keys(touched)
+            self._append(records)
+        return failures
+
+    def _update_sorted_keys(self, touched):
+        """Keep the sorted key list of range_scan current instead of sorting every key again"""
+        keys = self.sorted_keys
+        if keys is None or not touched:
+            return
+        added = [key for key, existed in touched.items() if not existed and key in self.docs]
+        removed = {key for key, existed in touched.items() if existed and key not in self.docs}
+        if len(added) + len(removed) <= SORTED_KEYS_INSORT_LIMIT:
+            for key in removed:
+                del keys[bisect.bisect_left(keys, key)]
+            for key in added:
+                bisect.insort(keys, key)
+            return
+        # Nagy batch: a rendezett lista + az új kulcsok rendezése (timsort, közel lineáris)
+        if removed:
+            keys[:] = [key for key in keys if key not in removed]
+        keys.extend(added)
+        keys.sort()
+
+    def pull(self, key, field, values):
+        with self.lock:
+            self._load()
+            before = self.docs.get(key)
+            self.bulk_write([("pull", key, field, list(values))])
+            return self.docs.get(key) is not before
+
+    def count(self):
+        with self.lock:
+            self._load()
+            return len(self.docs)
+
+    def clear(self):
+        with self.lock:
+            self.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.docs = {}
+            self.sorted_keys = None
+            self.log_records = 0
+
+class LocalEngine(StorageEngine):
+    name = "local"
+    memory_resident = True
+
+    def __init__(self, data_folder=None):
+        self.data_folder = data_folder or DATA_FOLDER
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def store(self, database, collection):
+        with self.lock:
+            store = self.stores.get((database, collection))
+            if store is None:
+                store = LocalStore(os.path.join(self.data_folder, database, f"{collection}.log"))
+                self.stores[(database, collection)] = store
+            return store
+
+    def drop_store(self, database, collection):
+        with self.lock:
+            store = self.stores.pop((database, collection), None)
+        if store is None:
+            store = LocalStore(os.path.join(self.data_folder, database, f"{collection}.log"))
+        store.clear()
+
+    def sync(self):
+        with self.lock:
+            stores = list(self.stores.values())
+        for store in stores:
+            store.sync()
+
+    def drop_database(self, database):
+        with self.lock:
+            for key in [key for key in self.stores if key[0] == database]:
+                self.stores.pop(key).close()
+        shutil.rmtree(os.path.join(self.data_folder, database), ignore_errors=True)
@@ -0,0 +1,129 @@
+import functools
+from pymongo import errors, InsertOne, ReplaceOne, UpdateOne, DeleteOne
+from BackEnd.Insert_Get_From_Mongo.db_connection import get_client
+from BackEnd.Storage.engine import Store, StorageEngine, StorageError, DuplicateKeyError, prefix_upper_bound
+
+SCAN_BATCH_SIZE = 1000  # Cursor batch méret teljes bejárásnál
+
+def translate_errors(method):
+    """PyMongoError -> StorageError, so callers do not depend on pymongo"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except errors.DuplicateKeyError as e:
+            raise DuplicateKeyError(str(e)) from e
+        except errors.PyMongoError as e:
+            raise StorageError(f"MongoDB error: {e}") from e
+    return wrapper
+
+def to_mongo_operation(operation):
+    kind = operation[0]
+    if kind == "insert":
+        return InsertOne(operation[1])
+    if kind == "upsert":
+        return ReplaceOne({"_id": operation[1]["_id"]}, operation[1], upsert=True)
+    if kind == "delete":
+        return DeleteOne({"_id": operation[1]})
+    if kind == "add_to_set":
+        _, key, field, values = operation
+        return UpdateOne({"_id": key}, {"$addToSet": {field: {"$each": list(values)}}}, upsert=True)
+    if kind == "pull":
+        _, key, field, values = operation
+        return UpdateOne({"_id": key}, {"$pull": {field: {"$in": list(values)}}})
+    if kind == "delete_if_empty":
+        _, key, field = operation
+        return DeleteOne({"_id": key, field: {"$size": 0}, "value": {"$exists": False}})
+    raise StorageError(f"Unknown storage operation '{kind}'")
+
+class MongoStore(Store):
+    def __init__(self, collection):
+        self.collection = collection
+
+    @translate_errors
+    def get(self, key):
+        return self.collection.find_one({"_id": key})
+
+    @translate_errors
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+        return list(self.collection.find({"_id": {"$in": keys}}))
+
+    @translate_errors
+    def existing_keys(self, keys):
+        keys = list(keys)
+        if not keys:
+            return set()
+        return {doc["_id"] for doc in self.collection.find({"_id": {"$in": keys}}, {"_id": 1})}
+
+    @translate_errors
+    def put(self, doc):
+        self.collection.insert_one(doc)
+
+    @translate_errors
+    def upsert(self, doc):
+        self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+
+    @translate_errors
+    def delete(self, key):
+        return self.collection.delete_one({"_id": key}).deleted_count > 0
+
+    def scan(self, batch_size=None):
+        try:
+            yield from self.collection.find({}).batch_size(batch_size or SCAN_BATCH_SIZE)
+        except errors.PyMongoError as e:
+            raise StorageError(f"MongoDB error: {e}") from e
+
+    def range_scan(self, low=None, high=None, include_low=True, include_high=True, prefix=None):
+        key_filter = {}
+        if prefix:
+            key_filter = {"$gte": prefix, "$lt": prefix_upper_bound(prefix)}
+        if low is not None:
+            key_filter["$gte" if include_low else "$gt"] = low
+        if high is not None:
+            key_filter["$lte" if include_high else "$lt"] = high
+        query = {"_id": key_filter} if key_filter else {}
+        try:
+            yield from self.collection.find(query).sort("_id", 1).batch_size(SCAN_BATCH_SIZE)
+        except errors.PyMongoError as e:
+            raise StorageError(f"MongoDB error: {e}") from e
+
+    def bulk_write(self, operations, ordered=False):
+        if not operations:
+            return []
+        try:
+            self.collection.bulk_write([to_mongo_operation(op) for op in operations], ordered=ordered)
+            return []
+        except errors.BulkWriteError as e:
+            return [(err["index"], err.get("errmsg", "Write error")) for err in e.details.get("writeErrors", [])]
+        except errors.PyMongoError as e:
+            raise StorageError(f"MongoDB error: {e}") from e
+
+    @translate_errors
+    def pull(self, key, field, values):
+        result = self.collection.update_one({"_id": key}, {"$pull": {field: {"$in": list(values)}}})
+        return result.modified_count > 0
+
+    @translate_errors
+    def count(self):
+        return self.collection.count_documents({})
+
+    @translate_errors
+    def clear(self):
+        self.collection.delete_many({})
+
+class MongoEngine(StorageEngine):
+    name = "mongo"
+
+    def store(self, database, collection):
+        return MongoStore(get_client()[database][collection])
+
+    @translate_errors
+    def drop_store(self, database, collection):
+        get_client()[database].drop_collection(collection)
+
+    @translate_errors
+    def drop_database(self, database):
+        get_client().drop_database(database)
@@ -0,0 +1,379 @@
+import os
+import json
+import zlib
+import threading
+from BackEnd.Storage.engine import StorageError, get_store, sync_engines
+from BackEnd.Storage.index_cache import invalidate_index
+from BackEnd.Storage import local_engine
+
+# Write-ahead log of the INSERT / DELETE paths (Data/wal.log).
+# One commit record holds the row change(s) of a statement together with every index
+# change, as store operations per collection: [collection, kind, args...].
+# A record is durable (fsync) before any of its operations reaches a store; concurrent
+# writers share one fsync (group commit: the first waiting writer flushes everybody's
+# records, the others wait for it). After a crash replay_wal re-applies the log in LSN
+# order; the operations are idempotent, so records that were already applied are harmless.
+# Checkpoint (sync the stores, truncate the log): after a write once the log is larger than
+# WAL_CHECKPOINT_BYTES and no record is in flight, and forced after replay and DROP.
+# DROP TABLE / DROP DATABASE log a drop record: replay skips the older records of the
+# dropped table, so they cannot refill a new table of the same name.
+# Lines: "<crc32 hex> <json>"; a torn or corrupt line ends the log.
+
+WAL_FILE_NAME = "wal.log"
+WAL_CHECKPOINT_BYTES = 16 * 1024 * 1024   # Ekkora log felett checkpoint, ha épp nincs folyamatban lévő írás
+
+def _encode(record):
+    payload = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n"
+
+def _decode(line):
+    """Record of one log line, None if the line is torn or corrupt"""
+    if not line.endswith("\n"):
+        return None
+    checksum, _, payload = line.rstrip("\n").partition(" ")
+    try:
+        if int(checksum, 16) != zlib.crc32(payload.encode("utf-8")):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def read_records(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8", newline="\n") as f:
+        for line in f:
+            record = _decode(line)
+            if record is None:
+                break
+            records.append(record)
+    return records
+
+class WriteAheadLog:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.condition = threading.Condition()
+        self.pending = []       # Még ki nem írt sorok
+        self.next_lsn = 1
+        self.durable_lsn = 0    # Az utolsó fsync-elt rekord LSN-je
+        self.flushing = False   # Egy író épp a csoport fsync-jét végzi
+        self.active = 0         # Tartós, de a tárolókra még nem (teljesen) alkalmazott rekordok
+        self.error = None       # Sikertelen log írás után nincs több írás (fail-stop)
+        self.dirty = False      # Félbemaradt alkalmazás: a log csak replay után csonkolható
+        self.unreplayed = set() # Adatbázisok, amelyek rekordjait a replay kihagyta (elérhetetlen motor)
+        self.syncs = 0
+
+    def append(self, record, applying=True):
+        """Log one record and wait until it is on disk, returns its LSN"""
+        with self.condition:
+            if self.error:
+                raise StorageError(f"Write-ahead log unavailable: {self.error}")
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            record["lsn"] = lsn
+            self.pending.append(_encode(record))
+            if applying:
+                self.active += 1
+
+            while self.durable_lsn < lsn:
+                if self.error:
+                    if applying:
+                        self.active -= 1
+                    raise StorageError(f"Write-ahead log unavailable: {self.error}")
+                if self.flushing:
+                    self.condition.wait()
+                    continue
+
+                # Csoport vezető: minden várakozó rekordja egy írással és egy fsync-kel
+                lines = self.pending
+                last_lsn = self.next_lsn - 1
+                self.pending = []
+                self.flushing = True
+                self.condition.release()
+                try:
+                    data = "".join(lines)
+                    self._write(data)
+                    error = None
+                except OSError as e:
+                    error = e
+                finally:
+                    self.condition.acquire()
+                self.flushing = False
+                if error is None:
+                    self.durable_lsn = last_lsn
+                    self.size += len(data.encode("utf-8"))
+                    self.syncs += 1
+                else:
+                    self.error = str(error)
+                self.condition.notify_all()
+        return lsn
+
+    def _write(self, data):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8", newline="\n")
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def applied(self):
+        """A logged record reached the stores; checkpoint if the log grew large"""
+        with self.condition:
+            self.active -= 1
+            if self.active == 0:
+                self.condition.notify_all()
+        self.checkpoint()
+
+    def checkpoint(self, force=False):
+        """
+        Sync the stores and truncate the log (only when nothing is in flight, so every
+        logged record has been applied). force waits for the in-flight records.
+        """
+        with self.condition:
+            if force:
+                self.condition.wait_for(lambda: self.error or not (self.active or self.pending or self.flushing))
+            if self.error or self.dirty or self.unreplayed or self.active or self.pending or self.flushing:
+                return False
+            if self.size == 0 or (not force and self.size <= WAL_CHECKPOINT_BYTES):
+                return False
+            try:
+                sync_engines()
+                if self.file is None:
+                    self.file = open(self.path, "a", encoding="utf-8", newline="\n")
+                os.ftruncate(self.file.fileno(), 0)
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                raise StorageError(f"Write-ahead log checkpoint failed: {e}") from e
+            self.size = 0
+            return True
+
+    def stats(self):
+        with self.condition:
+            return {
+                "path": self.path,
+                "bytes": self.size,
+                "last_lsn": self.durable_lsn,
+                "group_syncs": self.syncs,
+                "in_flight": self.active
+            }
+
+_wal = None
+_wal_lock = threading.Lock()
+
+def get_wal():
+    global _wal
+    with _wal_lock:
+        if _wal is None:
+            _wal = WriteAheadLog(os.path.join(local_engine.DATA_FOLDER, WAL_FILE_NAME))
+        return _wal
+
+def _without_failed_keys(operation, failed_keys):
+    """Index operation without the primary keys of row inserts that failed"""
+    kind = operation[0]
+    if kind == "insert" and "ids" in operation[1]:
+        ids = [pk for pk in operation[1]["ids"] if pk not in failed_keys]
+        return [kind, dict(operation[1], ids=ids)] if ids else None
+    if kind in ("add_to_set", "pull"):
+        ids = [pk for pk in operation[3] if pk not in failed_keys]
+        return [kind, operation[1], operation[2], ids] if ids else None
+    return operation
+
+def _apply_index_operations(database, operations, failed_keys, replaying=False):
+    """Apply index operations, returns the failed ones as (collection, operation, message)"""
+    # Kollekciónként egy rendezett bulk írás (a pull-nak meg kell előznie a delete_if_empty-t)
+    groups = {}
+    for collection, *operation in operations:
+        if failed_keys:
+            operation = _without_failed_keys(operation, failed_keys)
+            if operation is None:
+                continue
+        if replaying and operation[0] == "insert":
+            # A bejegyzés már beírásra kerülhetett a leállás előtt
+            operation = ["upsert", operation[1]]
+        groups.setdefault(collection, []).append(tuple(operation))
+    failures = []
+    for collection, group in groups.items():
+        try:
+            # Rendezett írás: hiba után a csoport maradéka külön írással folytatódik
+            while group:
+                failed = get_store(database, collection).bulk_write(group, ordered=True)
+                if not failed:
+                    break
+                position, message = failed[0]
+                failures.append((collection, group[position], message))
+                group = group[position + 1:]
+        finally:
+            invalidate_index(database, collection)
+    return failures
+
+def _undo_operations(table, operations, index_failures, undone_keys):
+    """Operations removing the rows undone_keys and the index entries written for them"""
+    failed = {(collection, repr(operation)) for collection, operation, _ in index_failures}
+    undo = [[table, "delete", key] for key in sorted(undone_keys)]
+    for collection, *operation in operations:
+        if collection == table or (collection, repr(tuple(operation))) in failed:
+            continue
+        kind = operation[0]
+        if kind == "insert" and "ids" in operation[1]:
+            ids = [pk for pk in operation[1]["ids"] if pk in undone_keys]
+            if len(ids) == len(operation[1]["ids"]):
+                undo.append([collection, "delete", operation[1]["_id"]])
+            elif ids:
+                undo.append([collection, "pull", operation[1]["_id"], "ids", ids])
+        elif kind == "add_to_set":
+            ids = [pk for pk in operation[3] if pk in undone_keys]
+            if ids:
+                undo.append([collection, "pull", operation[1], operation[2], ids])
+                undo.append([collection, "delete_if_empty", operation[1], operation[2]])
+    return undo
+
+def commit(database, table, operations, after_apply=None):
+    """
+    Log and apply one change: operations is a list of (collection, kind, args...) where
+    the table's own operations are the row changes and the rest are index changes.
+    Row inserts that fail (duplicate key) are left out of the index changes. A row whose
+    unique index entry cannot be inserted (a concurrent writer took the value) is undone with
+    a logged compensating record. after_apply gets the failures of the row operations, which
+    are also returned as (position, message).
+    """
+    wal = get_wal()
+    operations = [list(operation) for operation in operations]
+    lsn = wal.append({"type": "commit", "db": database, "table": table, "ops": operations})
+    try:
+        row_operations = [tuple(operation[1:]) for operation in operations if operation[0] == table]
+        failures = get_store(database, table).bulk_write(row_operations, ordered=False) if row_operations else []
+
+        failed_keys = set()
+        for position, _ in failures:
+            if row_operations[position][0] == "insert":
+                failed_keys.add(row_operations[position][1]["_id"])
+        if failed_keys:
+            # Replay ne alkalmazza a sikertelen sorok index változásait
+            wal.append({"type": "failed", "ref": lsn, "keys": sorted(failed_keys)}, applying=False)
+
+        index_operations = [operation for operation in operations if operation[0] != table]
+        index_failures = _apply_index_operations(database, index_operations, failed_keys)
+        if index_failures:
+            failures = failures + _undo_failed_rows(wal, lsn, database, table, operations, row_operations, index_failures)
+
+        if after_apply:
+            after_apply(failures)
+        return failures
+    except Exception:
+        wal.dirty = True
+        raise
+    finally:
+        wal.applied()
+
+def _undo_failed_rows(wal, lsn, database, table, operations, row_operations, index_failures):
+    """Undo the rows whose unique index insert failed, returns their failures as (position, message)"""
+    undone = {}
+    for collection, operation, message in index_failures:
+        if operation[0] != "insert" or "ids" not in operation[1]:
+            # Csak a UNIQUE bejegyzés beszúrása ütközhet: minden más hiba után a replay javít
+            wal.dirty = True
+            raise StorageError(f"Index write failed on '{collection}': {message}")
+        for pk in operation[1]["ids"]:
+            undone.setdefault(pk, f"Unique constraint violation in index {collection}: duplicate key '{operation[1]['_id']}'")
+
+    # Replay ne írja be újra a sorokat és az indexeiket, majd a már beírt részek visszavonása
+    wal.append({"type": "failed", "ref": lsn, "keys": sorted(undone)}, applying=False)
+    undo = _undo_operations(table, operations, index_failures, set(undone))
+    wal.append({"type": "commit", "db": database, "table": table, "ops": undo}, applying=False)
+    get_store(database, table).bulk_write([tuple(operation[1:]) for operation in undo if operation[0] == table], ordered=False)
+    if _apply_index_operations(database, [operation for operation in undo if operation[0] != table], set()):
+        wal.dirty = True
+        raise StorageError("Undoing a failed unique index insert failed")
+
+    return [(position, undone[operation[1]["_id"]]) for position, operation in enumerate(row_operations)
+            if operation[0] == "insert" and operation[1]["_id"] in undone]
+
+def log_drop(database, table=None):
+    """Log the drop of a table (or of the whole database when table is None), then checkpoint"""
+    wal = get_wal()
+    wal.append({"type": "drop", "db": database, "table": table}, applying=False)
+    if table is None:
+        with wal.condition:
+            wal.unreplayed.discard(database)
+    wal.checkpoint(force=True)
+
+def replay_wal(should_apply=None, databases=None):
+    """
+    Re-apply the logged records after a restart (only those of databases, if given).
+    should_apply(database, table) skips records of dropped tables. A database whose engine
+    fails (StorageError) is skipped from that record on; its records stay in the log.
+    Returns the replayed (database, table) pairs and the skipped databases.
+    """
+    wal = get_wal()
+    records = read_records(wal.path)
+    failed = {}
+    dropped = {}
+    for record in records:
+        if record.get("type") == "failed":
+            failed.setdefault(record["ref"], set()).update(record["keys"])
+        elif record.get("type") == "drop":
+            key = (record["db"], record["table"])
+            dropped[key] = max(dropped.get(key, 0), record["lsn"])
+
+    replayed = []
+    skipped = set()
+    for record in sorted((r for r in records if r.get("type") == "commit"), key=lambda r: r["lsn"]):
+        database, table = record["db"], record["table"]
+        if database in skipped or (databases is not None and database not in databases):
+            continue
+        if record["lsn"] < max(dropped.get((database, table), 0), dropped.get((database, None), 0)):
+            continue
+        if should_apply and not should_apply(database, table):
+            continue
+        try:
+            _replay_record(database, table, record, set(failed.get(record["lsn"], ())))
+        except StorageError as e:
+            # Elérhetetlen motor: az adatbázis többi rekordja sem játszható vissza (LSN sorrend)
+            print(f"Write-ahead log replay skipped database '{database}': {e}")
+            skipped.add(database)
+            continue
+        if (database, table) not in replayed:
+            replayed.append((database, table))
+
+    with wal.condition:
+        if records:
+            wal.next_lsn = max(wal.next_lsn, max(record.get("lsn", 0) for record in records) + 1)
+            wal.durable_lsn = wal.next_lsn - 1
+        # A kihagyott adatbázisok rekordjai miatt a log addig nem csonkolható
+        if databases is None:
+            wal.dirty = False
+            wal.unreplayed = set(skipped)
+        else:
+            wal.unreplayed = (wal.unreplayed - set(databases)) | skipped
+    wal.checkpoint(force=True)
+    return replayed, skipped
+
+def _replay_record(database, table, record, failed_keys):
+    store = get_store(database, table)
+    # A már beírt sorok egyetlen lekérdezéssel
+    keys = [operation[2]["_id"] for operation in record["ops"]
+            if operation[0] == table and operation[1] == "insert" and operation[2]["_id"] not in failed_keys]
+    existing_docs = {doc["_id"]: doc for doc in store.get_many(keys)} if keys else {}
+
+    row_operations = []
+    for collection, *operation in record["ops"]:
+        if collection != table:
+            continue
+        if operation[0] == "insert":
+            doc = operation[1]
+            if doc["_id"] in failed_keys:
+                continue
+            existing = existing_docs.get(doc["_id"])
+            if existing is not None:
+                # Már beírt sor: kihagyjuk; más tartalommal egy másik író sora (sikertelen volt)
+                if existing != doc:
+                    failed_keys.add(doc["_id"])
+                continue
+        row_operations.append(tuple(operation))
+    if row_operations:
+        store.bulk_write(row_operations, ordered=False)
+
+    _apply_index_operations(database, [op for op in record["ops"] if op[0] != table], failed_keys, replaying=True)
@@ -9,6 +9,7 @@ NUM_CUSTOMERS = 50       # Reduced from 5000
 NUM_ADDRESSES = 70       # Reduced from 7000
 NUM_ORDERS = 200         # Reduced from 20000
 NUM_ORDER_ITEMS = 100000 # Kept large - this is our main test table
+ROWS_PER_INSERT = 1000   # Rows per multi-row INSERT statement (bulk write path)
 
 # Helper function to execute SQL commands using your mini-DBMS
 def execute_sql(sql):
@@ -238,6 +239,7 @@ def generate_order_items_data():
         
         print(f"Generating order items SQL {batch_start} to {batch_end}")
         
+        row_values = []
         for i in range(batch_start, batch_end + 1):
             # Limit the range of OrderIDs and ProductIDs to match our smaller dataset
             order_id = random.randint(1, NUM_ORDERS)
@@ -248,7 +250,11 @@ def generate_order_items_data():
             unit_price = round(random.uniform(10.0, 500.0), 2)
             discount = round(random.uniform(0.0, 0.3), 2)  # 0% to 30% discount
             
-            batch_sql.append(f"INSERT INTO order_items VALUES ({i}, {order_id}, {product_id}, {quantity}, {unit_price}, {discount});")
+            row_values.append(f"({i}, {order_id}, {product_id}, {quantity}, {unit_price}, {discount})")
+        
+        # Multi-row INSERT: one statement (and one bulk write) per ROWS_PER_INSERT rows
+        for start in range(0, len(row_values), ROWS_PER_INSERT):
+            batch_sql.append(f"INSERT INTO order_items VALUES {', '.join(row_values[start:start + ROWS_PER_INSERT])};")
         
         all_sql.append("\n".join(batch_sql))
     
@@ -0,0 +1,184 @@
+import os
+import sys
+import tempfile
+import subprocess
+
+# Write-ahead log recovery check (local engine, temporary Data / MetaData folders).
+# Run from the repository root: python -m BackEnd.Update.wal_recovery_test
+# Every step runs in its own process, like a restart; the "crash" steps end with os._exit
+# at the given point, the next step recovers (ensure_recovered) and checks the tables.
+
+failures = []
+
+def check(name, condition, detail=""):
+    print(f"{'OK  ' if condition else 'FAIL'} {name}" + (f": {detail}" if detail and not condition else ""))
+    if not condition:
+        failures.append(name)
+
+def execute_sql(sql):
+    from BackEnd.Main.controller import handle_sql_commands
+    return handle_sql_commands(sql)
+
+def rows(sql):
+    return sorted(execute_sql(sql)[-1].get("rows", []))
+
+def index_ids(database, table, index_name):
+    from BackEnd.Storage.engine import get_index_store
+    return sorted((doc["_id"], sorted(doc["ids"])) for doc in get_index_store(database, table, index_name).scan())
+
+def crash():
+    # Kemény leállás: a tárolók nem zárnak le, atexit nem fut (csak a kimenet kerül ki)
+    sys.stdout.flush()
+    os._exit(1 if failures else 0)
+
+# 1. CRC és csonka sor: a hibás sor (és minden utána) nem kerül visszajátszásra
+def step_torn_tail():
+    from BackEnd.Storage.wal import _encode, _decode, read_records
+    first = _encode({"type": "commit", "lsn": 1, "db": "w", "table": "t", "ops": []})
+    second = _encode({"type": "commit", "lsn": 2, "db": "w", "table": "t", "ops": []})
+    corrupt = "00000000" + second[8:]
+    check("valid line decodes", _decode(first) == {"type": "commit", "lsn": 1, "db": "w", "table": "t", "ops": []})
+    check("line without newline is torn", _decode(first.rstrip("\n")) is None)
+    check("line with a wrong CRC is rejected", _decode(corrupt) is None)
+
+    path = os.path.join(tempfile.mkdtemp(), "wal.log")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(first + corrupt + second)
+    check("corrupt line ends the log", [r["lsn"] for r in read_records(path)] == [1])
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(first + second + second[:20])
+    check("torn tail is dropped", [r["lsn"] for r in read_records(path)] == [1, 2])
+
+def step_setup():
+    execute_sql("CREATE DATABASE w ENGINE local; USE w; CREATE TABLE t (id INT PRIMARY KEY, city VARCHAR(20) UNIQUE, n INT); CREATE INDEX idx_n ON t (n);")
+    execute_sql("USE w; INSERT INTO t VALUES (1, 'A', 5); INSERT INTO t VALUES (2, 'B', 5);")
+
+# 2. Összeomlás a log írása és az alkalmazás között
+def step_crash_before_apply():
+    import BackEnd.Storage.wal as wal
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    # A rekord tartós, de egyetlen tárolóra sem jut el
+    wal.get_store = lambda *args: crash()
+    execute_sql("USE w; INSERT INTO t (id, city, n) VALUES (3, 'C', 7), (4, 'D', 5);")
+    check("crashed before apply", False)
+
+def step_crash_before_index():
+    import BackEnd.Storage.wal as wal
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    # A sor törölve, az index változások nem
+    wal._apply_index_operations = lambda *args, **kwargs: crash()
+    execute_sql("USE w; DELETE FROM t WHERE id = 1;")
+    check("crashed before the index changes", False)
+
+def step_check_replay():
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    check("replayed rows", rows("USE w; SELECT id, city, n FROM t;") == [[2, "B", 5], [3, "C", 7], [4, "D", 5]],
+          rows("USE w; SELECT id, city, n FROM t;"))
+    check("replayed non-unique index", index_ids("w", "t", "idx_n") == [("5", ["2", "4"]), ("7", ["3"])],
+          index_ids("w", "t", "idx_n"))
+    check("index lookup after replay", rows("USE w; SELECT id FROM t WHERE city = 'C';") == [[3]])
+    check("deleted row's unique value is free", "error" not in execute_sql("USE w; INSERT INTO t VALUES (5, 'A', 1);")[-1])
+
+# 3. UNIQUE ütközés a validálás után: a sor visszavonva, kompenzáló rekorddal
+def step_unique_undo():
+    from BackEnd.Create.catalog import load_catalog
+    from BackEnd.Create.schema import table_schema
+    from BackEnd.Insert_Get_From_Mongo.index_controller import index_operations
+    from BackEnd.Storage.wal import commit, get_wal, read_records
+    execute_sql("CREATE DATABASE u ENGINE local; USE u; CREATE TABLE t (id INT PRIMARY KEY, e VARCHAR(20) UNIQUE, g INT); CREATE INDEX ig ON t (g);")
+    schema = table_schema(load_catalog("u")["tables"]["t"])
+
+    def prepare(values):
+        entries = [(schema.encode_key(row), dict(zip(schema.column_names, row))) for row in values]
+        operations, _ = index_operations("u", "t", "insert", entries)
+        return [("t", "insert", schema.encode(row)) for row in values] + operations
+
+    # Két író ugyanazt látta: mindkettő validált, mielőtt bármelyik írt volna
+    first = prepare([[1, "a", 5]])
+    second = prepare([[2, "a", 5], [3, "x", 5], [4, "y", 6]])
+    check("first writer commits", commit("u", "t", first) == [])
+    check("second writer loses only the duplicate row", [position for position, _ in commit("u", "t", second)] == [0])
+    check("failed record logged", any(r["type"] == "failed" and r["keys"] == ["2"] for r in read_records(get_wal().path)))
+    check("log not left dirty", not get_wal().dirty)
+    check_unique_tables("before restart")
+    # Újraindulás checkpoint nélkül: a replay-nek ugyanezt kell adnia
+    crash()
+
+def check_unique_tables(label):
+    check(f"rows {label}", rows("USE u; SELECT id, e, g FROM t;") == [[1, "a", 5], [3, "x", 5], [4, "y", 6]],
+          rows("USE u; SELECT id, e, g FROM t;"))
+    check(f"unique index {label}", index_ids("u", "t", "uq_e") == [("a", ["1"]), ("x", ["3"]), ("y", ["4"])],
+          index_ids("u", "t", "uq_e"))
+    check(f"non-unique index {label}", index_ids("u", "t", "ig") == [("5", ["1", "3"]), ("6", ["4"])],
+          index_ids("u", "t", "ig"))
+
+def step_check_unique_undo():
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    check_unique_tables("after replay")
+
+# 4. DROP rekord: a törölt tábla / adatbázis korábbi rekordjai nem játszódnak vissza
+def step_drop():
+    from BackEnd.Storage.wal import get_wal, read_records
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    execute_sql("CREATE DATABASE d ENGINE local; USE d; CREATE TABLE t (id INT PRIMARY KEY, v INT); INSERT INTO t (id, v) VALUES (1, 1), (2, 2);")
+    execute_sql("CREATE DATABASE e ENGINE local; USE e; CREATE TABLE t (id INT PRIMARY KEY, v INT); INSERT INTO t (id, v) VALUES (1, 1);")
+    # Félbemaradt commit után a log nem csonkolható, a drop rekordok benne maradnak
+    get_wal().dirty = True
+    execute_sql("USE d; DROP TABLE t; CREATE TABLE t (id INT PRIMARY KEY, v INT); INSERT INTO t (id, v) VALUES (9, 9);")
+    execute_sql("USE d; DROP DATABASE e; CREATE DATABASE e ENGINE local; USE e; CREATE TABLE t (id INT PRIMARY KEY, v INT);")
+    check("drop records logged", [r["type"] for r in read_records(get_wal().path)].count("drop") == 2)
+    crash()
+
+def step_check_drop():
+    from BackEnd.Insert_Get_From_Mongo.recovery import ensure_recovered
+    ensure_recovered()
+    check("dropped table not replayed", rows("USE d; SELECT id, v FROM t;") == [[9, 9]], rows("USE d; SELECT id, v FROM t;"))
+    check("dropped database not replayed", rows("USE e; SELECT id, v FROM t;") == [], rows("USE e; SELECT id, v FROM t;"))
+
+STEPS = {
+    "torn_tail": step_torn_tail,
+    "setup": step_setup,
+    "crash_before_apply": step_crash_before_apply,
+    "crash_before_index": step_crash_before_index,
+    "check_replay": step_check_replay,
+    "unique_undo": step_unique_undo,
+    "check_unique_undo": step_check_unique_undo,
+    "drop": step_drop,
+    "check_drop": step_check_drop
+}
+
+def run_step(step, meta_folder, data_folder):
+    """Run one step in a new process, returns False if a check failed"""
+    env = dict(os.environ, BGDTSQL_DATA_FOLDER=data_folder, BGDTSQL_DEFAULT_ENGINE="local")
+    result = subprocess.run([sys.executable, "-m", "BackEnd.Update.wal_recovery_test", step, meta_folder],
+                            env=env, capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith(("OK", "FAIL")):
+            print(f"[{step}] {line}")
+    if result.returncode != 0 or "FAIL" in result.stdout:
+        print(result.stderr[-2000:])
+        return False
+    return True
+
+def main():
+    meta_folder, data_folder = tempfile.mkdtemp(), tempfile.mkdtemp()
+    ok = True
+    for step in STEPS:
+        ok = run_step(step, meta_folder, data_folder) and ok
+    print("WAL recovery check passed" if ok else "WAL recovery check FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        # Egy lépés a gyermek folyamatban: a MetaData mappa a szülőé
+        import BackEnd.Create.database as database
+        database.META_DATA_FOLDER = sys.argv[2]
+        STEPS[sys.argv[1]]()
+        sys.stdout.flush()
+        sys.exit(1 if failures else 0)
+    main()